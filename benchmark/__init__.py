@@ -0,0 +1,16 @@
+# -*- coding: utf-8 -*-
+"""
+Banco de pruebas de rendimiento del plugin Topografía.
+
+Genera capas sintéticas de líneas, polígonos y terreno de tamaño
+configurable, ejecuta los cálculos sin interfaz gráfica midiendo cada fase
+(lectura, cálculo, formato, escritura y exportación) y guarda los tiempos en
+un archivo JSON para comparar versiones. Desde la carpeta que contiene el
+plugin::
+
+    python -m topografia.benchmark --entidades 5000 --vertices 50 --salida v1.1a.json
+
+Sin ``--qgis`` solo se mide el núcleo de cálculo; con ``--qgis`` las
+entidades se leen de capas en memoria de QGIS y se miden también las curvas
+de nivel.
+"""
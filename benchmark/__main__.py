@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+"""Ejecución del banco de pruebas: ``python -m topografia.benchmark --help``"""
+import argparse
+import configparser
+import json
+import os
+import platform
+import sys
+import tempfile
+from datetime import datetime
+
+import numpy as np
+
+from . import datos
+from .nucleo import MotorNucleo, entidades_sinteticas
+from ..core.angulos import FormateadorAngulos, DMS
+from ..core.cronometro import Cronometro, CALCULO, ESCRITURA, EXPORTACION
+from ..core.tabla import escribir_csv
+from ..core.wkb import decodificar
+from ..tools.calculo_lineas import tabla_lineas, calcular_lineas
+from ..tools.calculo_poligonos import tabla_poligonos, calcular_poligonos
+
+HERRAMIENTAS = ('lineas', 'poligonos', 'curvas')
+RAIZ_PLUGIN = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def version_plugin():
+    metadata = configparser.ConfigParser(interpolation=None)
+    metadata.read(os.path.join(RAIZ_PLUGIN, 'metadata.txt'), encoding='utf-8')
+    return metadata.get('general', 'version', fallback=None)
+
+
+def argumentos(argv=None):
+    parser = argparse.ArgumentParser(prog='benchmark', description=__doc__)
+    parser.add_argument('--herramientas', nargs='+', choices=HERRAMIENTAS, default=list(HERRAMIENTAS))
+    parser.add_argument('--entidades', type=int, default=1000, help="Entidades por capa")
+    parser.add_argument('--vertices', type=int, default=50, help="Vértices por entidad")
+    parser.add_argument('--multiparte', type=float, default=0.1, help="Proporción de entidades multiparte")
+    parser.add_argument('--huecos', type=float, default=0.1, help="Proporción de polígonos con hueco")
+    parser.add_argument('--celdas', type=int, default=500, help="Lado en celdas del terreno sintético")
+    parser.add_argument('--puntos', type=int, default=2000, help="Puntos acotados para interpolar")
+    parser.add_argument('--intervalo', type=float, default=10.0, help="Intervalo de las curvas de nivel")
+    parser.add_argument('--planas', action='store_true',
+                        help="Datos proyectados y distancias de cuadrícula (por defecto elipsoidales)")
+    parser.add_argument('--formato', type=int, default=DMS, choices=(0, 1),
+                        help="0 grados decimales, 1 grados/minutos/segundos")
+    parser.add_argument('--decimales', type=int, default=4)
+    parser.add_argument('--repeticiones', type=int, default=3)
+    parser.add_argument('--semilla', type=int, default=0)
+    parser.add_argument('--sin-excel', action='store_true', help="No exportar a XLSX")
+    parser.add_argument('--qgis', action='store_true',
+                        help="Leer las entidades de capas de QGIS y medir también las curvas de nivel")
+    parser.add_argument('--directorio', help="Carpeta para los archivos exportados (por defecto temporal)")
+    parser.add_argument('--salida', default='benchmark.json', help="Archivo JSON de resultados")
+    return parser.parse_args(argv)
+
+
+def iniciar_qgis():
+    """Inicia QGIS sin interfaz gráfica junto con Processing"""
+    from qgis.core import QgsApplication
+    QgsApplication.setPrefixPath(os.environ.get('QGIS_PREFIX_PATH', '/usr'), True)
+    aplicacion = QgsApplication([], False)
+    aplicacion.initQgis()
+    sys.path.append(os.path.join(QgsApplication.pkgDataPath(), 'python', 'plugins'))
+    from processing.core.Processing import Processing
+    Processing.initialize()
+    return aplicacion
+
+
+def capa_qgis(geometrias, tipo, crs):
+    """
+    Capa en memoria con las geometrías WKB, para leerlas con un iterador de QGIS.
+    Como en la mayoría de capas reales, todas las geometrías se guardan como multiparte.
+    """
+    from qgis.core import QgsFeature, QgsGeometry, QgsVectorLayer
+    capa = QgsVectorLayer(f"{tipo}?crs={crs}", "sintetica", "memory")
+    entidades = []
+    for g in geometrias:
+        geom = QgsGeometry()
+        geom.fromWkb(g)
+        geom.convertToMultiType()
+        entidad = QgsFeature()
+        entidad.setGeometry(geom)
+        entidades.append(entidad)
+    capa.dataProvider().addFeatures(entidades)
+    return capa
+
+
+def motor_qgis(capa, planas):
+    from qgis.core import QgsDistanceArea, QgsProject
+    from ..tools.medicion import MotorMedicion
+    distance_area = QgsDistanceArea()
+    distance_area.setSourceCrs(capa.crs(), QgsProject.instance().transformContext())
+    distance_area.setEllipsoid('WGS84')
+    return MotorMedicion(capa.crs(), distance_area, planas)
+
+
+def exportar(cronometro, tabla, reporte, directorio, nombre, excel):
+    with cronometro.fase(EXPORTACION):
+        reporte.escribir(os.path.join(directorio, f"{nombre}.txt"))
+        escribir_csv(tabla, os.path.join(directorio, f"{nombre}.csv"))
+        if excel:
+            from ..core.excel import escribir_xlsx
+            escribir_xlsx(tabla, os.path.join(directorio, f"{nombre}.xlsx"), nombre)
+
+
+def medir_vectorial(nombre, geometrias, tipo, args, directorio):
+    """Ejecuta varias veces el cálculo de líneas o polígonos y devuelve sus tiempos por fase"""
+    if nombre == 'lineas':
+        opciones = {'azimut': True, 'rumbo': True, 'distancia': True, 'dist_acum': True, 'cadenamiento': False}
+        crear_tabla, calcular = tabla_lineas, calcular_lineas
+    else:
+        opciones = {'internos': True, 'externos': True, 'azimut': True, 'rumbo': True, 'distancia': True,
+                    'dist_acum': True, 'area': True, 'perimetro': True, 'unidad_area': 0,
+                    'unidad_area_txt': "Metros cuadrados", 'linderos': False}
+        crear_tabla, calcular = tabla_poligonos, calcular_poligonos
+    formateador = FormateadorAngulos(args.formato, args.decimales)
+    capa = capa_qgis(geometrias, tipo, datos.crs_datos(args.planas)) if args.qgis else None
+
+    repeticiones = []
+    filas = 0
+    for _ in range(args.repeticiones):
+        cronometro = Cronometro()
+        tabla = crear_tabla(opciones)
+        if capa is not None:
+            entidades, motor = capa.getFeatures(), motor_qgis(capa, args.planas)
+        else:
+            entidades, motor = entidades_sinteticas(geometrias), MotorNucleo(args.planas)
+        reporte = calcular(entidades, tabla, motor, formateador, opciones, "sintetica", cronometro=cronometro)
+        exportar(cronometro, tabla, reporte, directorio, nombre, not args.sin_excel)
+        repeticiones.append(cronometro.resultados())
+        filas = len(tabla)
+
+    return {
+        'entidades': len(geometrias),
+        'vertices': int(sum(len(anillo) for g in geometrias
+                            for anillos in decodificar(g)[1] for anillo in anillos)),
+        'filas': filas,
+        **resumen_repeticiones(repeticiones)
+    }
+
+
+def medir_curvas(args, directorio):
+    """Curvas de nivel de un terreno ráster y de puntos interpolados con TIN e IDW"""
+    from osgeo import gdal, osr
+    from qgis.core import QgsFeature, QgsField, QgsGeometry, QgsPointXY, QgsProject, QgsVectorLayer
+    from qgis.PyQt.QtCore import QVariant
+    from ..core.curvas import curvas_rejilla
+    from ..tools.calculo_curvas import METODOS_INTERPOLACION, interpolar_puntos, interpolar_rejilla, generar_curvas
+
+    cotas = datos.terreno_sintetico(args.celdas, args.semilla)
+    x0, y0 = datos.ORIGEN_PROYECTADO
+    ruta_terreno = os.path.join(directorio, 'terreno.tif')
+    raster = gdal.GetDriverByName('GTiff').Create(ruta_terreno, args.celdas, args.celdas, 1, gdal.GDT_Float32)
+    raster.SetGeoTransform((x0, datos.TAMANO_CELDA, 0.0, y0, 0.0, -datos.TAMANO_CELDA))
+    referencia = osr.SpatialReference()
+    referencia.SetFromUserInput(datos.CRS_PROYECTADO)
+    raster.SetProjection(referencia.ExportToWkt())
+    raster.GetRasterBand(1).WriteArray(cotas)
+    raster = None
+
+    capa = QgsVectorLayer(f"Point?crs={datos.CRS_PROYECTADO}", "puntos", "memory")
+    capa.dataProvider().addAttributes([QgsField('z', QVariant.Double)])
+    capa.updateFields()
+    entidades = []
+    for x, y, z in datos.muestras_terreno(cotas, args.puntos, args.semilla).tolist():
+        entidad = QgsFeature(capa.fields())
+        entidad.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(x0 + x, y0 + y)))
+        entidad.setAttribute('z', z)
+        entidades.append(entidad)
+    capa.dataProvider().addFeatures(entidades)
+    capa.updateExtents()
+    QgsProject.instance().addMapLayer(capa, False)
+
+    resultados = {}
+    conjuntos = [('raster', None)] + list(enumerate(METODOS_INTERPOLACION))
+    for clave, metodo in conjuntos:
+        repeticiones = []
+        for _ in range(args.repeticiones):
+            cronometro = Cronometro()
+            origen = ruta_terreno
+            rejilla = None
+            if clave != 'raster':
+                # Interpolación en memoria; TIN sin SciPy pasa por un ráster de Processing
+                with cronometro.fase(CALCULO):
+                    rejilla = interpolar_rejilla(capa, 'z', clave)
+                    if rejilla is None:
+                        origen = interpolar_puntos(capa, 'z', clave, os.path.join(directorio, f'interp_{clave}.tif'))
+            with cronometro.fase(ESCRITURA):
+                if rejilla is not None:
+                    curvas_rejilla(rejilla, args.intervalo)
+                else:
+                    generar_curvas(origen, args.intervalo, 0.0, 1.0, os.path.join(directorio, f'curvas_{clave}.gpkg'))
+            repeticiones.append(cronometro.resultados())
+        nombre = 'raster' if metodo is None else metodo
+        resultados[nombre] = {'celdas': args.celdas ** 2,
+                              'puntos': 0 if metodo is None else args.puntos,
+                              **resumen_repeticiones(repeticiones)}
+    return resultados
+
+
+def resumen_repeticiones(repeticiones):
+    """Mejor tiempo de cada fase y del total entre todas las repeticiones"""
+    fases = list(repeticiones[0])
+    return {
+        'repeticiones': repeticiones,
+        'mejor': {fase: min(r[fase] for r in repeticiones) for fase in fases},
+        'total': min(sum(r.values()) for r in repeticiones),
+    }
+
+
+def imprimir(resultados):
+    for herramienta, resultado in resultados.items():
+        if 'mejor' not in resultado:
+            imprimir({f"{herramienta}/{k}": v for k, v in resultado.items()})
+            continue
+        fases = "  ".join(f"{fase} {segundos:.3f}s" for fase, segundos in resultado['mejor'].items())
+        print(f"{herramienta:<28} total {resultado['total']:.3f}s  {fases}")
+
+
+def main(argv=None):
+    args = argumentos(argv)
+    if 'curvas' in args.herramientas and not args.qgis:
+        print("Las curvas de nivel requieren --qgis; se omiten", file=sys.stderr)
+        args.herramientas = [h for h in args.herramientas if h != 'curvas']
+    aplicacion = iniciar_qgis() if args.qgis else None
+
+    temporal = None
+    directorio = args.directorio
+    if directorio is None:
+        temporal = tempfile.TemporaryDirectory()
+        directorio = temporal.name
+    os.makedirs(directorio, exist_ok=True)
+
+    resultados = {}
+    try:
+        if 'lineas' in args.herramientas:
+            geometrias = datos.lineas_sinteticas(args.entidades, args.vertices, args.multiparte,
+                                                 args.semilla, args.planas)
+            resultados['lineas'] = medir_vectorial('lineas', geometrias, 'MultiLineString', args, directorio)
+        if 'poligonos' in args.herramientas:
+            geometrias = datos.poligonos_sinteticos(args.entidades, args.vertices, args.multiparte,
+                                                    args.huecos, args.semilla, args.planas)
+            resultados['poligonos'] = medir_vectorial('poligonos', geometrias, 'MultiPolygon', args, directorio)
+        if 'curvas' in args.herramientas:
+            resultados['curvas'] = medir_curvas(args, directorio)
+    finally:
+        if temporal is not None:
+            temporal.cleanup()
+
+    entorno = {'python': platform.python_version(), 'numpy': np.__version__, 'plataforma': platform.platform()}
+    if aplicacion is not None:
+        from qgis.core import Qgis
+        entorno['qgis'] = Qgis.QGIS_VERSION
+    documento = {
+        'version': version_plugin(),
+        'fecha': datetime.now().isoformat(timespec='seconds'),
+        'modo': 'qgis' if args.qgis else 'nucleo',
+        'entorno': entorno,
+        'parametros': {clave: valor for clave, valor in vars(args).items() if clave not in ('salida', 'directorio')},
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as archivo:
+        json.dump(documento, archivo, indent=2, ensure_ascii=False)
+    imprimir(resultados)
+    print(f"Resultados guardados en {args.salida}")
+
+    if aplicacion is not None:
+        aplicacion.exitQgis()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Generación reproducible de datos topográficos sintéticos.
+
+Las líneas y polígonos se devuelven como geometrías WKB (lo mismo que
+entrega una capa de QGIS), y el terreno como una malla NumPy de cotas.
+"""
+import struct
+
+import numpy as np
+
+from ..core.wkb import LINEA, POLIGONO, MULTILINEA, MULTIPOLIGONO
+
+# Zona de trabajo en coordenadas geográficas (grados) y proyectadas (UTM 18S, metros)
+CRS_GEOGRAFICO = 'EPSG:4326'
+CRS_PROYECTADO = 'EPSG:32718'
+ORIGEN_GEOGRAFICO = (-77.0, -12.0)
+ORIGEN_PROYECTADO = (280000.0, 8660000.0)
+_ZONAS = {
+    False: {'origen': ORIGEN_GEOGRAFICO, 'extension': 0.5, 'paso': 1e-4, 'radio': 2e-3},
+    True: {'origen': ORIGEN_PROYECTADO, 'extension': 50000.0, 'paso': 10.0, 'radio': 200.0},
+}
+
+# Tamaño de celda del terreno sintético en metros
+TAMANO_CELDA = 10.0
+
+
+def crs_datos(proyectadas):
+    return CRS_PROYECTADO if proyectadas else CRS_GEOGRAFICO
+
+
+def _secuencia(coords):
+    coords = np.ascontiguousarray(coords, dtype='<f8')
+    return struct.pack('<I', len(coords)) + coords.tobytes()
+
+
+def wkb_linea(coords):
+    return struct.pack('<BI', 1, LINEA) + _secuencia(coords)
+
+
+def wkb_poligono(anillos):
+    return struct.pack('<BII', 1, POLIGONO, len(anillos)) + b''.join(_secuencia(a) for a in anillos)
+
+
+def wkb_multi(tipo, geometrias):
+    """Une geometrías WKB simples en una multigeometría del ``tipo`` indicado"""
+    return struct.pack('<BII', 1, tipo, len(geometrias)) + b''.join(geometrias)
+
+
+def _recorrido(rng, zona, n):
+    """Polilínea de ``n`` vértices como un paseo aleatorio dentro de la zona"""
+    inicio = np.asarray(zona['origen']) + rng.uniform(-1, 1, 2) * zona['extension']
+    pasos = rng.normal(size=(n - 1, 2)) * zona['paso']
+    return np.vstack([inicio, inicio + np.cumsum(pasos, axis=0)])
+
+
+def _anillo(rng, centro, radio, n, horario=False):
+    """Anillo cerrado de ``n`` vértices distintos (estrellado alrededor del centro)"""
+    angulos = np.sort(rng.uniform(0.0, 2.0 * np.pi, n))
+    if horario:
+        angulos = angulos[::-1]
+    radios = radio * (0.6 + 0.4 * rng.random(n))
+    coords = np.column_stack([centro[0] + radios * np.cos(angulos), centro[1] + radios * np.sin(angulos)])
+    return np.vstack([coords, coords[:1]])
+
+
+def lineas_sinteticas(entidades, vertices, multiparte=0.0, semilla=0, proyectadas=False):
+    """
+    Geometrías WKB de líneas.
+
+    :param vertices: Vértices por entidad (repartidos entre sus partes).
+    :param multiparte: Proporción de entidades con 2 o 3 partes.
+    """
+    rng = np.random.default_rng(semilla)
+    zona = _ZONAS[bool(proyectadas)]
+    geometrias = []
+    for _ in range(entidades):
+        n_partes = int(rng.integers(2, 4)) if rng.random() < multiparte else 1
+        partes = [wkb_linea(_recorrido(rng, zona, max(2, vertices // n_partes))) for _ in range(n_partes)]
+        geometrias.append(partes[0] if n_partes == 1 else wkb_multi(MULTILINEA, partes))
+    return geometrias
+
+
+def poligonos_sinteticos(entidades, vertices, multiparte=0.0, huecos=0.0, semilla=0, proyectadas=False):
+    """
+    Geometrías WKB de polígonos.
+
+    :param vertices: Vértices del anillo exterior de cada parte.
+    :param multiparte: Proporción de entidades con 2 partes.
+    :param huecos: Proporción de partes con un anillo interior.
+    """
+    rng = np.random.default_rng(semilla)
+    zona = _ZONAS[bool(proyectadas)]
+    radio = zona['radio']
+    geometrias = []
+    for _ in range(entidades):
+        centro = np.asarray(zona['origen']) + rng.uniform(-1, 1, 2) * zona['extension']
+        n_partes = 2 if rng.random() < multiparte else 1
+        partes = []
+        for i in range(n_partes):
+            centro_parte = centro + (3.0 * radio * i, 0.0)
+            anillos = [_anillo(rng, centro_parte, radio, max(3, vertices))]
+            if rng.random() < huecos:
+                anillos.append(_anillo(rng, centro_parte, radio * 0.3, max(3, vertices // 4), horario=True))
+            partes.append(wkb_poligono(anillos))
+        geometrias.append(partes[0] if n_partes == 1 else wkb_multi(MULTIPOLIGONO, partes))
+    return geometrias
+
+
+def terreno_sintetico(celdas, semilla=0, colinas=12):
+    """Malla (celdas, celdas) de cotas: una pendiente suave con colinas gaussianas"""
+    rng = np.random.default_rng(semilla)
+    ejes = np.arange(celdas, dtype=np.float64)
+    x, y = np.meshgrid(ejes, ejes)
+    cotas = 100.0 + 0.05 * x + 0.02 * y
+    for _ in range(colinas):
+        cx, cy = rng.uniform(0, celdas, 2)
+        sigma = rng.uniform(0.05, 0.2) * celdas
+        cotas += rng.uniform(10.0, 80.0) * np.exp(-((x - cx) ** 2 + (y - cy) ** 2) / (2.0 * sigma ** 2))
+    return cotas
+
+
+def muestras_terreno(cotas, puntos, semilla=0):
+    """
+    Puntos acotados tomados al azar sobre el terreno.
+    :return: Arreglo (puntos, 3) con x, y (metros, relativos al origen de la malla) y cota.
+    """
+    rng = np.random.default_rng(semilla)
+    filas, columnas = cotas.shape
+    i = rng.integers(0, filas, puntos)
+    j = rng.integers(0, columnas, puntos)
+    return np.column_stack([(j + 0.5) * TAMANO_CELDA, -(i + 0.5) * TAMANO_CELDA, cotas[i, j]])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+"""
+Entidades y motor de medición sin QGIS para medir solo el núcleo de cálculo.
+
+Tienen la misma interfaz que usan ``calcular_lineas`` y ``calcular_poligonos``
+de QgsFeature, QgsGeometry y MotorMedicion, pero trabajan directamente sobre
+WKB con ``core.medicion``. Los datos se miden en el mismo sistema en que se
+generan, por lo que no hay transformación de coordenadas.
+"""
+from ..core.geodesia import WGS84
+from ..core.medicion import GeometriaWkb, MotorWkb
+
+
+class EntidadSintetica:
+    __slots__ = ('_id', '_geometria')
+
+    def __init__(self, id_entidad, geometria):
+        self._id = id_entidad
+        self._geometria = geometria
+
+    def id(self):
+        return self._id
+
+    def geometry(self):
+        return self._geometria
+
+
+def entidades_sinteticas(geometrias):
+    """Entidades numeradas desde 1 a partir de una lista de geometrías WKB"""
+    return [EntidadSintetica(i, GeometriaWkb(g)) for i, g in enumerate(geometrias, 1)]
+
+
+class MotorNucleo(MotorWkb):
+    """MotorWkb sin transformación de coordenadas."""
+
+    def __init__(self, planas=False, elipsoide=WGS84):
+        super().__init__(planas, elipsoide)
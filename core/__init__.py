@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+"""
+Núcleo de cálculo del plugin Topografía.
+
+Los módulos de este paquete trabajan sobre arreglos de coordenadas NumPy y
+no dependen de Qt ni de QGIS, de modo que pueden usarse desde los diálogos,
+desde scripts o en procesos independientes.
+"""
+from importlib import import_module
+
+# API pública estable: nombre -> módulo que lo define. Los módulos se cargan
+# al primer acceso, de modo que importar el paquete no importa NumPy.
+_API = {
+    'FormateadorAngulos': 'angulos', 'DECIMAL': 'angulos', 'DMS': 'angulos', 'RADIANES': 'angulos',
+    'CacheArchivos': 'cache', 'clave_cache': 'cache',
+    'Cronometro': 'cronometro',
+    'Curvas': 'curvas', 'unir_tramos': 'curvas', 'curvas_rejilla': 'curvas',
+    'escribir_xlsx': 'excel', 'LIMITE_FILAS': 'excel',
+    'Elipsoide': 'geodesia', 'WGS84': 'geodesia', 'distancias_planas': 'geodesia',
+    'distancias_geodesicas': 'geodesia', 'medir_poligono': 'geodesia',
+    'areas_anillos': 'geodesia',
+    'Rejilla': 'interpolacion', 'ParametrosIdw': 'interpolacion', 'interpolar_idw': 'interpolacion',
+    'interpolar_tin': 'interpolacion',
+    'IndiceLinderos': 'linderos', 'indice_linderos': 'linderos',
+    'MotorWkb': 'medicion', 'GeometriaWkb': 'medicion',
+    'Vertices': 'poligonos', 'calcular_vertices': 'poligonos', 'angulos_vertices': 'poligonos',
+    'azimuts_lados': 'poligonos', 'convertir_area': 'poligonos', 'UNIDADES_AREA': 'poligonos',
+    'Anillos': 'poligonos', 'decodificar_anillos': 'poligonos', 'areas_con_signo': 'poligonos',
+    'AlmacenReporte': 'reporte',
+    'Segmentos': 'segmentos', 'calcular_segmentos': 'segmentos', 'azimut': 'segmentos',
+    'TablaResultados': 'tabla', 'escribir_csv': 'tabla', 'ENTERO': 'tabla', 'REAL': 'tabla', 'TEXTO': 'tabla',
+    'Triangulacion': 'tin', 'triangular': 'tin', 'curvas_tin': 'tin',
+    'decodificar': 'wkb',
+}
+
+__all__ = sorted(_API)
+
+
+def __getattr__(nombre):
+    if nombre not in _API:
+        raise AttributeError(f"module {__name__!r} has no attribute {nombre!r}")
+    valor = getattr(import_module(f".{_API[nombre]}", __name__), nombre)
+    globals()[nombre] = valor
+    return valor
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_API))
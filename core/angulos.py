@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Formato de ángulos y rumbos.
+
+``FormateadorAngulos`` se construye una sola vez con la configuración del
+diálogo y convierte arreglos completos de radianes en texto. El redondeo de
+los segundos y el acarreo a minutos y grados son los mismos que en el
+cálculo valor a valor, de modo que ambos caminos producen cadenas idénticas.
+"""
+import math
+from itertools import repeat
+
+import numpy as np
+
+# Formatos de salida (mismo orden que los combos de los diálogos)
+DECIMAL = 0
+DMS = 1
+RADIANES = 2
+
+
+class FormateadorAngulos:
+    """Convierte ángulos en radianes a texto según un formato y número de decimales fijos."""
+
+    def __init__(self, formato=DECIMAL, decimales=4):
+        """
+        :param formato: DECIMAL, DMS o RADIANES.
+        :param decimales: Decimales de los grados, segundos o radianes.
+        """
+        self.formato = formato
+        self.decimales = decimales
+        # Plantillas precompiladas: se evalúa la especificación de formato una sola vez
+        self._grados = f"{{:.{decimales}f}}°".format
+        self._radianes = f"{{:.{decimales}f}} rad".format
+        self._dms = "{}° {}' {}\"".format
+        self._rumbos = (
+            f"N {{:.{decimales}f}}° E".format,
+            f"S {{:.{decimales}f}}° E".format,
+            f"S {{:.{decimales}f}}° W".format,
+            f"N {{:.{decimales}f}}° W".format
+        )
+
+    # --- Valores individuales ---
+
+    def valor(self, angulo_rad):
+        """Valor numérico del ángulo: grados en [0, 360) o radianes si el formato es RADIANES"""
+        if self.formato == RADIANES:
+            return angulo_rad
+        return math.degrees(angulo_rad) % 360
+
+    def texto(self, angulo_rad):
+        """Texto de un único ángulo"""
+        if self.formato == RADIANES:
+            return self._radianes(angulo_rad)
+        angulo_grados = math.degrees(angulo_rad) % 360
+        if self.formato == DECIMAL:
+            return self._grados(angulo_grados)
+
+        grados = int(angulo_grados)
+        minutos_float = abs(angulo_grados - grados) * 60
+        minutos = int(minutos_float)
+        segundos = round((minutos_float - minutos) * 60, self.decimales)
+
+        # Ajustar redondeo
+        if segundos >= 60:
+            segundos -= 60
+            minutos += 1
+        if minutos >= 60:
+            minutos -= 60
+            grados += 1
+
+        return self._dms(grados, minutos, segundos)
+
+    def rumbo(self, azimut_rad):
+        """Rumbo por cuadrante de un único azimut"""
+        azimut_grados = math.degrees(azimut_rad)
+        if 0 <= azimut_grados < 90:
+            return self._rumbos[0](azimut_grados)
+        elif 90 <= azimut_grados < 180:
+            return self._rumbos[1](180 - azimut_grados)
+        elif 180 <= azimut_grados < 270:
+            return self._rumbos[2](azimut_grados - 180)
+        else:
+            return self._rumbos[3](360 - azimut_grados)
+
+    # --- Arreglos ---
+
+    def valores(self, angulos_rad):
+        """Versión vectorizada de ``valor``; devuelve un arreglo float64"""
+        angulos_rad = np.asarray(angulos_rad, dtype=np.float64)
+        if self.formato == RADIANES:
+            return angulos_rad
+        return np.mod(np.degrees(angulos_rad), 360.0)
+
+    def textos(self, angulos_rad):
+        """Versión vectorizada de ``texto``; devuelve una lista de cadenas"""
+        angulos_rad = np.asarray(angulos_rad, dtype=np.float64)
+        if self.formato == RADIANES:
+            return list(map(self._radianes, angulos_rad.tolist()))
+        angulos_grados = np.mod(np.degrees(angulos_rad), 360.0)
+        if self.formato == DECIMAL:
+            return list(map(self._grados, angulos_grados.tolist()))
+
+        grados = np.trunc(angulos_grados)
+        minutos_float = np.abs(angulos_grados - grados) * 60
+        minutos = np.trunc(minutos_float)
+        # round() de Python redondea sobre la representación decimal exacta;
+        # se mantiene para que el resultado coincida con ``texto``
+        segundos = np.array(list(map(round, ((minutos_float - minutos) * 60).tolist(),
+                                     repeat(self.decimales))), dtype=np.float64)
+
+        # Ajustar redondeo en bloque
+        acarreo = segundos >= 60
+        segundos = np.where(acarreo, segundos - 60, segundos)
+        minutos = minutos + acarreo
+        acarreo = minutos >= 60
+        minutos = np.where(acarreo, minutos - 60, minutos)
+        grados = grados + acarreo
+
+        return list(map(self._dms, grados.astype(np.int64).tolist(),
+                        minutos.astype(np.int64).tolist(), segundos.tolist()))
+
+    def rumbos(self, azimuts_rad):
+        """Versión vectorizada de ``rumbo``; devuelve una lista de cadenas"""
+        azimuts_grados = np.degrees(np.asarray(azimuts_rad, dtype=np.float64))
+        cuadrante = np.select(
+            [azimuts_grados < 90, azimuts_grados < 180, azimuts_grados < 270],
+            [0, 1, 2], 3)
+        # Los azimuts negativos caen en el último cuadrante, igual que en ``rumbo``
+        cuadrante[azimuts_grados < 0] = 3
+        angulo = np.choose(cuadrante, [azimuts_grados, 180 - azimuts_grados,
+                                       azimuts_grados - 180, 360 - azimuts_grados])
+        plantillas = self._rumbos
+        return [plantillas[c](a) for c, a in zip(cuadrante.tolist(), angulo.tolist())]
@@ -0,0 +1,145 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de archivos de resultados identificados por la huella de sus datos de origen.
+
+Cada resultado (una superficie interpolada, una capa de curvas) se guarda en
+un directorio con el nombre ``<clave>.<extension>``, donde la clave es la
+huella de todo lo que determina su contenido. Si se vuelve a pedir el mismo
+resultado se reutiliza el archivo. Cuando el directorio supera su tamaño
+máximo se eliminan los archivos usados hace más tiempo (la fecha de
+modificación se actualiza en cada uso), salvo los protegidos, p. ej. los
+que leen las capas del proyecto.
+"""
+import hashlib
+import os
+
+# Tamaño máximo del directorio de la caché, en bytes
+LIMITE_CACHE = 2 * 1024 ** 3
+
+# Sufijo de los archivos que aún se están escribiendo
+PARCIAL = 'parcial'
+
+
+def clave_cache(*partes):
+    """Huella hexadecimal de una secuencia de valores (números, textos, bytes o tuplas de ellos)"""
+    h = hashlib.blake2b(digest_size=20)
+    for parte in partes:
+        h.update(parte if isinstance(parte, bytes) else repr(parte).encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def huella_arreglos(*arreglos):
+    """Huella del contenido, la forma y el tipo de varios arreglos NumPy"""
+    h = hashlib.blake2b(digest_size=20)
+    for arreglo in arreglos:
+        h.update(repr((arreglo.shape, arreglo.dtype.str)).encode('utf-8'))
+        h.update(arreglo.tobytes())
+    return h.digest()
+
+
+def firma_archivo(ruta):
+    """
+    Identifica un archivo por su ruta, tamaño y fecha de modificación (leer
+    un ráster grande completo para calcular su huella costaría tanto como
+    procesarlo). Las fuentes que no son archivos se identifican por su texto.
+    """
+    if not os.path.isfile(ruta):
+        return ruta
+    estado = os.stat(ruta)
+    return (os.path.abspath(ruta), estado.st_size, estado.st_mtime_ns)
+
+
+class CacheArchivos:
+    """Directorio de archivos de resultados con expulsión LRU por tamaño."""
+
+    def __init__(self, directorio, limite=LIMITE_CACHE):
+        """
+        :param directorio: Directorio de la caché (se crea si no existe).
+        :param limite: Tamaño máximo del directorio, en bytes.
+        """
+        self.directorio = directorio
+        self.limite = limite
+        os.makedirs(directorio, exist_ok=True)
+
+    def ruta(self, clave, extension):
+        return os.path.join(self.directorio, f"{clave}.{extension}")
+
+    def buscar(self, clave, extension):
+        """Ruta del resultado guardado con esa clave (y lo marca como usado), o None"""
+        ruta = self.ruta(clave, extension)
+        if not os.path.isfile(ruta):
+            return None
+        try:
+            os.utime(ruta)
+        except OSError:
+            pass
+        return ruta
+
+    def guardar(self, clave, extension, escribir, protegidas=()):
+        """
+        Crea un resultado con ``escribir(ruta)`` y lo incorpora a la caché.
+
+        El archivo se escribe con un nombre provisional y se renombra al
+        terminar, de modo que un cálculo interrumpido nunca deja un resultado
+        incompleto con la clave definitiva.
+        :param escribir: Función que escribe el resultado en la ruta recibida y
+            devuelve una ruta (o None si no produjo resultado).
+        :param protegidas: Rutas que no deben eliminarse al hacer sitio.
+        :return: Ruta definitiva, o None si ``escribir`` no produjo resultado.
+        """
+        ruta = self.ruta(clave, extension)
+        provisional = self.ruta(f"{clave}.{PARCIAL}", extension)
+        try:
+            if not escribir(provisional):
+                return None
+            os.replace(provisional, ruta)
+        finally:
+            self._eliminar_grupo(f"{clave}.{PARCIAL}")
+        self.liberar(set(protegidas) | {ruta})
+        return ruta
+
+    def _grupos(self):
+        """{clave: (tamaño total, último uso, rutas)} de los archivos del directorio"""
+        grupos = {}
+        for entrada in os.scandir(self.directorio):
+            if not entrada.is_file():
+                continue
+            # Los archivos auxiliares (p. ej. ``.gpkg-wal``) van con su resultado
+            clave = entrada.name.split('.')[0]
+            estado = entrada.stat()
+            tamano, uso, rutas = grupos.get(clave, (0, 0, []))
+            grupos[clave] = (tamano + estado.st_size, max(uso, estado.st_mtime), rutas + [entrada.path])
+        return grupos
+
+    def _eliminar_grupo(self, prefijo):
+        for entrada in os.scandir(self.directorio):
+            if entrada.name.startswith(prefijo + '.'):
+                try:
+                    os.remove(entrada.path)
+                except OSError:
+                    pass
+
+    def liberar(self, protegidas=()):
+        """
+        Elimina los resultados usados hace más tiempo hasta que el directorio
+        no supere el límite. Los archivos protegidos o que no se pueden borrar
+        (abiertos en otro programa) se conservan.
+        :return: Bytes liberados.
+        """
+        protegidas = {os.path.normcase(os.path.abspath(ruta)) for ruta in protegidas}
+        grupos = self._grupos()
+        total = sum(tamano for tamano, _, _ in grupos.values())
+        liberados = 0
+        for tamano, _, rutas in sorted(grupos.values(), key=lambda grupo: grupo[1]):
+            if total - liberados <= self.limite:
+                break
+            if any(os.path.normcase(os.path.abspath(ruta)) in protegidas for ruta in rutas):
+                continue
+            try:
+                for ruta in rutas:
+                    os.remove(ruta)
+            except OSError:
+                continue
+            liberados += tamano
+        return liberados
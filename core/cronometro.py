@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+Medición del tiempo y la memoria de cada fase de un cálculo.
+
+Las fases se acumulan por nombre, de modo que una fase que se repite por
+cada entidad (por ejemplo el formateo) se reporta como un único total. Una
+fase puede medirse dentro de otra (p. ej. ``processing.run`` dentro de la
+interpolación); los porcentajes se calculan sobre el tiempo total de reloj.
+"""
+from collections import OrderedDict
+from datetime import datetime
+from time import perf_counter
+import json
+import sys
+
+# Fases comunes de las herramientas
+LECTURA = 'lectura'          # Obtención de entidades de la fuente
+CALCULO = 'calculo'          # Mediciones y geometría
+FORMATO = 'formato'          # Conversión de ángulos a texto
+ESCRITURA = 'escritura'      # Tabla de resultados y capas de salida
+REPORTE = 'reporte'          # Registros del reporte
+EXPORTACION = 'exportacion'  # Archivos de reporte, CSV, Excel y PDF
+PROCESOS = 'procesos'        # Espera de los resultados de los procesos de trabajo
+# Fases de curvas de nivel
+INTERPOLACION = 'interpolacion'
+CURVAS = 'curvas'
+CARGA = 'carga'
+PROCESSING = 'processing.run'  # Llamadas a algoritmos de Processing (incluida en otras fases)
+
+NOMBRES_FASES = {
+    LECTURA: "Lectura de entidades",
+    CALCULO: "Cálculo",
+    FORMATO: "Formato de ángulos",
+    ESCRITURA: "Escritura de resultados",
+    REPORTE: "Reporte",
+    EXPORTACION: "Exportación",
+    PROCESOS: "Procesos de trabajo",
+    INTERPOLACION: "Interpolación",
+    CURVAS: "Curvas de nivel",
+    CARGA: "Carga de capas",
+    PROCESSING: "processing.run",
+}
+
+# Contadores para el rendimiento por segundo
+ENTIDADES = 'entidades'
+VERTICES = 'vertices'
+
+# Intervalo mínimo (segundos) entre dos lecturas de la memoria del proceso
+INTERVALO_MEMORIA = 0.1
+
+
+def _memoria_pico_windows():
+    import ctypes
+    from ctypes import wintypes
+
+    class ContadoresMemoria(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    contadores = ContadoresMemoria()
+    contadores.cb = ctypes.sizeof(contadores)
+    kernel32 = ctypes.windll.kernel32
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(contadores),
+                                                     contadores.cb):
+        return None
+    return contadores.PeakWorkingSetSize
+
+
+def memoria_pico():
+    """Memoria residente máxima alcanzada por el proceso, en bytes (None si no se puede medir)"""
+    try:
+        if sys.platform == 'win32':
+            return _memoria_pico_windows()
+        import resource
+        pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except Exception:
+        return None
+    # Linux informa kilobytes y macOS bytes
+    return pico if sys.platform == 'darwin' else pico * 1024
+
+
+class _Fase:
+    """Contexto que suma a una fase el tiempo transcurrido dentro del bloque ``with``"""
+    __slots__ = ('cronometro', 'nombre', 'inicio')
+
+    def __init__(self, cronometro, nombre):
+        self.cronometro = cronometro
+        self.nombre = nombre
+
+    def __enter__(self):
+        self.inicio = perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.cronometro.sumar(self.nombre, perf_counter() - self.inicio)
+        return False
+
+
+class Cronometro:
+    """
+    Tiempo acumulado (en segundos), número de mediciones y memoria pico de
+    cada fase, junto con el tiempo total de reloj y contadores de trabajo.
+    """
+
+    def __init__(self):
+        self.tiempos = OrderedDict()
+        self.mediciones = OrderedDict()
+        self.memoria = OrderedDict()
+        self.contadores = OrderedDict()
+        self.memoria_inicial = memoria_pico()
+        self._ultima_memoria = perf_counter()
+        self._inicio = self._ultima_memoria
+        self._fin = None
+        self._despues = 0.0
+
+    def sumar(self, nombre, segundos):
+        self.tiempos[nombre] = self.tiempos.get(nombre, 0.0) + segundos
+        self.mediciones[nombre] = self.mediciones.get(nombre, 0) + 1
+        if self._fin is not None:
+            self._despues += segundos
+        # La memoria se lee de forma espaciada, pero al menos una vez por fase
+        ahora = perf_counter()
+        if nombre not in self.memoria or ahora - self._ultima_memoria >= INTERVALO_MEMORIA:
+            self._ultima_memoria = ahora
+            self.memoria[nombre] = memoria_pico()
+
+    def contar(self, nombre, n=1):
+        self.contadores[nombre] = self.contadores.get(nombre, 0) + n
+
+    def fase(self, nombre):
+        """Contexto ``with`` que mide un bloque dentro de la fase ``nombre``"""
+        return _Fase(self, nombre)
+
+    def iterar(self, nombre, iterable):
+        """Recorre ``iterable`` sumando a la fase ``nombre`` el tiempo de obtener cada elemento"""
+        iterador = iter(iterable)
+        while True:
+            inicio = perf_counter()
+            try:
+                elemento = next(iterador)
+            except StopIteration:
+                self.sumar(nombre, perf_counter() - inicio)
+                return
+            self.sumar(nombre, perf_counter() - inicio)
+            yield elemento
+
+    def detener(self):
+        """
+        Fija el final del tiempo de reloj. Las fases medidas después (p. ej.
+        exportaciones en el hilo principal) se suman al total sin contar las
+        esperas entre ellas. Solo la primera llamada tiene efecto.
+        """
+        if self._fin is None:
+            self._fin = perf_counter()
+
+    def total(self):
+        """Tiempo de reloj hasta ``detener()`` (o hasta ahora) más las fases medidas después"""
+        return (self._fin if self._fin is not None else perf_counter()) - self._inicio + self._despues
+
+    def memoria_maxima(self):
+        valores = [m for m in self.memoria.values() if m is not None]
+        return max(valores) if valores else None
+
+    def resultados(self):
+        """Diccionario ``{fase: segundos}`` en el orden en que aparecieron las fases"""
+        return dict(self.tiempos)
+
+    def filas(self):
+        """Filas ``(nombre visible, segundos, % del total, mediciones, memoria pico en bytes)``"""
+        total = self.total()
+        return [(NOMBRES_FASES.get(fase, fase), segundos, 100.0 * segundos / total if total else 0.0,
+                 self.mediciones[fase], self.memoria.get(fase))
+                for fase, segundos in self.tiempos.items()]
+
+    def resumen(self):
+        """Línea de texto con el tiempo total, el rendimiento y la memoria pico"""
+        total = self.total()
+        partes = [f"Tiempo total: {total:.3f} s"]
+        for contador, nombre in ((ENTIDADES, "entidades"), (VERTICES, "vértices")):
+            if contador in self.contadores and total > 0:
+                partes.append(f"{self.contadores[contador] / total:,.0f} {nombre}/s")
+        pico = self.memoria_maxima()
+        if pico is not None:
+            texto = f"memoria pico: {pico / 1048576:.0f} MB"
+            if self.memoria_inicial is not None and pico > self.memoria_inicial:
+                texto += f" (+{(pico - self.memoria_inicial) / 1048576:.0f} MB)"
+            partes.append(texto)
+        return " - ".join(partes)
+
+    def texto(self):
+        """Tabla de fases en texto plano, para el registro de mensajes"""
+        lineas = [self.resumen()]
+        for nombre, segundos, porcentaje, mediciones, memoria in self.filas():
+            memoria_txt = f"{memoria / 1048576:.0f} MB" if memoria is not None else "-"
+            lineas.append(f"  {nombre:<24} {segundos:10.3f} s {porcentaje:6.1f} % "
+                          f"{mediciones:>9} {memoria_txt:>9}")
+        return "\n".join(lineas)
+
+    def registro(self, **datos):
+        """Diccionario serializable con todas las mediciones y los ``datos`` adicionales"""
+        return {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            **datos,
+            'duracion': self.total(),
+            'memoria_inicial': self.memoria_inicial,
+            'memoria_pico': self.memoria_maxima(),
+            'contadores': dict(self.contadores),
+            'fases': {fase: {'segundos': segundos, 'mediciones': self.mediciones[fase],
+                             'memoria_pico': self.memoria.get(fase)}
+                      for fase, segundos in self.tiempos.items()},
+        }
+
+
+def agregar_jsonl(ruta, registro):
+    """Añade un registro como una línea JSON al final del archivo de telemetría"""
+    with open(ruta, 'a', encoding='utf-8') as archivo:
+        archivo.write(json.dumps(registro, ensure_ascii=False) + "\n")
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""
+Curvas de nivel de ráster grandes por teselas, en varios procesos.
+
+El ráster se divide en ventanas que comparten con sus vecinas la fila o
+columna de píxeles del borde. Cada proceso de trabajo genera con GDAL las
+curvas de su ventana y las recorta a la franja que le corresponde (de centro
+a centro de los píxeles compartidos): en la costura ambas ventanas calculan
+el mismo cruce a partir de los mismos dos píxeles, de modo que los tramos
+vecinos se tocan exactamente. El proceso principal une los tramos de la
+misma cota por sus extremos y obtiene las mismas líneas que un único paso de
+``gdal_contour`` sobre todo el ráster.
+
+Las coordenadas se manejan en píxeles (columna, fila) hasta el final, donde
+se pasan al sistema del ráster con su geotransformación. Los procesos solo
+importan este paquete, NumPy y ``osgeo``.
+"""
+from collections import namedtuple
+from contextlib import nullcontext
+from functools import partial
+
+import numpy as np
+
+from .cronometro import CALCULO, PROCESOS
+from .linderos import ajustar
+from .paralelo import ejecutar_bloques
+
+# Lado (en píxeles) de cada tesela, sin contar la fila y la columna compartidas
+TAMANO_TESELA = 2048
+# Píxeles mínimos del ráster para repartirlo en teselas
+MINIMO_PIXELES = 4096 * 4096
+# Rejilla (en píxeles) con la que se comparan los extremos de los tramos en las costuras
+TOLERANCIA_COSTURA = 1e-6
+
+# Ráster que reabre cada proceso de trabajo: ruta, banda, tamaño en píxeles,
+# geotransformación GDAL, valor sin datos (o None) y sistema en WKT
+OrigenRaster = namedtuple('OrigenRaster', ['ruta', 'banda', 'ancho', 'alto', 'geotransformacion',
+                                           'sin_datos', 'crs'])
+
+# Ventana de lectura en píxeles
+Ventana = namedtuple('Ventana', ['columna', 'fila', 'ancho', 'alto'])
+
+Curvas = namedtuple('Curvas', ['cota', 'coords', 'inicios'])
+Curvas.__doc__ = (
+    "Líneas de un conjunto de curvas: ``cota`` de cada línea, ``coords`` (n, 2) con los vértices "
+    "de todas las líneas seguidos e ``inicios`` con la posición del primer vértice de cada una.")
+
+
+def origen_raster(ruta, banda=1):
+    """
+    Describe el ráster para que los procesos de trabajo lo lean con GDAL.
+    :return: OrigenRaster, o None si GDAL no puede abrirlo.
+    """
+    try:
+        from osgeo import gdal
+    except ImportError:
+        return None
+    gdal.UseExceptions()
+    try:
+        datos = gdal.Open(ruta)
+    except RuntimeError:
+        return None
+    if datos is None or not 1 <= banda <= datos.RasterCount:
+        return None
+    return OrigenRaster(ruta, banda, datos.RasterXSize, datos.RasterYSize, tuple(datos.GetGeoTransform()),
+                        datos.GetRasterBand(banda).GetNoDataValue(), datos.GetProjection())
+
+
+def dividir_raster(ancho, alto, tamano=TAMANO_TESELA):
+    """
+    Ventanas que cubren el ráster; cada una comparte con la siguiente su
+    última columna (o fila) de píxeles.
+    """
+    def tramos(total):
+        return [(inicio, min(tamano + 1, total - inicio)) for inicio in range(0, max(total - 1, 1), tamano)]
+
+    return [Ventana(columna, fila, n_columnas, n_filas)
+            for fila, n_filas in tramos(alto) for columna, n_columnas in tramos(ancho)]
+
+
+def limites_ventana(ventana, ancho, alto):
+    """
+    Franja de la ventana en coordenadas de píxel (xmin, ymin, xmax, ymax):
+    de centro a centro de los píxeles compartidos con las ventanas vecinas y
+    sin límite en los bordes del ráster.
+    """
+    x0, y0 = ventana.columna, ventana.fila
+    x1, y1 = x0 + ventana.ancho, y0 + ventana.alto
+    return (x0 + 0.5 if x0 > 0 else -np.inf, y0 + 0.5 if y0 > 0 else -np.inf,
+            x1 - 0.5 if x1 < ancho else np.inf, y1 - 0.5 if y1 < alto else np.inf)
+
+
+def _recortar_semiplano(linea, eje, limite, sentido):
+    """
+    Partes de la línea (m, 2) con ``sentido * coordenada <= sentido * limite``.
+    Las partes terminan en el punto donde la línea cruza el límite.
+    """
+    dentro = sentido * linea[:, eje] <= sentido * limite
+    if dentro.all():
+        return [linea]
+    if not dentro.any():
+        return []
+    partes = []
+    cambios = np.flatnonzero(np.diff(dentro.view(np.int8))) + 1
+    for inicio, fin in zip(np.concatenate(([0], cambios)), np.concatenate((cambios, [len(linea)]))):
+        if not dentro[inicio]:
+            continue
+        parte = [linea[inicio:fin]]
+        for interior, exterior, al_final in ((inicio, inicio - 1, False), (fin - 1, fin, True)):
+            if exterior < 0 or exterior >= len(linea) or linea[interior, eje] == limite:
+                continue
+            p, q = linea[interior], linea[exterior]
+            cruce = p + (q - p) * ((limite - p[eje]) / (q[eje] - p[eje]))
+            cruce[eje] = limite
+            parte.insert(len(parte) if al_final else 0, cruce[None, :])
+        parte = np.concatenate(parte)
+        if len(parte) > 1:
+            partes.append(parte)
+    return partes
+
+
+def recortar_linea(linea, limites):
+    """Partes de la línea (m, 2) dentro del rectángulo ``limites`` (xmin, ymin, xmax, ymax)"""
+    partes = [linea]
+    for eje, limite, sentido in ((0, limites[0], -1), (1, limites[1], -1), (0, limites[2], 1), (1, limites[3], 1)):
+        if np.isinf(limite):
+            continue
+        partes = [recorte for parte in partes for recorte in _recortar_semiplano(parte, eje, limite, sentido)]
+    return partes
+
+
+def _agrupar(cotas, lineas):
+    """Curvas a partir de una lista de cotas y otra de arreglos de vértices"""
+    if not lineas:
+        return Curvas(np.empty(0), np.empty((0, 2)), np.empty(0, dtype=np.int64))
+    largos = np.fromiter((len(linea) for linea in lineas), dtype=np.int64, count=len(lineas))
+    inicios = np.concatenate(([0], np.cumsum(largos)[:-1]))
+    return Curvas(np.asarray(cotas, dtype=np.float64), np.concatenate(lineas), inicios)
+
+
+def lineas_gdal(valores, geotransformacion, intervalo, base=0.0, factor_z=1.0, sin_datos=None):
+    """
+    Genera con GDAL las curvas de un arreglo de cotas, en un ráster y una capa en memoria.
+    :return: Generador de pares (cota, vértices (m, 2)).
+    """
+    from osgeo import gdal, ogr
+    gdal.UseExceptions()
+    ogr.UseExceptions()
+
+    valores = np.asarray(valores, dtype=np.float64)
+    if factor_z != 1.0:
+        vacias = valores == sin_datos if sin_datos is not None else None
+        valores = valores * factor_z
+        if vacias is not None:
+            valores[vacias] = sin_datos
+
+    filas, columnas = valores.shape
+    memoria = gdal.GetDriverByName('MEM').Create('', columnas, filas, 1, gdal.GDT_Float64)
+    memoria.SetGeoTransform(tuple(geotransformacion))
+    banda = memoria.GetRasterBand(1)
+    banda.WriteArray(valores)
+
+    fuente = ogr.GetDriverByName('Memory').CreateDataSource('')
+    capa = fuente.CreateLayer('curvas', geom_type=ogr.wkbLineString)
+    capa.CreateField(ogr.FieldDefn('ID', ogr.OFTInteger))
+    capa.CreateField(ogr.FieldDefn('ELEV', ogr.OFTReal))
+    opciones = [f"LEVEL_INTERVAL={intervalo!r}", f"LEVEL_BASE={base!r}", "ID_FIELD=0", "ELEV_FIELD=1"]
+    if sin_datos is not None:
+        banda.SetNoDataValue(sin_datos)
+        opciones.append(f"NODATA={sin_datos!r}")
+    gdal.ContourGenerateEx(banda, capa, options=opciones)
+
+    for feature in capa:
+        geom = feature.GetGeometryRef()
+        if geom is None or geom.GetPointCount() < 2:
+            continue
+        yield feature.GetField(1), np.array(geom.GetPoints(), dtype=np.float64)[:, :2]
+
+
+def curvas_ventana(origen, intervalo, base, factor_z, ventana):
+    """
+    Genera las curvas de una ventana con GDAL y las recorta a su franja.
+    Se ejecuta dentro de los procesos de trabajo.
+    :return: Curvas de la ventana en coordenadas de píxel del ráster completo.
+    """
+    from osgeo import gdal
+    gdal.UseExceptions()
+
+    datos = gdal.Open(origen.ruta)
+    valores = datos.GetRasterBand(origen.banda).ReadAsArray(
+        ventana.columna, ventana.fila, ventana.ancho, ventana.alto)
+    # La geotransformación de la ventana da directamente coordenadas de píxel del ráster completo
+    geotransformacion = (ventana.columna, 1.0, 0.0, ventana.fila, 0.0, 1.0)
+    limites = limites_ventana(ventana, origen.ancho, origen.alto)
+    cotas = []
+    lineas = []
+    for cota, linea in lineas_gdal(valores, geotransformacion, intervalo, base, factor_z, origen.sin_datos):
+        for parte in recortar_linea(linea, limites):
+            cotas.append(cota)
+            lineas.append(parte)
+    return _agrupar(cotas, lineas)
+
+
+def curvas_raster(origen, intervalo, base=0.0, factor_z=1.0):
+    """
+    Curvas de todo el ráster en un solo paso, con la misma rutina que cada
+    tesela (``lineas_gdal``): la cota base y el factor Z se aplican igual
+    tanto si el ráster se divide como si no.
+    :return: Curvas en el sistema del ráster.
+    """
+    curvas = curvas_ventana(origen, intervalo, base, factor_z, Ventana(0, 0, origen.ancho, origen.alto))
+    return curvas._replace(coords=a_coordenadas(curvas.coords, origen.geotransformacion))
+
+
+def curvas_rejilla(rejilla, intervalo, base=0.0, factor_z=1.0):
+    """Curvas de una ``interpolacion.Rejilla`` en memoria, en un solo paso"""
+    cotas = []
+    lineas = []
+    for cota, linea in lineas_gdal(rejilla.valores, rejilla.geotransformacion, intervalo, base, factor_z,
+                                   rejilla.sin_datos):
+        cotas.append(cota)
+        lineas.append(linea)
+    return _agrupar(cotas, lineas)
+
+
+def unir_tramos(curvas, tolerancia=TOLERANCIA_COSTURA):
+    """
+    Une los tramos de la misma cota cuyos extremos coinciden (tras ajustarlos
+    a la rejilla ``tolerancia``). Los extremos que comparten más de dos tramos
+    no se unen.
+    :return: Curvas con las líneas unidas; las cerradas repiten el primer vértice al final.
+    """
+    n = len(curvas.inicios)
+    if not n:
+        return curvas
+    finales = np.append(curvas.inicios[1:], len(curvas.coords)) - 1
+    extremos = curvas.coords[np.column_stack((curvas.inicios, finales)).reshape(-1)]
+    _, nivel = np.unique(curvas.cota, return_inverse=True)
+    claves = np.column_stack((np.repeat(nivel.reshape(-1), 2), ajustar(extremos, tolerancia)))
+    _, grupo, repeticiones = np.unique(claves, axis=0, return_inverse=True, return_counts=True)
+    grupo = grupo.reshape(-1)
+
+    # Extremo 2i es el inicio del tramo i y 2i + 1 su final; pareja[e] es el extremo unido a e
+    pareja = np.full(2 * n, -1, dtype=np.int64)
+    unidos = np.flatnonzero(repeticiones[grupo] == 2)
+    unidos = unidos[np.argsort(grupo[unidos], kind='stable')].reshape(-1, 2)
+    pareja[unidos[:, 0]] = unidos[:, 1]
+    pareja[unidos[:, 1]] = unidos[:, 0]
+    pareja = pareja.tolist()
+
+    visitado = np.zeros(n, dtype=bool)
+    cotas = []
+    lineas = []
+    for tramo in range(n):
+        if visitado[tramo]:
+            continue
+        # Retroceder hasta el primer tramo de la cadena (o dar la vuelta si es cerrada)
+        entrada = 2 * tramo
+        while pareja[entrada] >= 0 and pareja[entrada] // 2 != tramo:
+            entrada = pareja[entrada] ^ 1
+        piezas = []
+        while True:
+            actual = entrada // 2
+            visitado[actual] = True
+            pieza = curvas.coords[curvas.inicios[actual]:finales[actual] + 1]
+            if entrada & 1:
+                pieza = pieza[::-1]
+            # El vértice de unión solo se conserva en el primer tramo
+            piezas.append(pieza if not piezas else pieza[1:])
+            siguiente = pareja[entrada ^ 1]
+            if siguiente < 0 or visitado[siguiente // 2]:
+                break
+            entrada = siguiente
+        cotas.append(curvas.cota[tramo])
+        lineas.append(np.concatenate(piezas))
+    return _agrupar(cotas, lineas)
+
+
+def a_coordenadas(coords, geotransformacion):
+    """Coordenadas de píxel (columna, fila) al sistema del ráster"""
+    g = geotransformacion
+    x = g[0] + coords[:, 0] * g[1] + coords[:, 1] * g[2]
+    y = g[3] + coords[:, 0] * g[4] + coords[:, 1] * g[5]
+    return np.column_stack((x, y))
+
+
+def curvas_teselas(origen, ventanas, trabajadores, intervalo, base=0.0, factor_z=1.0,
+                   cancelado=None, informar=None, cronometro=None):
+    """
+    Genera las curvas de todas las ventanas en un grupo de procesos y une los
+    tramos en las costuras.
+    :param cancelado: Función sin argumentos que devuelve True para detener el cálculo.
+    :param informar: ``informar(porcentaje)`` al terminar cada ventana.
+    :return: Curvas en el sistema del ráster, o None si se canceló.
+    """
+    resultados = ejecutar_bloques(partial(curvas_ventana, origen, intervalo, base, factor_z),
+                                  ventanas, trabajadores)
+    if cronometro is not None:
+        resultados = cronometro.iterar(PROCESOS, resultados)
+
+    cotas, coords, inicios = [], [], []
+    vertices = 0
+    try:
+        for procesadas, parcial in enumerate(resultados, 1):
+            if cancelado is not None and cancelado():
+                return None
+            cotas.append(parcial.cota)
+            coords.append(parcial.coords)
+            inicios.append(parcial.inicios + vertices)
+            vertices += len(parcial.coords)
+            if informar is not None:
+                informar(100 * procesadas // len(ventanas))
+    finally:
+        # Al cancelar, cerrar el generador termina los procesos
+        resultados.close()
+
+    with cronometro.fase(CALCULO) if cronometro is not None else nullcontext():
+        curvas = unir_tramos(Curvas(np.concatenate(cotas), np.concatenate(coords), np.concatenate(inicios)))
+        return curvas._replace(coords=a_coordenadas(curvas.coords, origen.geotransformacion))
+
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de tablas de resultados a Excel en modo de solo escritura.
+
+Las filas se escriben en flujo (openpyxl ``write_only``), sin mantener en
+memoria un objeto por celda. Cuando una hoja alcanza el límite de filas de
+Excel se continúa automáticamente en una hoja nueva.
+
+openpyxl se importa al escribir para no alargar la carga del núcleo.
+"""
+# Máximo de filas por hoja en Excel (incluida la fila de encabezados)
+LIMITE_FILAS = 1048576
+
+# Longitud máxima del nombre de una hoja y caracteres no permitidos
+_LONGITUD_TITULO = 31
+_CARACTERES_INVALIDOS = str.maketrans({c: '_' for c in '[]:*?/\\'})
+
+
+def titulo_hoja(titulo, numero=1):
+    """Nombre válido de hoja; a partir de la segunda se añade el número entre paréntesis"""
+    titulo = titulo.translate(_CARACTERES_INVALIDOS)
+    sufijo = f" ({numero})" if numero > 1 else ""
+    return titulo[:_LONGITUD_TITULO - len(sufijo)] + sufijo
+
+
+def _escribir_hojas(wb, titulo, encabezados, filas, limite_filas):
+    """Escribe filas en hojas sucesivas de como máximo ``limite_filas`` filas"""
+    filas_por_hoja = limite_filas - 1
+    hoja = wb.create_sheet(titulo_hoja(titulo))
+    hoja.append(encabezados)
+    n_hojas = 1
+    en_hoja = 0
+    for fila in filas:
+        if en_hoja == filas_por_hoja:
+            n_hojas += 1
+            hoja = wb.create_sheet(titulo_hoja(titulo, n_hojas))
+            hoja.append(encabezados)
+            en_hoja = 0
+        hoja.append(fila)
+        en_hoja += 1
+    return n_hojas
+
+
+def escribir_xlsx(tabla, ruta, titulo, resumen=None, limite_filas=LIMITE_FILAS):
+    """
+    Escribe las columnas visibles de una TablaResultados en un archivo XLSX.
+
+    Los números se guardan como celdas numéricas y los nulos como celdas vacías.
+
+    :param titulo: Nombre base de las hojas de datos.
+    :param resumen: Tupla opcional ``(titulo, encabezados, filas)`` para una
+        hoja adicional de resumen.
+    :param limite_filas: Filas por hoja, incluido el encabezado.
+    :return: Número de hojas de datos escritas.
+    """
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    n_hojas = _escribir_hojas(wb, titulo, tabla.nombres(), tabla.filas(), limite_filas)
+    if resumen is not None:
+        titulo_resumen, encabezados_resumen, filas_resumen = resumen
+        _escribir_hojas(wb, titulo_resumen, encabezados_resumen, filas_resumen, limite_filas)
+    wb.save(ruta)
+    return n_hojas
@@ -0,0 +1,324 @@
+# -*- coding: utf-8 -*-
+"""
+Mediciones geodésicas y planas vectorizadas.
+
+Las distancias elipsoidales usan la fórmula inversa de Vincenty y las áreas
+el algoritmo de ``QgsDistanceArea::computePolygonArea`` (heredado de GRASS),
+de modo que los resultados coinciden con los de QGIS sin llamar a QGIS por
+segmento. Las comprobaciones están en ``tests/test_geodesia.py``.
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .poligonos import anteriores, areas_con_signo
+from .segmentos import azimut
+
+
+class Elipsoide(namedtuple('Elipsoide', ['semieje_mayor', 'semieje_menor'])):
+    """Elipsoide de referencia definido por sus semiejes en metros."""
+    __slots__ = ()
+
+    @property
+    def aplanamiento(self):
+        return (self.semieje_mayor - self.semieje_menor) / self.semieje_mayor
+
+
+WGS84 = Elipsoide(6378137.0, 6356752.314245179)
+
+# Pasos de la bisección del problema inverso cuando Vincenty no converge
+ITERACIONES_BISECCION = 64
+# Coseno mínimo de la latitud reducida (evita dividir por cero en los polos)
+MINIMO_COSENO = np.sqrt(np.finfo(np.float64).tiny)
+
+# Diferencia de latitud (radianes) por debajo de la cual un lado se trata
+# como paralelo en el cálculo de áreas (el umbral ``thresh`` de QGIS y GRASS)
+TOLERANCIA_LATITUD = 1e-6
+
+
+def distancias_planas(x1, y1, x2, y2):
+    """Distancias y azimuts de cuadrícula entre pares de puntos"""
+    dx = np.asarray(x2, dtype=np.float64) - np.asarray(x1, dtype=np.float64)
+    dy = np.asarray(y2, dtype=np.float64) - np.asarray(y1, dtype=np.float64)
+    return np.hypot(dx, dy), azimut(dx, dy)
+
+
+def _series_vincenty(sin_alfa, cos2_alfa, sigma, cos_2sm, elipsoide):
+    """
+    Diferencia de longitud elipsoidal menos la de la esfera auxiliar y
+    distancia de un tramo de geodésica de ``sigma`` radianes (series de Vincenty).
+    :return: (corrección de longitud, distancia)
+    """
+    a = elipsoide.semieje_mayor
+    b = elipsoide.semieje_menor
+    f = elipsoide.aplanamiento
+    sin_sigma, cos_sigma = np.sin(sigma), np.cos(sigma)
+    C = f / 16 * cos2_alfa * (4 + f * (4 - 3 * cos2_alfa))
+    correccion = (1 - C) * f * sin_alfa * (
+        sigma + C * sin_sigma * (cos_2sm + C * cos_sigma * (-1 + 2 * cos_2sm ** 2)))
+    u2 = cos2_alfa * (a ** 2 - b ** 2) / b ** 2
+    A = 1 + u2 / 16384 * (4096 + u2 * (-768 + u2 * (320 - 175 * u2)))
+    B = u2 / 1024 * (256 + u2 * (-128 + u2 * (74 - 47 * u2)))
+    delta_sigma = B * sin_sigma * (cos_2sm + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sm ** 2)
+        - B / 6 * cos_2sm * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sm ** 2)))
+    return correccion, b * A * (sigma - delta_sigma)
+
+
+def _inversa_biseccion(lon1, lat1, lon2, lat2, elipsoide, iteraciones=ITERACIONES_BISECCION):
+    """
+    Problema inverso resolviendo el azimut de salida por bisección, para los
+    pares en los que la iteración de Vincenty no converge (casi antípodas).
+
+    Como en el método de Karney, el problema se normaliza (diferencia de
+    longitud en [0, π], ``|lat1| >= |lat2|`` y ``lat1 <= 0``): así la
+    diferencia de longitud que alcanza la geodésica crece con el azimut de
+    salida entre 0 y π. Las longitudes se calculan con las series de Vincenty.
+    :return: (distancias en metros, azimuts directos en radianes dentro de [0, 2π))
+    """
+    f = elipsoide.aplanamiento
+    lon12 = np.mod(np.asarray(lon2, dtype=np.float64) - np.asarray(lon1, dtype=np.float64) + 180.0, 360.0) - 180.0
+    signo_lon = np.where(lon12 < 0, -1.0, 1.0)
+    L = np.radians(np.abs(lon12))
+    lat1 = np.asarray(lat1, dtype=np.float64)
+    lat2 = np.asarray(lat2, dtype=np.float64)
+    intercambio = np.where(np.abs(lat1) < np.abs(lat2), -1.0, 1.0)
+    lat1, lat2 = np.where(intercambio < 0, lat2, lat1), np.where(intercambio < 0, lat1, lat2)
+    signo_lat = np.where(lat1 > 0, -1.0, 1.0)
+    beta1 = np.arctan((1 - f) * np.tan(np.radians(lat1 * signo_lat)))
+    beta2 = np.arctan((1 - f) * np.tan(np.radians(lat2 * signo_lat)))
+    sin_b1, cos_b1 = np.sin(beta1), np.maximum(np.cos(beta1), MINIMO_COSENO)
+    sin_b2, cos_b2 = np.sin(beta2), np.maximum(np.cos(beta2), MINIMO_COSENO)
+
+    def geodesica(alfa1):
+        sin_a1, cos_a1 = np.sin(alfa1), np.cos(alfa1)
+        sin_alfa = sin_a1 * cos_b1
+        # Azimut al llegar a la latitud del punto 2, siempre hacia el norte (Clairaut)
+        radicando = (cos_a1 * cos_b1) ** 2 + np.where(cos_b1 < -sin_b1, (cos_b2 - cos_b1) * (cos_b1 + cos_b2),
+                                                      (sin_b1 - sin_b2) * (sin_b1 + sin_b2))
+        cos_a2 = np.where((cos_b2 != cos_b1) | (np.abs(sin_b2) != -sin_b1),
+                          np.sqrt(np.maximum(radicando, 0.0)) / cos_b2, np.abs(cos_a1))
+        sin_s1, cos_s1 = sin_b1, cos_a1 * cos_b1
+        sin_s2, cos_s2 = sin_b2, cos_a2 * cos_b2
+        # Ángulos en [0, π] (``+ 0.0`` convierte -0.0 en 0.0, que arctan2 llevaría a -π)
+        sigma = np.arctan2(np.maximum(cos_s1 * sin_s2 - sin_s1 * cos_s2, 0.0) + 0.0,
+                           cos_s1 * cos_s2 + sin_s1 * sin_s2)
+        sin_o1, sin_o2 = sin_alfa * sin_b1, sin_alfa * sin_b2
+        omega = np.arctan2(np.maximum(cos_s1 * sin_o2 - sin_o1 * cos_s2, 0.0) + 0.0,
+                           cos_s1 * cos_s2 + sin_o1 * sin_o2)
+        cos_2sm = np.cos(2 * np.arctan2(sin_s1, cos_s1) + sigma)
+        correccion, distancia = _series_vincenty(sin_alfa, 1 - sin_alfa ** 2, sigma, cos_2sm, elipsoide)
+        return omega - correccion, distancia, sin_alfa / cos_b2, cos_a2
+
+    bajo = np.zeros_like(L)
+    alto = np.full_like(L, np.pi)
+    for _ in range(iteraciones):
+        medio = (bajo + alto) / 2
+        corto = geodesica(medio)[0] < L
+        bajo = np.where(corto, medio, bajo)
+        alto = np.where(corto, alto, medio)
+    alfa1 = (bajo + alto) / 2
+    _, distancias, sin_a2, cos_a2 = geodesica(alfa1)
+
+    # Deshacer la normalización: si se intercambiaron los puntos, el azimut es el inverso del de llegada
+    # (al intercambiarlos también cambia el sentido de la longitud, que compensa el signo del inverso)
+    sin_a1 = np.where(intercambio < 0, sin_a2, np.sin(alfa1)) * signo_lon
+    cos_a1 = np.where(intercambio < 0, cos_a2, np.cos(alfa1)) * intercambio * signo_lat
+    return distancias, azimut(sin_a1, cos_a1)
+
+
+def distancias_geodesicas(lon1, lat1, lon2, lat2, elipsoide=WGS84, tolerancia=1e-12, max_iter=200):
+    """
+    Distancias elipsoidales y azimuts directos entre pares de puntos.
+
+    Usa la iteración de Vincenty; los pares en los que no converge (casi
+    antípodas) se resuelven con ``_inversa_biseccion``.
+    :param lon1, lat1, lon2, lat2: Arreglos de coordenadas geográficas en grados.
+    :return: (distancias en metros, azimuts directos en radianes dentro de [0, 2π))
+    """
+    f = elipsoide.aplanamiento
+    lon1, lat1, lon2, lat2 = np.broadcast_arrays(*(np.asarray(v, dtype=np.float64)
+                                                   for v in (lon1, lat1, lon2, lat2)))
+
+    fi1 = np.radians(lat1)
+    fi2 = np.radians(lat2)
+    L = np.radians(lon2 - lon1)
+
+    U1 = np.arctan((1 - f) * np.tan(fi1))
+    U2 = np.arctan((1 - f) * np.tan(fi2))
+    sin_u1, cos_u1 = np.sin(U1), np.cos(U1)
+    sin_u2, cos_u2 = np.sin(U2), np.cos(U2)
+
+    lam = L.copy()
+    convergido = np.zeros(L.shape, dtype=bool)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        for _ in range(max_iter):
+            sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+            sin_sigma = np.hypot(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+            cos_sigma = sin_u1 * sin_u2 + cos_u1 * cos_u2 * cos_lam
+            sigma = np.arctan2(sin_sigma, cos_sigma)
+            sin_alfa = np.where(sin_sigma == 0, 0.0, cos_u1 * cos_u2 * sin_lam / sin_sigma)
+            cos2_alfa = 1 - sin_alfa ** 2
+            cos_2sm = np.where(cos2_alfa == 0, 0.0, cos_sigma - 2 * sin_u1 * sin_u2 / cos2_alfa)
+            lam_anterior = lam
+            correccion, distancias = _series_vincenty(sin_alfa, cos2_alfa, sigma, cos_2sm, elipsoide)
+            lam = L + correccion
+            convergido = np.abs(lam - lam_anterior) < tolerancia
+            if convergido.all():
+                break
+
+    sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+    azimuts = azimut(cos_u2 * sin_lam, cos_u1 * sin_u2 - sin_u1 * cos_u2 * cos_lam)
+    # Casi antípodas la iteración oscila, o converge a una longitud auxiliar
+    # fuera de [-π, π] (p. ej. en el ecuador); L se envuelve por si las longitudes no lo están
+    fallidos = ~convergido | (np.abs(np.mod(L + np.pi, 2 * np.pi) - np.pi + (lam - L)) > np.pi)
+    if fallidos.any():
+        distancias = np.array(distancias, dtype=np.float64)
+        azimuts = np.array(azimuts, dtype=np.float64)
+        distancias[fallidos], azimuts[fallidos] = _inversa_biseccion(
+            lon1[fallidos], lat1[fallidos], lon2[fallidos], lat2[fallidos], elipsoide)
+    return distancias, azimuts
+
+
+def _constantes_area(elipsoide):
+    """Constantes del algoritmo de área de GRASS/QGIS para un elipsoide"""
+    a2 = elipsoide.semieje_mayor ** 2
+    e2 = 1 - elipsoide.semieje_menor ** 2 / a2
+    e4 = e2 * e2
+    e6 = e4 * e2
+    k = {
+        'AE': a2 * (1 - e2),
+        'QA': (2.0 / 3.0) * e2,
+        'QB': (3.0 / 5.0) * e4,
+        'QC': (4.0 / 7.0) * e6,
+        'QbarA': -1.0 - (2.0 / 3.0) * e2 - (3.0 / 5.0) * e4 - (4.0 / 7.0) * e6,
+        'QbarB': (2.0 / 9.0) * e2 + (2.0 / 5.0) * e4 + (4.0 / 7.0) * e6,
+        'QbarC': -(3.0 / 25.0) * e4 - (12.0 / 35.0) * e6,
+        'QbarD': (4.0 / 49.0) * e6,
+    }
+    k['Qp'] = _q(np.pi / 2, k)
+    k['E'] = abs(4 * np.pi * k['Qp'] * k['AE'])
+    return k
+
+
+def _q(x, k):
+    s2 = np.sin(x) ** 2
+    return np.sin(x) * (1 + s2 * (k['QA'] + s2 * (k['QB'] + s2 * k['QC'])))
+
+
+def _qbar(x, k):
+    c2 = np.cos(x) ** 2
+    return np.cos(x) * (k['QbarA'] + c2 * (k['QbarB'] + c2 * (k['QbarC'] + c2 * k['QbarD'])))
+
+
+def _diferencias_longitud(x1, x2):
+    """
+    ``x2 - x1`` en radianes reducida a [-π, π] como en QGIS: se suma 2π a la
+    menor de las dos longitudes hasta que la diferencia no supere π (un lado
+    de exactamente 180° conserva su signo).
+    """
+    dx = x2 - x1
+    vueltas_x2 = np.ceil(np.maximum(-dx - np.pi, 0.0) / (2 * np.pi))
+    vueltas_x1 = np.ceil(np.maximum(dx - np.pi, 0.0) / (2 * np.pi))
+    return dx + 2 * np.pi * (vueltas_x2 - vueltas_x1)
+
+
+def areas_anillos_geodesicas(coords, inicios, elipsoide=WGS84):
+    """
+    Área elipsoidal (m²) encerrada por cada anillo de un arreglo de vértices
+    en coordenadas geográficas (grados), con todos los anillos concatenados.
+
+    Reproduce ``QgsDistanceArea::computePolygonArea`` de QGIS 3: en los lados
+    cuya diferencia de latitud no supera ``TOLERANCIA_LATITUD`` radianes el
+    cociente (Qbar2 - Qbar1) / dy se sustituye por su límite, Q en la latitud
+    media (ticket 3369 de GRASS). QGIS 2 usaba una comparación exacta con
+    cero y Q(y2); los resultados solo difieren en esos lados casi paralelos.
+    :param inicios: Posición del primer vértice de cada anillo.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    k = _constantes_area(elipsoide)
+    x2 = np.radians(coords[:, 0])
+    y2 = np.radians(coords[:, 1])
+    previos = anteriores(inicios, len(coords))
+    x1 = x2[previos]
+    y1 = y2[previos]
+
+    dx = _diferencias_longitud(x1, x2)
+    dy = y2 - y1
+    qbar1 = _qbar(y1, k)
+    qbar2 = _qbar(y2, k)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        termino = np.where(np.abs(dy) > TOLERANCIA_LATITUD,
+                           k['Qp'] - (qbar2 - qbar1) / dy,
+                           k['Qp'] - _q((y1 + y2) / 2.0, k))
+    areas = np.minimum(np.abs(np.add.reduceat(dx * termino, inicios) * k['AE']), k['E'])
+    return np.where(areas > k['E'] / 2, k['E'] - areas, areas)
+
+
+def areas_anillos_planas(coords, inicios):
+    """Área plana (fórmula del trapecio) encerrada por cada anillo de un arreglo de vértices concatenados"""
+    return np.abs(areas_con_signo(coords, inicios))
+
+
+def areas_anillos(coords, inicios, elipsoide=None):
+    """Área de cada anillo: elipsoidal si se da ``elipsoide``, plana si no"""
+    inicios = np.asarray(inicios)
+    if not len(inicios):
+        return np.empty(0, dtype=np.float64)
+    if elipsoide is None:
+        return areas_anillos_planas(coords, inicios)
+    return areas_anillos_geodesicas(coords, inicios, elipsoide)
+
+
+def area_anillo_geodesica(coords, elipsoide=WGS84):
+    """Área elipsoidal (m²) encerrada por un anillo de coordenadas geográficas en grados"""
+    if len(coords) < 3:
+        return 0.0
+    return float(areas_anillos_geodesicas(coords, np.zeros(1, dtype=np.int64), elipsoide)[0])
+
+
+def area_anillo_plana(coords):
+    """Área plana (fórmula del trapecio) encerrada por un anillo"""
+    if len(coords) < 3:
+        return 0.0
+    return float(areas_anillos_planas(coords, np.zeros(1, dtype=np.int64))[0])
+
+
+def longitud_anillos(anillos, elipsoide=None):
+    """Suma las longitudes de una lista de secuencias de vértices"""
+    total = 0.0
+    for coords in anillos:
+        coords = np.asarray(coords, dtype=np.float64)
+        if len(coords) < 2:
+            continue
+        if elipsoide is None:
+            distancias, _ = distancias_planas(coords[:-1, 0], coords[:-1, 1], coords[1:, 0], coords[1:, 1])
+        else:
+            distancias, _ = distancias_geodesicas(coords[:-1, 0], coords[:-1, 1],
+                                                  coords[1:, 0], coords[1:, 1], elipsoide)
+        total += float(np.sum(distancias))
+    return total
+
+
+def medir_poligono(partes, elipsoide=None):
+    """
+    Área y perímetro de un polígono (posiblemente multiparte y con huecos).
+
+    :param partes: Lista de partes; cada parte es una lista de anillos (n, 2)
+        con el exterior en primer lugar.
+    :param elipsoide: Elipsoide para medir en coordenadas geográficas, o None
+        para medir en el plano de la proyección.
+    :return: (área, perímetro) en unidades de la medición (m² y m si es elipsoidal)
+    """
+    area = 0.0
+    perimetro = 0.0
+    for anillos in partes:
+        if not anillos:
+            continue
+        if elipsoide is None:
+            areas = [area_anillo_plana(anillo) for anillo in anillos]
+        else:
+            areas = [area_anillo_geodesica(anillo, elipsoide) for anillo in anillos]
+        area += areas[0] - sum(areas[1:])
+        perimetro += longitud_anillos(anillos, elipsoide)
+    return area, perimetro
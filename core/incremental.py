@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+Recálculo incremental de resultados por entidad.
+
+``ResultadosIncrementales`` parte de la tabla de un cálculo completo y
+recuerda qué filas pertenecen a cada entidad y la huella de su geometría.
+Cuando algunas entidades cambian, solo ellas se vuelven a medir en tablas
+pequeñas; la tabla completa se recompone copiando tramos contiguos de la
+tabla anterior, sin medir de nuevo las demás entidades.
+"""
+import hashlib
+
+import numpy as np
+
+
+def huella(wkb):
+    """Huella de una geometría WKB (None para geometrías vacías)"""
+    if not wkb:
+        return None
+    return hashlib.blake2b(bytes(wkb), digest_size=16).digest()
+
+
+def con_huellas(entidades, huellas):
+    """Recorre las entidades guardando en ``huellas`` la huella de la geometría de cada una"""
+    for feature in entidades:
+        geom = feature.geometry()
+        huellas[feature.id()] = None if geom.isEmpty() else huella(geom.asWkb())
+        yield feature
+
+
+class ResultadosIncrementales:
+    """Filas de resultados de cada entidad con la huella de su geometría."""
+
+    def __init__(self, tabla, columna_id, huellas=None):
+        """
+        :param tabla: Tabla de resultados del cálculo completo; las filas de
+            cada entidad son contiguas.
+        :param columna_id: Columna con el id de la entidad (p. ej. ``id_linea``).
+        :param huellas: Diccionario ``{id: huella}`` del cálculo completo, si se calcularon.
+        """
+        self.columna_id = columna_id
+        self.huellas = dict(huellas or {})
+        self.cambios = {}
+        self._asignar_tabla(tabla)
+        if self.huellas:
+            # Las huellas siguen el orden del recorrido, incluidas las entidades sin
+            # filas, que así conservan su lugar si luego tienen resultados
+            self.orden = list(self.huellas) + [fid for fid in self.orden if fid not in self.huellas]
+
+    def _asignar_tabla(self, tabla):
+        self.tabla = tabla
+        ids = tabla.columna(self.columna_id).arreglo()[0]
+        if len(ids):
+            inicios = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1))
+            largos = np.diff(np.append(inicios, len(ids)))
+        else:
+            inicios = largos = ids
+        self.orden = ids[inicios].tolist()
+        self.tramos = dict(zip(self.orden, zip(inicios.tolist(), largos.tolist())))
+
+    def __contains__(self, fid):
+        return fid in self.tramos or fid in self.cambios or fid in self.huellas
+
+    def sin_cambios(self, fid, huella_nueva):
+        """True si la entidad ya está calculada con una geometría de la misma huella"""
+        return huella_nueva is not None and fid not in self.cambios and self.huellas.get(fid) == huella_nueva
+
+    def reemplazar(self, fid, parcial, huella_nueva=None):
+        """Sustituye las filas de una entidad (nueva o modificada) por las de la tabla ``parcial``"""
+        if fid not in self.tramos and fid not in self.cambios and fid not in self.huellas:
+            self.orden.append(fid)
+        self.cambios[fid] = parcial
+        self.huellas[fid] = huella_nueva
+
+    def eliminar(self, fid):
+        """Quita las filas de una entidad eliminada"""
+        if fid in self:
+            self.cambios[fid] = None
+        self.huellas.pop(fid, None)
+
+    def ids_temporales(self):
+        """Ids negativos: entidades añadidas en una edición que aún no se guardó"""
+        return [fid for fid in self.orden if fid < 0]
+
+    def recomponer(self):
+        """
+        Construye la tabla completa con los cambios pendientes y la adopta
+        como nueva base.
+        :return: (tabla nueva, filas ``(id, inicio, n)`` de cada entidad con resultados)
+        """
+        tabla = self.tabla.vacia()
+        filas = []
+        orden = []
+        desde = hasta = 0  # Tramo pendiente de copiar de la tabla anterior
+        for fid in self.orden:
+            if fid not in self.cambios:
+                orden.append(fid)
+                if fid not in self.tramos:
+                    continue
+                inicio, n = self.tramos[fid]
+                if inicio != hasta:
+                    tabla.anexar(self.tabla, desde, hasta)
+                    desde = inicio
+                filas.append((fid, len(tabla) + inicio - desde, n))
+                hasta = inicio + n
+                continue
+
+            parcial = self.cambios[fid]
+            if parcial is None:
+                continue
+            orden.append(fid)
+            if len(parcial):
+                tabla.anexar(self.tabla, desde, hasta)
+                desde = hasta
+                filas.append((fid, tabla.anexar(parcial), len(parcial)))
+        tabla.anexar(self.tabla, desde, hasta)
+
+        self.cambios = {}
+        self._asignar_tabla(tabla)
+        self.orden = orden
+        return tabla, filas
@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+Interpolación de puntos con cota a una rejilla NumPy.
+
+La rejilla cubre la extensión de los puntos con celdas cuadradas y se
+evalúa en el centro de cada celda, como los algoritmos de interpolación de
+QGIS. El resultado queda en memoria y se pasa directamente al generador de
+curvas (``core.curvas.curvas_rejilla``) sin escribir ningún ráster temporal.
+
+La interpolación TIN usa la triangulación de Delaunay de SciPy; si SciPy no
+está instalado ``tin_disponible()`` devuelve False y el llamador debe usar
+otro método. IDW busca los vecinos de cada celda en el árbol KD de SciPy y,
+sin él, midiendo la distancia a todos los puntos.
+"""
+from collections import namedtuple
+from importlib.util import find_spec
+import math
+
+import numpy as np
+
+# Valor sin datos de las celdas fuera de la triangulación (el de los interpoladores de QGIS)
+SIN_DATOS = -9999.0
+# Distancias punto-celda que se calculan a la vez en IDW (limita la memoria de cada bloque de filas)
+ELEMENTOS_BLOQUE = 4000000
+# Vecinos que se buscan primero cuando IDW usa todos los puntos de un radio
+VECINOS_RADIO = 32
+
+ParametrosIdw = namedtuple('ParametrosIdw', ['potencia', 'vecinos', 'radio', 'minimo_vecinos'])
+ParametrosIdw.__doc__ = (
+    "Parámetros de IDW: ``potencia`` de la distancia, ``vecinos`` más cercanos que intervienen en "
+    "cada celda (0 = todos los del radio), ``radio`` de búsqueda (0 = sin límite) y "
+    "``minimo_vecinos`` necesarios para dar valor a una celda.")
+
+# IDW con todos los puntos, como qgis:idwinterpolation con radio 0
+IDW_GLOBAL = ParametrosIdw(2.0, 0, 0.0, 1)
+
+Rejilla = namedtuple('Rejilla', ['valores', 'geotransformacion', 'sin_datos'])
+Rejilla.__doc__ = (
+    "Ráster en memoria: ``valores`` (filas, columnas) empezando por la fila norte, "
+    "``geotransformacion`` en el formato de GDAL y ``sin_datos`` el valor de las celdas vacías.")
+
+
+def scipy_disponible():
+    """True si SciPy está instalado (triangulación para TIN y árbol KD para IDW)"""
+    return find_spec('scipy') is not None
+
+
+def tin_disponible():
+    """True si se puede interpolar con TIN"""
+    return scipy_disponible()
+
+
+def definir_rejilla(xmin, ymin, xmax, ymax, tamano_pixel):
+    """
+    Rejilla que cubre la extensión con celdas de ``tamano_pixel``.
+    :return: (columnas, filas, geotransformación)
+    """
+    columnas = max(math.ceil((xmax - xmin) / tamano_pixel), 1)
+    filas = max(math.ceil((ymax - ymin) / tamano_pixel), 1)
+    return columnas, filas, (xmin, tamano_pixel, 0.0, ymax, 0.0, -tamano_pixel)
+
+
+def centros_celdas(columnas, geotransformacion, inicio, fin):
+    """Coordenadas (n, 2) de los centros de las celdas [inicio, fin), numeradas por filas"""
+    g = geotransformacion
+    fila, columna = np.divmod(np.arange(inicio, fin), columnas)
+    return np.column_stack((g[0] + (columna + 0.5) * g[1], g[3] + (fila + 0.5) * g[5]))
+
+
+def centros_filas(columnas, geotransformacion, fila_inicial, fila_final):
+    """Coordenadas (n, 2) de los centros de las celdas de las filas [fila_inicial, fila_final)"""
+    return centros_celdas(columnas, geotransformacion, fila_inicial * columnas, fila_final * columnas)
+
+
+def _ponderar(d2, valores, potencia):
+    """
+    Media ponderada por el inverso de la distancia de cada fila.
+    :param d2: Distancias al cuadrado (m, k); ``inf`` para los vecinos que faltan.
+    :param valores: Cotas de los vecinos (m, k).
+    :return: Valores (m,); NaN si la fila no tiene vecinos.
+    """
+    with np.errstate(divide='ignore'):
+        pesos = d2 ** (-potencia / 2.0)
+    # Una celda que coincide con un punto toma su cota
+    coincide = d2 == 0
+    exactas = coincide.any(axis=1)
+    pesos[exactas] = coincide[exactas]
+    with np.errstate(invalid='ignore'):
+        return (pesos * valores).sum(axis=1) / pesos.sum(axis=1)
+
+
+def _idw_arbol(arbol, z, centros, parametros, k, trabajadores):
+    """
+    IDW de las celdas ``centros`` con los ``k`` puntos más cercanos del árbol
+    (dentro del radio, si lo hay). Sin número de vecinos fijo se usan todos
+    los puntos del radio: las celdas que llenan sus ``k`` vecinos se vuelven
+    a calcular con el doble.
+    """
+    n = len(z)
+    # El árbol excluye los puntos a la distancia exacta del límite; el radio los incluye
+    limite = np.nextafter(parametros.radio, np.inf) if parametros.radio > 0 else np.inf
+    d, indices = arbol.query(centros, k=k, distance_upper_bound=limite, workers=trabajadores)
+    d = d.reshape(len(centros), k)
+    indices = indices.reshape(len(centros), k)
+    # Los vecinos que faltan tienen distancia infinita e índice n
+    valores = _ponderar(d ** 2, np.append(z, 0.0)[indices], parametros.potencia)
+    encontrados = np.isfinite(d).sum(axis=1)
+    valores[encontrados < parametros.minimo_vecinos] = np.nan
+    if not parametros.vecinos and k < n:
+        llenas = np.flatnonzero(encontrados == k)
+        if len(llenas):
+            valores[llenas] = _idw_arbol(arbol, z, centros[llenas], parametros, min(2 * k, n), trabajadores)
+    return valores
+
+
+def _idw_fuerza_bruta(xy, z, centros, parametros):
+    """
+    IDW de las celdas ``centros`` midiendo la distancia a todos los puntos.
+    Los puntos se recorren por bloques, de modo que ninguna matriz de
+    distancias supera ELEMENTOS_BLOQUE elementos: con todos los puntos se
+    acumulan las sumas ponderadas y con un número de vecinos se conservan
+    los más cercanos encontrados hasta el momento.
+    """
+    n = len(z)
+    k = parametros.vecinos if 0 < parametros.vecinos < n else 0
+    puntos_bloque = max(1, ELEMENTOS_BLOQUE // len(centros) - k)
+    mejores_d2 = np.full((len(centros), k), np.inf)
+    mejores_z = np.zeros((len(centros), k))
+    suma_pesos = np.zeros(len(centros))
+    suma_valores = np.zeros(len(centros))
+    exactas = np.zeros(len(centros))
+    suma_exactas = np.zeros(len(centros))
+    encontrados = np.zeros(len(centros), dtype=np.int64)
+    for inicio in range(0, n, puntos_bloque):
+        fin = inicio + puntos_bloque
+        zb = z[inicio:fin]
+        d2 = (centros[:, 0, None] - xy[None, inicio:fin, 0]) ** 2
+        d2 += (centros[:, 1, None] - xy[None, inicio:fin, 1]) ** 2
+        if parametros.radio > 0:
+            d2[d2 > parametros.radio ** 2] = np.inf
+        if k:
+            candidatos_d2 = np.hstack((mejores_d2, d2))
+            candidatos_z = np.hstack((mejores_z, np.broadcast_to(zb, d2.shape)))
+            cercanos = np.argpartition(candidatos_d2, k - 1, axis=1)[:, :k]
+            mejores_d2 = np.take_along_axis(candidatos_d2, cercanos, axis=1)
+            mejores_z = np.take_along_axis(candidatos_z, cercanos, axis=1)
+            continue
+        # Una celda que coincide con puntos toma la media de sus cotas (como en _ponderar)
+        coincide = d2 == 0
+        exactas += coincide.sum(axis=1)
+        suma_exactas += coincide @ zb
+        with np.errstate(divide='ignore'):
+            pesos = d2 ** (-parametros.potencia / 2.0)
+        pesos[coincide] = 0.0
+        suma_pesos += pesos.sum(axis=1)
+        suma_valores += pesos @ zb
+        encontrados += np.isfinite(d2).sum(axis=1)
+    if k:
+        resultado = _ponderar(mejores_d2, mejores_z, parametros.potencia)
+        encontrados = np.isfinite(mejores_d2).sum(axis=1)
+    else:
+        with np.errstate(invalid='ignore', divide='ignore'):
+            resultado = np.where(exactas > 0, suma_exactas / np.maximum(exactas, 1), suma_valores / suma_pesos)
+    resultado[encontrados < parametros.minimo_vecinos] = np.nan
+    return resultado
+
+
+def interpolar_idw(xy, z, columnas, filas, geotransformacion, parametros=IDW_GLOBAL, trabajadores=1):
+    """
+    Inverso de la distancia con los vecinos de cada celda.
+
+    Con un número de vecinos o un radio y SciPy instalado, los vecinos se
+    buscan en un árbol KD (``cKDTree``), con ``trabajadores`` hilos. Sin
+    SciPy, o con todos los puntos, se miden las distancias a todos ellos.
+    Las celdas y los puntos se recorren por bloques para acotar la memoria.
+    :param parametros: ParametrosIdw.
+    :param trabajadores: Hilos de la búsqueda de vecinos (-1 = todos los núcleos).
+    :return: Rejilla; las celdas con menos de ``minimo_vecinos`` puntos quedan sin datos.
+    """
+    xy = np.asarray(xy, dtype=np.float64)
+    z = np.asarray(z, dtype=np.float64)
+    valores = np.empty(filas * columnas)
+    local = parametros.vecinos > 0 or parametros.radio > 0
+    arbol = None
+    if local and scipy_disponible():
+        from scipy.spatial import cKDTree
+        arbol = cKDTree(xy)
+        k = min(parametros.vecinos or VECINOS_RADIO, len(z))
+        celdas_bloque = max(1, ELEMENTOS_BLOQUE // k)
+    else:
+        # Sin árbol cada bloque de celdas recorre los puntos por bloques (ver _idw_fuerza_bruta)
+        celdas_bloque = max(1, ELEMENTOS_BLOQUE // max(min(len(z), ELEMENTOS_BLOQUE // 2), 1))
+    for inicio in range(0, filas * columnas, celdas_bloque):
+        fin = min(inicio + celdas_bloque, filas * columnas)
+        centros = centros_celdas(columnas, geotransformacion, inicio, fin)
+        if arbol is not None:
+            valores[inicio:fin] = _idw_arbol(arbol, z, centros, parametros, k, trabajadores)
+        else:
+            valores[inicio:fin] = _idw_fuerza_bruta(xy, z, centros, parametros)
+    valores = valores.reshape(filas, columnas)
+    valores[np.isnan(valores)] = SIN_DATOS
+    return Rejilla(valores, geotransformacion, SIN_DATOS)
+
+
+def interpolar_tin(xy, z, columnas, filas, geotransformacion):
+    """
+    Interpolación lineal sobre la triangulación de Delaunay de los puntos.
+    Las celdas fuera de la envolvente convexa quedan sin datos.
+    :return: Rejilla
+    """
+    from scipy.interpolate import LinearNDInterpolator
+    interpolador = LinearNDInterpolator(np.asarray(xy, dtype=np.float64), np.asarray(z, dtype=np.float64),
+                                        fill_value=SIN_DATOS)
+    valores = interpolador(centros_filas(columnas, geotransformacion, 0, filas)).reshape(filas, columnas)
+    return Rejilla(valores, geotransformacion, SIN_DATOS)
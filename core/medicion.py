@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Motor de medición sobre geometrías WKB.
+
+``MotorWkb`` contiene toda la medición de líneas y polígonos que usan
+``calcular_lineas`` y ``calcular_poligonos``; solo necesita que las
+geometrías ofrezcan ``isEmpty()`` y ``asWkb()``. El motor de los diálogos
+lo amplía con la transformación de QGIS y los procesos de trabajo lo usan
+tal cual con geometrías ya transformadas.
+"""
+import numpy as np
+
+from . import wkb
+from .geodesia import areas_anillos, distancias_geodesicas, distancias_planas
+from .poligonos import decodificar_anillos, siguientes
+
+
+class GeometriaWkb:
+    """Geometría en WKB con, opcionalmente, su WKB en el sistema de medición."""
+    __slots__ = ('wkb', 'medicion')
+
+    def __init__(self, wkb, medicion=None):
+        self.wkb = wkb
+        self.medicion = medicion
+
+    def isEmpty(self):
+        return not self.wkb
+
+    def asWkb(self):
+        return self.wkb
+
+
+class MotorWkb:
+    """
+    Mide distancias, azimuts, áreas y perímetros sobre arreglos completos.
+
+    Con ``planas`` se mide en el plano de la capa; si no, las partes de
+    medición (en grados sobre ``elipsoide``) se miden con fórmulas
+    elipsoidales.
+    """
+
+    def __init__(self, planas=True, elipsoide=None):
+        self.planas = planas
+        self.elipsoide = None if planas else elipsoide
+
+    def partes(self, geom):
+        """Tipo base y partes de la geometría en coordenadas de la capa"""
+        return wkb.decodificar(geom.asWkb())
+
+    def partes_medicion(self, geom):
+        """Partes de la geometría en el sistema en que se mide (plano o geográfico)"""
+        if getattr(geom, 'medicion', None) is not None:
+            return wkb.decodificar(geom.medicion)[1]
+        return self.partes(geom)[1]
+
+    def distancias(self, inicio, fin):
+        """
+        Distancias y azimuts entre dos arreglos (n, 2) de puntos de medición.
+        :return: (distancias en metros o unidades del mapa, azimuts en radianes)
+        """
+        inicio = np.asarray(inicio, dtype=np.float64).reshape(-1, 2)
+        fin = np.asarray(fin, dtype=np.float64).reshape(-1, 2)
+        if self.planas:
+            return distancias_planas(inicio[:, 0], inicio[:, 1], fin[:, 0], fin[:, 1])
+        return distancias_geodesicas(inicio[:, 0], inicio[:, 1], fin[:, 0], fin[:, 1], self.elipsoide)
+
+    def longitudes_partes(self, partes):
+        """Longitud de cada segmento de una lista de polilíneas de medición, en orden"""
+        partes = [p for p in partes if len(p) >= 2]
+        if not partes:
+            return np.empty(0, dtype=np.float64)
+        inicio = np.concatenate([p[:-1] for p in partes])
+        fin = np.concatenate([p[1:] for p in partes])
+        return self.distancias(inicio, fin)[0]
+
+    def lineas(self, geom):
+        """
+        Vértices y longitudes de segmento de una geometría lineal.
+        :return: (partes en coordenadas de la capa, longitudes de cada segmento)
+        """
+        partes = [anillos[0] for anillos in self.partes(geom)[1] if len(anillos[0]) >= 2]
+        if self.planas:
+            return partes, self.longitudes_partes(partes)
+        medicion = [anillos[0] for anillos in self.partes_medicion(geom) if len(anillos[0]) >= 2]
+        return partes, self.longitudes_partes(medicion)
+
+    def poligonos(self, geom):
+        """
+        Vértices de una geometría poligonal por anillos, decodificados una sola vez.
+        :return: (``Anillos`` en coordenadas de la capa, arreglo (n, 2) con los
+            mismos vértices en el sistema de medición)
+        """
+        partes = self.partes(geom)[1]
+        if self.planas:
+            anillos, _ = decodificar_anillos(partes)
+            return anillos, np.column_stack((anillos.x, anillos.y))
+        return decodificar_anillos(partes, self.partes_medicion(geom))
+
+    def lados(self, anillos, medicion):
+        """Longitud de cada lado (del vértice ``i`` al siguiente de su anillo)"""
+        return self.distancias(medicion, medicion[siguientes(anillos.inicios, len(medicion))])[0]
+
+    def area_perimetro(self, anillos, medicion, lados):
+        """
+        Área y perímetro de un polígono a partir de sus anillos y las longitudes
+        de sus lados: el área de cada exterior menos la de sus huecos, y la
+        suma de los lados de todos los anillos.
+        """
+        areas = areas_anillos(medicion, anillos.inicios, self.elipsoide)
+        exteriores = anillos.anillo[anillos.inicios] == 0
+        return float(areas[exteriores].sum() - areas[~exteriores].sum()), float(np.sum(lados))
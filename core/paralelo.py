@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+"""
+Cálculo por bloques de entidades en varios procesos.
+
+Los identificadores de las entidades se ordenan y se reparten en bloques
+contiguos. Cada proceso de trabajo vuelve a abrir la fuente con OGR, lee
+solo las entidades de su bloque, las transforma al sistema de medición y
+devuelve una tabla de resultados parcial. El proceso principal une las
+tablas en el orden de los bloques, por lo que el resultado es el mismo que
+el de un cálculo en un único proceso que recorra las entidades por id.
+
+Los procesos se crean con ``spawn`` (QGIS tiene varios hilos y ``fork``
+no es seguro) y solo importan este paquete, NumPy y ``osgeo``.
+"""
+from collections import namedtuple
+from importlib.util import find_spec
+import multiprocessing
+import os
+import sys
+
+from .cronometro import ESCRITURA, PROCESOS
+from .medicion import GeometriaWkb
+
+# Número máximo de procesos de trabajo automáticos
+MAXIMO_TRABAJADORES = 8
+# Entidades mínimas por bloque (cada proceso tarda en arrancar cerca de un segundo)
+MINIMO_BLOQUE = 2000
+# Bloques por proceso, para repartir mejor la carga cuando las entidades son desiguales
+BLOQUES_POR_TRABAJADOR = 4
+
+# Fuente OGR que reabre cada proceso de trabajo:
+# ruta y capa (nombre o índice) del conjunto de datos, filtro de atributos de la capa (subset),
+# sistemas de la capa y de medición en WKT (None si no hay transformación),
+# y la configuración de MotorWkb (planas, elipsoide)
+OrigenOgr = namedtuple('OrigenOgr', ['ruta', 'capa', 'filtro', 'crs_capa', 'crs_medicion', 'planas', 'elipsoide'])
+
+
+def trabajadores_automaticos():
+    """Procesos de trabajo por defecto: un núcleo libre para QGIS, hasta MAXIMO_TRABAJADORES"""
+    return max(1, min((os.cpu_count() or 1) - 1, MAXIMO_TRABAJADORES))
+
+
+def interprete_python():
+    """
+    Ejecutable de Python para los procesos de trabajo, o None si no se encuentra.
+    Dentro de QGIS ``sys.executable`` suele ser el propio QGIS y no Python.
+    """
+    if os.path.basename(sys.executable).lower().startswith('python'):
+        return sys.executable
+    version = f"{sys.version_info.major}.{sys.version_info.minor}"
+    for candidato in (os.path.join(sys.exec_prefix, 'python.exe'),
+                      os.path.join(sys.exec_prefix, 'bin', f'python{version}'),
+                      os.path.join(sys.exec_prefix, 'bin', 'python3')):
+        if os.path.isfile(candidato):
+            return candidato
+    return None
+
+
+def procesos_disponibles():
+    """True si se pueden lanzar procesos de trabajo que lean con OGR (GDAL instalado y un intérprete)"""
+    return find_spec('osgeo') is not None and interprete_python() is not None
+
+
+def dividir_ids(ids, trabajadores):
+    """
+    Reparte los identificadores ordenados en bloques contiguos.
+    :return: Lista de listas de ids; un solo bloque si no compensa dividir.
+    """
+    ids = sorted(ids)
+    n_bloques = max(1, min(trabajadores * BLOQUES_POR_TRABAJADOR, len(ids) // MINIMO_BLOQUE))
+    tamano = -(-len(ids) // n_bloques) if ids else 1
+    return [ids[i:i + tamano] for i in range(0, len(ids), tamano)]
+
+
+def ejecutar_bloques(funcion, bloques, trabajadores):
+    """
+    Ejecuta ``funcion(bloque)`` en un grupo de procesos y genera los
+    resultados en el orden de los bloques. Al cerrar el generador (p. ej. al
+    cancelar) los procesos se terminan.
+    """
+    contexto = multiprocessing.get_context('spawn')
+    interprete = interprete_python()
+    if interprete is not None:
+        contexto.set_executable(interprete)
+    with contexto.Pool(max(1, min(trabajadores, len(bloques)))) as grupo:
+        yield from grupo.imap(funcion, bloques)
+
+
+def filas_bloques(funcion, bloques, trabajadores, tabla, cronometro):
+    """
+    Ejecuta ``funcion`` sobre los bloques, une sus tablas parciales en
+    ``tabla`` y genera las filas ``(id, inicio, n)`` de cada entidad con los
+    índices ya referidos a ``tabla``.
+
+    ``funcion(bloque)`` debe devolver ``(tabla parcial, filas, contadores)``.
+    """
+    resultados = ejecutar_bloques(funcion, bloques, trabajadores)
+    for parcial, filas, contadores in cronometro.iterar(PROCESOS, resultados):
+        with cronometro.fase(ESCRITURA):
+            desplazamiento = tabla.anexar(parcial)
+        for nombre, n in contadores.items():
+            cronometro.contar(nombre, n)
+        for id_entidad, inicio, n in filas:
+            yield id_entidad, inicio + desplazamiento if n else inicio, n
+
+
+class EntidadOgr:
+    __slots__ = ('_id', '_geometria')
+
+    def __init__(self, id_entidad, geometria):
+        self._id = id_entidad
+        self._geometria = geometria
+
+    def id(self):
+        return self._id
+
+    def geometry(self):
+        return self._geometria
+
+
+def entidades_ogr(origen, ids):
+    """
+    Lee con OGR las entidades ``ids`` (ordenados) de la fuente, en orden de id.
+
+    Las geometrías se devuelven en WKB y, si hay transformación, también en
+    el sistema de medición. Se ejecuta dentro de los procesos de trabajo.
+    """
+    from osgeo import ogr, osr
+    ogr.UseExceptions()
+    osr.UseExceptions()
+
+    datos = ogr.Open(origen.ruta)
+    capa = datos.GetLayerByName(origen.capa) if isinstance(origen.capa, str) else datos.GetLayer(origen.capa)
+    columna = capa.GetFIDColumn()
+    campo_fid = f'"{columna}"' if columna else 'FID'
+    filtro = f"{campo_fid} >= {ids[0]} AND {campo_fid} <= {ids[-1]}"
+    if origen.filtro:
+        filtro = f"({origen.filtro}) AND {filtro}"
+    capa.SetAttributeFilter(filtro)
+
+    transformacion = None
+    if origen.crs_medicion is not None:
+        sistemas = []
+        for wkt in (origen.crs_capa, origen.crs_medicion):
+            sistema = osr.SpatialReference()
+            sistema.ImportFromWkt(wkt)
+            sistema.SetAxisMappingStrategy(osr.OAMS_TRADITIONAL_GIS_ORDER)
+            sistemas.append(sistema)
+        transformacion = osr.CoordinateTransformation(*sistemas)
+
+    buscados = set(ids)
+    entidades = []
+    for feature in capa:
+        fid = feature.GetFID()
+        if fid not in buscados:
+            continue
+        geom = feature.GetGeometryRef()
+        if geom is None or geom.IsEmpty():
+            entidades.append(EntidadOgr(fid, GeometriaWkb(b'')))
+            continue
+        if geom.HasCurveGeometry():
+            geom = geom.GetLinearGeometry()
+        wkb_capa = bytes(geom.ExportToIsoWkb(ogr.wkbNDR))
+        wkb_medicion = None
+        if transformacion is not None:
+            geom.Transform(transformacion)
+            wkb_medicion = bytes(geom.ExportToIsoWkb(ogr.wkbNDR))
+        entidades.append(EntidadOgr(fid, GeometriaWkb(wkb_capa, wkb_medicion)))
+    entidades.sort(key=EntidadOgr.id)
+    return entidades
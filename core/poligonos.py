@@ -0,0 +1,178 @@
+# -*- coding: utf-8 -*-
+"""Cálculo vectorizado de ángulos y lados en los vértices de polígonos."""
+from collections import namedtuple
+
+import numpy as np
+
+from .segmentos import DOS_PI, azimut
+
+# Unidades de área (mismo orden que el combo del diálogo)
+METROS_CUADRADOS = 0
+HECTAREAS = 1
+KILOMETROS_CUADRADOS = 2
+UNIDADES_AREA = ["Metros cuadrados", "Hectáreas", "Kilómetros cuadrados"]
+
+_FACTORES_AREA = {METROS_CUADRADOS: 1.0, HECTAREAS: 10000.0, KILOMETROS_CUADRADOS: 1000000.0}
+
+Vertices = namedtuple('Vertices', [
+    'x', 'y', 'distancia', 'dist_acum',
+    'interno', 'externo', 'azimut'
+])
+Vertices.__doc__ = ("Arreglos con una posición por vértice. El lado ``i`` une el vértice ``i`` "
+                    "con el siguiente de su anillo (el último con el primero); ángulos en radianes.")
+
+Anillos = namedtuple('Anillos', ['parte', 'anillo', 'vertice', 'x', 'y', 'inicios'])
+Anillos.__doc__ = ("Vértices de un polígono en columnas, una posición por vértice: parte, anillo "
+                   "(0 = exterior) y vértice dentro del anillo, todos desde 0. ``inicios`` tiene la "
+                   "posición del primer vértice de cada anillo.")
+
+
+def convertir_area(area_m2, unidad_area):
+    """Convierte un área en metros cuadrados a la unidad indicada (escalar o arreglo)"""
+    return area_m2 / _FACTORES_AREA.get(unidad_area, _FACTORES_AREA[KILOMETROS_CUADRADOS])
+
+
+def decodificar_anillos(partes, medicion=None):
+    """
+    Recorre una sola vez todos los anillos de todas las partes de un polígono.
+
+    De cada anillo se quita el vértice de cierre repetido; los anillos con
+    menos de tres vértices se descartan.
+    :param partes: Partes devueltas por ``wkb.decodificar`` (listas de anillos (n, 2)).
+    :param medicion: Partes con la misma estructura en el sistema de medición, si se necesitan.
+    :return: (``Anillos``, arreglo (n, 2) con los vértices de medición o None)
+    """
+    bloques = []
+    bloques_medicion = []
+    ids_parte = []
+    ids_anillo = []
+    for i, anillos in enumerate(partes):
+        for j, coords in enumerate(anillos):
+            n = len(coords)
+            if n > 1 and coords[0, 0] == coords[-1, 0] and coords[0, 1] == coords[-1, 1]:
+                n -= 1
+            if n < 3:
+                continue
+            bloques.append(coords[:n])
+            if medicion is not None:
+                bloques_medicion.append(medicion[i][j][:n])
+            ids_parte.append(i)
+            ids_anillo.append(j)
+
+    if not bloques:
+        vacio = np.empty(0, dtype=np.int64)
+        anillos = Anillos(vacio, vacio, vacio, np.empty(0), np.empty(0), vacio)
+        return anillos, (None if medicion is None else np.empty((0, 2), dtype=np.float64))
+
+    largos = np.array([len(b) for b in bloques])
+    inicios = np.concatenate(([0], np.cumsum(largos[:-1])))
+    coords = np.concatenate(bloques)
+    anillos = Anillos(
+        np.repeat(ids_parte, largos), np.repeat(ids_anillo, largos),
+        np.arange(len(coords)) - np.repeat(inicios, largos),
+        coords[:, 0], coords[:, 1], inicios
+    )
+    return anillos, (None if medicion is None else np.concatenate(bloques_medicion))
+
+
+def siguientes(inicios, n):
+    """Posición del vértice siguiente de cada vértice dentro de su anillo"""
+    indices = np.arange(1, n + 1)
+    if n:
+        indices[np.append(inicios[1:], n) - 1] = inicios
+    return indices
+
+
+def anteriores(inicios, n):
+    """Posición del vértice anterior de cada vértice dentro de su anillo"""
+    indices = np.arange(-1, n - 1)
+    if n:
+        indices[inicios] = np.append(inicios[1:], n) - 1
+    return indices
+
+
+def _inicios(inicios):
+    return np.zeros(1, dtype=np.int64) if inicios is None else np.asarray(inicios)
+
+
+def areas_con_signo(coords, inicios=None):
+    """
+    Área plana con signo de cada anillo: positiva si sus vértices van en
+    sentido antihorario, negativa si van en sentido horario.
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    inicios = _inicios(inicios)
+    largos = np.diff(np.append(inicios, len(coords)))
+    # Coordenadas relativas al primer vértice de cada anillo, para no perder precisión
+    x = coords[:, 0] - np.repeat(coords[inicios, 0], largos)
+    y = coords[:, 1] - np.repeat(coords[inicios, 1], largos)
+    proximos = siguientes(inicios, len(coords))
+    return np.add.reduceat(x * y[proximos] - x[proximos] * y, inicios) / 2.0
+
+
+def angulos_vertices(coords, inicios=None):
+    """
+    Ángulos interno y externo de cada vértice de uno o varios anillos cerrados.
+
+    El ángulo interno es el que queda dentro de la figura de su anillo, sea
+    cual sea el sentido en que se digitalizó: se mide desde el lado hacia el
+    vértice anterior hasta el lado hacia el siguiente en sentido antihorario
+    y, si el anillo va en sentido antihorario, se toma su complemento a 2π.
+    Los ángulos internos de un anillo de ``n`` vértices suman ``(n - 2)·π``.
+    :param coords: Arreglo (n, 2) sin repetir el primer vértice al final de cada anillo.
+    :param inicios: Posición del primer vértice de cada anillo (por defecto, un único anillo).
+    :return: Tupla ``(internos, externos)`` de arreglos float64 dentro de [0, 2π).
+    """
+    coords = np.asarray(coords, dtype=np.float64)
+    inicios = _inicios(inicios)
+    n = len(coords)
+    v1 = coords[anteriores(inicios, n)] - coords
+    v2 = coords[siguientes(inicios, n)] - coords
+    dot = v1[:, 0] * v2[:, 0] + v1[:, 1] * v2[:, 1]
+    det = v1[:, 0] * v2[:, 1] - v1[:, 1] * v2[:, 0]
+    angulos = np.arctan2(det, dot)
+    angulos = np.where(angulos < 0, angulos + DOS_PI, angulos)
+    # Sentido de cada anillo por el signo de su área, repetido en sus vértices
+    antihorario = np.repeat(areas_con_signo(coords, inicios) > 0, np.diff(np.append(inicios, n)))
+    internos = np.where(antihorario, DOS_PI - angulos, angulos)
+    internos = np.where(internos >= DOS_PI, internos - DOS_PI, internos)
+    return internos, DOS_PI - internos
+
+
+def azimuts_lados(coords, inicios=None):
+    """Azimut en radianes de cada lado (del vértice ``i`` al siguiente de su anillo)"""
+    coords = np.asarray(coords, dtype=np.float64)
+    delta = coords[siguientes(_inicios(inicios), len(coords))] - coords
+    return azimut(delta[:, 0], delta[:, 1])
+
+
+def calcular_vertices(coords, distancias=None, inicios=None):
+    """
+    Calcula lados y ángulos de todos los vértices de un polígono en una sola pasada.
+
+    Cada anillo se cierra sobre sí mismo: los lados, los ángulos y la
+    distancia acumulada nunca pasan de un anillo al siguiente.
+    :param coords: Arreglo (n, 2) con los vértices, sin repetir el primero al final de cada anillo.
+    :param distancias: Longitudes ya medidas (p. ej. elipsoidales) de cada
+        lado. Si se omite se usa la longitud plana.
+    :param inicios: Posición del primer vértice de cada anillo (``Anillos.inicios``);
+        por defecto, un único anillo.
+    :return: Una tupla ``Vertices`` de arreglos float64.
+    """
+    coords = np.asarray(coords, dtype=np.float64).reshape(-1, 2)
+    inicios = _inicios(inicios)
+    if distancias is None:
+        delta = coords[siguientes(inicios, len(coords))] - coords
+        distancia = np.hypot(delta[:, 0], delta[:, 1])
+    else:
+        distancia = np.asarray(distancias, dtype=np.float64)
+    # Distancia acumulada desde el primer vértice de cada anillo
+    dist_acum = np.cumsum(distancia)
+    if len(inicios) > 1:
+        previas = dist_acum[inicios] - distancia[inicios]
+        dist_acum -= np.repeat(previas, np.diff(np.append(inicios, len(coords))))
+    internos, externos = angulos_vertices(coords, inicios)
+    return Vertices(
+        coords[:, 0], coords[:, 1], distancia, dist_acum,
+        internos, externos, azimuts_lados(coords, inicios)
+    )
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Almacén indexado de registros de reporte.
+
+El reporte no se guarda como texto: cada registro conserva sus valores y
+una plantilla que sabe convertirlos en líneas. Las líneas solo se generan
+cuando se muestran, se buscan o se escriben a disco.
+"""
+from array import array
+from bisect import bisect_right
+from collections import OrderedDict
+
+
+class AlmacenReporte:
+    """Registros de reporte con acceso aleatorio por número de línea."""
+
+    # Número de registros ya formateados que se conservan en caché
+    TAMANO_CACHE = 256
+
+    def __init__(self):
+        self.plantillas = []
+        self.registros = []
+        self.inicio_lineas = array('q', [0])
+        self.entidades = {}
+        self._cache = OrderedDict()
+        self._texto = self.registrar_plantilla(lambda texto: [texto], 1)
+
+    def registrar_plantilla(self, funcion, n_lineas):
+        """
+        Registra una plantilla de formato.
+
+        :param funcion: Recibe los valores de un registro y devuelve una lista
+            de exactamente ``n_lineas`` cadenas (sin saltos de línea).
+        :return: Identificador de la plantilla para ``agregar``.
+        """
+        self.plantillas.append((funcion, n_lineas))
+        return len(self.plantillas) - 1
+
+    def agregar(self, plantilla, *valores, entidad=None):
+        """Añade un registro; ``entidad`` marca el inicio del bloque de una entidad"""
+        if entidad is not None and entidad not in self.entidades:
+            self.entidades[entidad] = self.inicio_lineas[-1]
+        self.registros.append((plantilla, valores))
+        self.inicio_lineas.append(self.inicio_lineas[-1] + self.plantillas[plantilla][1])
+
+    def agregar_texto(self, texto=""):
+        """Añade una línea de texto literal"""
+        self.agregar(self._texto, texto)
+
+    def total_lineas(self):
+        return self.inicio_lineas[-1]
+
+    def __len__(self):
+        return self.total_lineas()
+
+    def _lineas_registro(self, indice):
+        """Formatea un registro completo usando la caché"""
+        lineas = self._cache.get(indice)
+        if lineas is None:
+            plantilla, valores = self.registros[indice]
+            lineas = self.plantillas[plantilla][0](*valores)
+            self._cache[indice] = lineas
+            if len(self._cache) > self.TAMANO_CACHE:
+                self._cache.popitem(last=False)
+        return lineas
+
+    def _registro_de_linea(self, numero):
+        return bisect_right(self.inicio_lineas, numero) - 1
+
+    def linea(self, numero):
+        """Devuelve la línea ``numero`` del reporte"""
+        indice = self._registro_de_linea(numero)
+        return self._lineas_registro(indice)[numero - self.inicio_lineas[indice]]
+
+    def lineas(self, inicio=0, fin=None):
+        """Genera las líneas del intervalo [inicio, fin) sin construir el texto completo"""
+        fin = self.total_lineas() if fin is None else min(fin, self.total_lineas())
+        if inicio >= fin:
+            return
+        indice = self._registro_de_linea(inicio)
+        numero = inicio
+        while numero < fin:
+            plantilla, valores = self.registros[indice]
+            lineas = self.plantillas[plantilla][0](*valores)
+            desde = numero - self.inicio_lineas[indice]
+            for texto in lineas[desde:desde + fin - numero]:
+                yield texto
+                numero += 1
+            indice += 1
+
+    def linea_de_entidad(self, entidad):
+        """Número de la primera línea del bloque de una entidad, o -1 si no existe"""
+        return self.entidades.get(entidad, -1)
+
+    def buscar(self, texto, desde=0):
+        """Número de la primera línea desde ``desde`` que contiene ``texto`` (sin distinguir mayúsculas)"""
+        texto = texto.lower()
+        for numero, linea in enumerate(self.lineas(desde), desde):
+            if texto in linea.lower():
+                return numero
+        return -1
+
+    def escribir(self, ruta, encoding='utf-8'):
+        """Escribe el reporte en un archivo de texto línea a línea"""
+        with open(ruta, 'w', encoding=encoding) as f:
+            primera = True
+            for linea in self.lineas():
+                if not primera:
+                    f.write("\n")
+                f.write(linea)
+                primera = False
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""Cálculo vectorizado de segmentos de polilíneas."""
+from collections import namedtuple
+
+import numpy as np
+
+DOS_PI = 2.0 * np.pi
+
+Segmentos = namedtuple('Segmentos', [
+    'x_ini', 'y_ini', 'x_fin', 'y_fin',
+    'dx', 'dy', 'azimut', 'longitud', 'long_acum',
+    'x_med', 'y_med'
+])
+Segmentos.__doc__ = "Arreglos con una posición por segmento (azimut en radianes)."
+
+
+def azimut(dx, dy):
+    """Azimut (desde el norte, sentido horario) en radianes dentro de [0, 2π)"""
+    angulo = np.arctan2(dx, dy)
+    return np.where(angulo < 0, angulo + DOS_PI, angulo)
+
+
+def calcular_segmentos(partes, longitudes=None):
+    """
+    Calcula todos los segmentos de una o varias polilíneas en una sola pasada.
+
+    :param partes: Lista de arreglos (n, 2) con los vértices de cada parte.
+        Los segmentos nunca unen el final de una parte con el inicio de la siguiente.
+    :param longitudes: Longitudes ya medidas (p. ej. elipsoidales) para cada
+        segmento. Si se omite se usa la longitud plana.
+    :return: Una tupla ``Segmentos`` de arreglos float64.
+    """
+    partes = [np.asarray(p, dtype=np.float64) for p in partes if len(p) >= 2]
+    if not partes:
+        vacio = np.empty(0, dtype=np.float64)
+        return Segmentos(*([vacio] * len(Segmentos._fields)))
+
+    inicio = np.concatenate([p[:-1] for p in partes])
+    fin = np.concatenate([p[1:] for p in partes])
+
+    x_ini, y_ini = inicio[:, 0], inicio[:, 1]
+    x_fin, y_fin = fin[:, 0], fin[:, 1]
+    dx = x_fin - x_ini
+    dy = y_fin - y_ini
+
+    if longitudes is None:
+        longitud = np.hypot(dx, dy)
+    else:
+        longitud = np.asarray(longitudes, dtype=np.float64)
+
+    return Segmentos(
+        x_ini, y_ini, x_fin, y_fin,
+        dx, dy, azimut(dx, dy), longitud, np.cumsum(longitud),
+        (x_ini + x_fin) / 2.0, (y_ini + y_fin) / 2.0
+    )
+
+
+# Tipos de punto de un cadenamiento
+INICIO = 'inicio'
+ESTACION = 'estacion'
+VERTICE = 'vertice'
+FIN = 'fin'
+
+Estaciones = namedtuple('Estaciones', ['cadenamiento', 'x', 'y', 'azimut', 'segmento', 'tipo'])
+Estaciones.__doc__ = ("Arreglos con una posición por punto del cadenamiento, ordenados a lo largo "
+                      "de la línea (azimut en radianes del segmento que contiene el punto).")
+
+
+def calcular_estaciones(partes, longitudes=None, intervalo=20.0, inicial=0.0):
+    """
+    Genera los puntos de cadenamiento de una polilínea en una sola pasada.
+
+    Se obtienen las estaciones cada ``intervalo`` (múltiplos exactos del
+    intervalo, contados desde la estación ``inicial``), todos los vértices y
+    el final de la línea. Cada estación se sitúa buscando su segmento sobre
+    las longitudes acumuladas e interpolando dentro de él. Si una estación
+    coincide con un vértice se conserva solo el vértice. En las líneas
+    multiparte el cadenamiento continúa de una parte a la siguiente sin
+    contar el salto entre ellas.
+
+    :param partes: Lista de arreglos (n, 2) con los vértices de cada parte.
+    :param longitudes: Longitudes ya medidas de cada segmento (ver ``calcular_segmentos``).
+    :param intervalo: Distancia entre estaciones, en las unidades de ``longitudes``.
+    :param inicial: Cadenamiento del primer vértice.
+    :return: Una tupla ``Estaciones``.
+    """
+    if intervalo <= 0:
+        raise ValueError("El intervalo entre estaciones debe ser mayor que cero")
+    seg = calcular_segmentos(partes, longitudes)
+    n = len(seg.azimut)
+    if not n:
+        vacio = np.empty(0, dtype=np.float64)
+        return Estaciones(vacio, vacio, vacio, vacio, np.empty(0, dtype=np.int64), np.empty(0, dtype=object))
+
+    acum_ini = seg.long_acum - seg.longitud
+    total = seg.long_acum[-1]
+    tolerancia = 1e-9 * max(total, 1.0)
+
+    # Último segmento de cada parte (las partes con menos de dos vértices no tienen segmentos)
+    n_partes = np.array([len(p) - 1 for p in partes if len(p) >= 2])
+    finales = np.cumsum(n_partes) - 1
+
+    # Estaciones intermedias: múltiplos del intervalo dentro de (inicial, inicial + total)
+    primera = np.floor(inicial / intervalo + 1.0) * intervalo
+    absolutas = np.arange(primera, inicial + total - tolerancia, intervalo)
+    distancias = absolutas - inicial
+    # Se descartan las que coinciden con un vértice
+    vertices = np.concatenate((acum_ini, seg.long_acum[finales]))
+    vertices.sort()
+    cercano = np.clip(np.searchsorted(vertices, distancias), 1, len(vertices) - 1)
+    separacion = np.minimum(np.abs(vertices[cercano] - distancias), np.abs(vertices[cercano - 1] - distancias))
+    distancias = distancias[separacion > tolerancia]
+    en_segmento = np.clip(np.searchsorted(seg.long_acum, distancias, side='right'), 0, n - 1)
+    longitud = seg.longitud[en_segmento]
+    con_longitud = longitud > 0
+    t_estaciones = np.where(con_longitud,
+                            (distancias - acum_ini[en_segmento]) / np.where(con_longitud, longitud, 1.0), 0.0)
+
+    # Segmento y fracción (0 = inicio, 1 = fin) de cada punto; el orden por (segmento, fracción)
+    # sigue la línea. Los vértices finales de cada parte van tras las estaciones de su segmento.
+    segmento = np.concatenate((np.arange(n), en_segmento, finales))
+    t = np.concatenate((np.zeros(n), np.clip(t_estaciones, 0.0, 1.0), np.ones(len(finales))))
+    tipo = np.concatenate((np.full(n, VERTICE, dtype=object), np.full(len(distancias), ESTACION, dtype=object),
+                           np.full(len(finales), VERTICE, dtype=object)))
+    orden = np.lexsort((t, segmento))
+    segmento, t, tipo = segmento[orden], t[orden], tipo[orden]
+    tipo[0] = INICIO
+    tipo[-1] = FIN
+
+    return Estaciones(
+        inicial + acum_ini[segmento] + t * seg.longitud[segmento],
+        seg.x_ini[segmento] + t * seg.dx[segmento],
+        seg.y_ini[segmento] + t * seg.dy[segmento],
+        seg.azimut[segmento],
+        segmento + 1,
+        tipo
+    )
+
+
+def etiquetas_estaciones(cadenamientos, decimales=3):
+    """
+    Etiquetas de cadenamiento en kilómetros y metros, p. ej. ``0+120.000``.
+    Versión vectorizada; devuelve una lista de cadenas.
+    """
+    redondeados = np.round(np.asarray(cadenamientos, dtype=np.float64), decimales)
+    signo = np.where(redondeados < 0, '-', '')
+    redondeados = np.abs(redondeados)
+    kilometros = np.floor(redondeados / 1000.0 + 1e-12).astype(np.int64)
+    metros = np.maximum(np.round(redondeados - kilometros * 1000.0, decimales), 0.0)
+    ancho = 4 + decimales if decimales else 3
+    return [f"{s}{km}+{m:0{ancho}.{decimales}f}" for s, km, m in zip(signo, kilometros.tolist(), metros.tolist())]
@@ -0,0 +1,210 @@
+# -*- coding: utf-8 -*-
+"""
+Tabla columnar de resultados.
+
+Los cálculos escriben sus resultados una sola vez en una ``TablaResultados``
+con columnas tipadas y máscara de nulos. La capa QGIS, el CSV, el Excel y el
+reporte leen directamente de la tabla, sin volver a recorrer entidades.
+"""
+import csv
+from array import array
+
+import numpy as np
+
+# Tipos de columna
+ENTERO = 'entero'
+REAL = 'real'
+TEXTO = 'texto'
+
+_CODIGOS = {ENTERO: 'q', REAL: 'd'}
+_DTYPES = {ENTERO: np.int64, REAL: np.float64}
+
+# Filas que se materializan a la vez al recorrer la tabla
+TAMANO_BLOQUE = 10000
+
+
+class Columna:
+    """Valores de una columna y su máscara de nulos (1 = nulo)."""
+
+    def __init__(self, nombre, tipo, visible=True):
+        """
+        :param nombre: Nombre del campo.
+        :param tipo: ENTERO, REAL o TEXTO.
+        :param visible: False para columnas auxiliares (p. ej. la geometría)
+            que no se exportan.
+        """
+        if tipo not in (ENTERO, REAL, TEXTO):
+            raise ValueError(f"Tipo de columna no válido: {tipo}")
+        self.nombre = nombre
+        self.tipo = tipo
+        self.visible = visible
+        self.valores = [] if tipo == TEXTO else array(_CODIGOS[tipo])
+        self.nulos = bytearray()
+        self.n_nulos = 0
+
+    def __len__(self):
+        return len(self.nulos)
+
+    def _relleno(self):
+        return None if self.tipo == TEXTO else 0
+
+    def extender(self, valores, n):
+        """
+        Añade ``n`` valores. ``valores`` puede ser un arreglo NumPy, una
+        secuencia (con ``None`` como nulo), un escalar que se repite o ``None``.
+        """
+        if valores is None:
+            self.valores.extend([self._relleno()] * n)
+            self.nulos.extend(b'\x01' * n)
+            self.n_nulos += n
+            return
+
+        if isinstance(valores, np.ndarray):
+            if len(valores) != n:
+                raise ValueError(f"La columna '{self.nombre}' recibió {len(valores)} valores de {n}")
+            if self.tipo == TEXTO:
+                self.valores.extend(valores.tolist())
+            else:
+                self.valores.frombytes(np.ascontiguousarray(valores, dtype=_DTYPES[self.tipo]).tobytes())
+            self.nulos.extend(bytes(n))
+            return
+
+        if isinstance(valores, (str, bytes)) or not hasattr(valores, '__len__'):
+            valores = [valores] * n
+        elif len(valores) != n:
+            raise ValueError(f"La columna '{self.nombre}' recibió {len(valores)} valores de {n}")
+
+        nulos = bytes(v is None for v in valores)
+        n_nulos = nulos.count(1)
+        if n_nulos:
+            relleno = self._relleno()
+            valores = [relleno if v is None else v for v in valores]
+            self.n_nulos += n_nulos
+        self.valores.extend(valores)
+        self.nulos.extend(nulos)
+
+    def anexar(self, otra, inicio=0, fin=None):
+        """Añade al final los valores [inicio, fin) de otra columna del mismo tipo"""
+        if inicio == 0 and (fin is None or fin >= len(otra)):
+            self.valores.extend(otra.valores)
+            self.nulos.extend(otra.nulos)
+            self.n_nulos += otra.n_nulos
+            return
+        nulos = otra.nulos[inicio:fin]
+        self.valores.extend(otra.valores[inicio:fin])
+        self.nulos.extend(nulos)
+        self.n_nulos += nulos.count(1)
+
+    def valor(self, fila):
+        """Valor de una fila, ``None`` si es nulo"""
+        return None if self.nulos[fila] else self.valores[fila]
+
+    def lista(self, inicio, fin):
+        """Valores del intervalo [inicio, fin) como lista de Python con ``None`` en los nulos"""
+        valores = self.valores[inicio:fin]
+        if self.tipo != TEXTO:
+            valores = valores.tolist()
+        if self.n_nulos and self.tipo != TEXTO:
+            nulos = self.nulos[inicio:fin]
+            if nulos.count(1):
+                valores = [None if m else v for v, m in zip(valores, nulos)]
+        return valores
+
+    def arreglo(self):
+        """Copia de la columna como arreglo NumPy y máscara booleana de nulos"""
+        if self.tipo == TEXTO:
+            datos = np.array(self.valores, dtype=object)
+        else:
+            datos = np.array(self.valores, dtype=_DTYPES[self.tipo])
+        return datos, np.frombuffer(bytes(self.nulos), dtype=np.uint8).astype(bool)
+
+
+class TablaResultados:
+    """Tabla de resultados organizada por columnas."""
+
+    def __init__(self, columnas):
+        """
+        :param columnas: Secuencia de tuplas ``(nombre, tipo)`` o
+            ``(nombre, tipo, visible)`` en el orden de salida.
+        """
+        self.columnas = [Columna(*definicion) for definicion in columnas]
+        self._indice = {c.nombre: c for c in self.columnas}
+        self.n_filas = 0
+
+    def __len__(self):
+        return self.n_filas
+
+    def __contains__(self, nombre):
+        return nombre in self._indice
+
+    def columna(self, nombre):
+        return self._indice[nombre]
+
+    def nombres(self):
+        """Nombres de las columnas que se exportan, en orden"""
+        return [c.nombre for c in self.columnas if c.visible]
+
+    def definiciones(self):
+        """Pares (nombre, tipo) de las columnas que se exportan"""
+        return [(c.nombre, c.tipo) for c in self.columnas if c.visible]
+
+    def agregar_bloque(self, n, **valores):
+        """
+        Añade ``n`` filas de una vez.
+
+        Cada argumento con nombre de columna recibe lo admitido por
+        ``Columna.extender``; las columnas omitidas quedan nulas. Los
+        argumentos ``None`` de columnas que la tabla no tiene (opciones no
+        elegidas) se ignoran.
+        :return: Índice de la primera fila añadida.
+        """
+        desconocidas = {nombre for nombre, v in valores.items() if v is not None} - set(self._indice)
+        if desconocidas:
+            raise KeyError(f"Columnas desconocidas: {', '.join(sorted(desconocidas))}")
+        inicio = self.n_filas
+        for columna in self.columnas:
+            columna.extender(valores.get(columna.nombre), n)
+        self.n_filas += n
+        return inicio
+
+    def vacia(self):
+        """Tabla sin filas con las mismas columnas"""
+        return TablaResultados([(c.nombre, c.tipo, c.visible) for c in self.columnas])
+
+    def anexar(self, otra, inicio=0, fin=None):
+        """
+        Añade al final las filas [inicio, fin) de otra tabla con las mismas
+        columnas (p. ej. la tabla parcial de un proceso de trabajo).
+        :return: Índice de la primera fila añadida.
+        """
+        if [(c.nombre, c.tipo) for c in otra.columnas] != [(c.nombre, c.tipo) for c in self.columnas]:
+            raise ValueError("Las tablas no tienen las mismas columnas")
+        fin = otra.n_filas if fin is None else min(fin, otra.n_filas)
+        primera = self.n_filas
+        for columna, anexa in zip(self.columnas, otra.columnas):
+            columna.anexar(anexa, inicio, fin)
+        self.n_filas += max(0, fin - inicio)
+        return primera
+
+    def valor(self, nombre, fila):
+        return self._indice[nombre].valor(fila)
+
+    def filas(self, inicio=0, fin=None, nombres=None):
+        """
+        Genera las filas de [inicio, fin) como tuplas, materializando solo
+        ``TAMANO_BLOQUE`` filas a la vez.
+        :param nombres: Columnas a incluir (por defecto, las visibles).
+        """
+        fin = self.n_filas if fin is None else min(fin, self.n_filas)
+        columnas = [self._indice[n] for n in (nombres if nombres is not None else self.nombres())]
+        for desde in range(inicio, fin, TAMANO_BLOQUE):
+            hasta = min(desde + TAMANO_BLOQUE, fin)
+            yield from zip(*[c.lista(desde, hasta) for c in columnas])
+
+
+def escribir_csv(tabla, ruta, encoding='utf-8'):
+    """Escribe las columnas visibles de la tabla en un CSV (los nulos quedan vacíos)"""
+    with open(ruta, 'w', newline='', encoding=encoding) as f:
+        writer = csv.writer(f)
+        writer.writerow(tabla.nombres())
+        writer.writerows(tabla.filas())
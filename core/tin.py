@@ -0,0 +1,188 @@
+# -*- coding: utf-8 -*-
+"""
+Curvas de nivel directamente sobre la triangulación de Delaunay de los puntos.
+
+La triangulación se calcula una sola vez (con SciPy) y se puede guardar y
+reutilizar; las curvas de cualquier intervalo se obtienen recorriendo los
+triángulos ("marching triangles"), sin rejilla intermedia, de modo que son
+exactas para la superficie lineal por triángulos.
+
+En cada triángulo que cruza una cota se genera un segmento entre los dos
+lados cortados, orientado con la parte alta a la izquierda. Cada corte se
+identifica por la cota y el lado (compartido por los dos triángulos
+vecinos), de modo que el final de un segmento es el inicio del siguiente.
+Los segmentos se encadenan sin bucles por segmento: el orden de cada cadena
+se obtiene por saltos de punteros (O(n log n) operaciones de arreglo).
+"""
+from collections import namedtuple
+
+import numpy as np
+
+from .curvas import Curvas, unir_tramos
+
+# Pares (triángulo, cota) que se procesan a la vez
+ELEMENTOS_BLOQUE = 2000000
+# Rejilla de ajuste con la que se unen las cadenas que se cortan en un vértice de cota exacta
+TOLERANCIA_VERTICE = 1e-9
+
+Triangulacion = namedtuple('Triangulacion', ['xy', 'z', 'triangulos'])
+Triangulacion.__doc__ = (
+    "Triangulación de Delaunay: ``xy`` (n, 2) y ``z`` (n,) de los puntos sin repetir y "
+    "``triangulos`` (m, 3) con los índices de sus vértices en sentido antihorario.")
+
+
+def triangular(xy, z):
+    """
+    Triangulación de Delaunay de los puntos (requiere SciPy). Los puntos
+    repetidos conservan la primera cota.
+    :return: Triangulacion
+    """
+    from scipy.spatial import Delaunay
+    xy, primeros = np.unique(np.asarray(xy, dtype=np.float64), axis=0, return_index=True)
+    z = np.asarray(z, dtype=np.float64)[primeros]
+    triangulos = Delaunay(xy).simplices.astype(np.int64)
+    a, b, c = (xy[triangulos[:, i]] for i in range(3))
+    horario = (b[:, 0] - a[:, 0]) * (c[:, 1] - a[:, 1]) - (b[:, 1] - a[:, 1]) * (c[:, 0] - a[:, 0]) < 0
+    triangulos[horario] = triangulos[horario][:, [0, 2, 1]]
+    return Triangulacion(xy, z, triangulos)
+
+
+def guardar_triangulacion(triangulacion, ruta):
+    """Guarda la triangulación en un archivo ``.npz``"""
+    with open(ruta, 'wb') as archivo:
+        np.savez(archivo, **triangulacion._asdict())
+    return ruta
+
+
+def leer_triangulacion(ruta):
+    with np.load(ruta) as datos:
+        return Triangulacion(*(datos[campo] for campo in Triangulacion._fields))
+
+
+def _aristas(triangulos, n):
+    """Id de cada lado (m, 3) de los triángulos; el lado k va del vértice k al k + 1"""
+    inicio = triangulos
+    fin = np.roll(triangulos, -1, axis=1)
+    claves = np.minimum(inicio, fin) * n + np.maximum(inicio, fin)
+    _, aristas = np.unique(claves, return_inverse=True)
+    return aristas.reshape(triangulos.shape)
+
+
+def _segmentos(triangulacion, aristas, intervalo, base, factor_z):
+    """
+    Segmentos de curva de todos los triángulos.
+    :return: (número de cota, clave de inicio, clave de fin, punto inicial, punto final)
+    """
+    xy, t = triangulacion.xy, triangulacion.triangulos
+    zt = (triangulacion.z * factor_z)[t]
+    k_min = np.ceil((zt.min(axis=1) - base) / intervalo).astype(np.int64)
+    k_max = np.floor((zt.max(axis=1) - base) / intervalo).astype(np.int64)
+    cuenta = np.maximum(k_max - k_min + 1, 0)
+    n_aristas = int(aristas.max()) + 1 if aristas.size else 0
+    k_base = int(k_min.min()) if len(k_min) else 0
+
+    partes = []
+    acumulado = np.concatenate(([0], np.cumsum(cuenta)))
+    inicio = 0
+    while inicio < len(t):
+        # Bloque de triángulos con hasta ELEMENTOS_BLOQUE pares (triángulo, cota)
+        fin = max(int(np.searchsorted(acumulado, acumulado[inicio] + ELEMENTOS_BLOQUE, side='right')) - 1,
+                  inicio + 1)
+        fin = min(fin, len(t))
+        repeticiones = cuenta[inicio:fin]
+        tri = np.repeat(np.arange(inicio, fin), repeticiones)
+        desplazamiento = np.arange(len(tri)) - np.repeat(acumulado[inicio:fin] - acumulado[inicio], repeticiones)
+        k = k_min[tri] + desplazamiento
+        cota = base + k * intervalo
+        inicio = fin
+
+        v = zt[tri]
+        arriba = v >= cota[:, None]
+        siguiente = np.roll(arriba, -1, axis=1)
+        # Lado por el que el borde (antihorario) pasa de arriba a abajo y lado por el que vuelve a subir
+        lado_ini = np.argmax(arriba & ~siguiente, axis=1)
+        lado_fin = np.argmax(~arriba & siguiente, axis=1)
+        mixto = arriba.any(axis=1) & ~arriba.all(axis=1)
+        tri, k, cota, lado_ini, lado_fin = tri[mixto], k[mixto], cota[mixto], lado_ini[mixto], lado_fin[mixto]
+
+        puntos = []
+        for lado in (lado_ini, lado_fin):
+            a = t[tri, lado]
+            b = t[tri, (lado + 1) % 3]
+            # Corte calculado siempre desde el vértice de menor índice: ambos triángulos dan el mismo punto
+            p, q = np.minimum(a, b), np.maximum(a, b)
+            zp, zq = triangulacion.z[p] * factor_z, triangulacion.z[q] * factor_z
+            f = (cota - zp) / (zq - zp)
+            punto = xy[p] + f[:, None] * (xy[q] - xy[p])
+            punto[f == 1.0] = xy[q[f == 1.0]]
+            puntos.append(punto)
+        claves_ini = (k - k_base) * n_aristas + aristas[tri, lado_ini]
+        claves_fin = (k - k_base) * n_aristas + aristas[tri, lado_fin]
+        # Los segmentos de longitud nula (cota exacta en un vértice) no aportan nada
+        util = (puntos[0] != puntos[1]).any(axis=1)
+        partes.append((k[util], claves_ini[util], claves_fin[util], puntos[0][util], puntos[1][util]))
+
+    if not partes:
+        vacio = np.empty(0, dtype=np.int64)
+        return vacio, vacio, vacio, np.empty((0, 2)), np.empty((0, 2))
+    return tuple(np.concatenate(columna) for columna in zip(*partes))
+
+
+def _encadenar(claves_ini, claves_fin):
+    """
+    Ordena los segmentos en cadenas: el segmento que sigue a otro es el que
+    empieza en la clave en que este termina. Las cadenas cerradas se abren
+    por su segmento de menor índice.
+    :return: (orden de los segmentos, cadena de cada segmento en ese orden)
+    """
+    n = len(claves_ini)
+    indices = np.arange(n)
+    orden_ini = np.argsort(claves_ini, kind='stable')
+    posicion = np.minimum(np.searchsorted(claves_ini[orden_ini], claves_fin), max(n - 1, 0))
+    siguiente = np.where(claves_ini[orden_ini][posicion] == claves_fin, orden_ini[posicion], -1)
+    rondas = max(1, int(np.ceil(np.log2(max(n, 2)))) + 1)
+
+    # Ciclos: los segmentos que no llegan a un final tras n saltos; se abren por su menor índice
+    salto = np.where(siguiente >= 0, siguiente, indices)
+    minimo = indices.copy()
+    for _ in range(rondas):
+        minimo, salto = np.minimum(minimo, minimo[salto]), salto[salto]
+    en_ciclo = siguiente[salto] >= 0
+    anterior = np.full(n, -1)
+    con_siguiente = siguiente >= 0
+    anterior[siguiente[con_siguiente]] = indices[con_siguiente]
+    siguiente[anterior[en_ciclo & (minimo == indices)]] = -1
+
+    # Distancia de cada segmento al final de su cadena (saltos de punteros)
+    salto = np.where(siguiente >= 0, siguiente, indices)
+    distancia = (siguiente >= 0).astype(np.int64)
+    for _ in range(rondas):
+        distancia, salto = distancia + distancia[salto], salto[salto]
+    orden = np.lexsort((-distancia, salto))
+    final = salto[orden]
+    cadena = np.concatenate(([0], np.cumsum(final[1:] != final[:-1])))
+    return orden, cadena
+
+
+def curvas_tin(triangulacion, intervalo, base=0.0, factor_z=1.0):
+    """
+    Curvas de nivel de la superficie lineal de la triangulación.
+    :return: Curvas; las cerradas repiten el primer vértice al final.
+    """
+    n = len(triangulacion.z)
+    aristas = _aristas(triangulacion.triangulos, n)
+    k, claves_ini, claves_fin, punto_ini, punto_fin = _segmentos(triangulacion, aristas, intervalo, base, factor_z)
+    if not len(k):
+        return Curvas(np.empty(0), np.empty((0, 2)), np.empty(0, dtype=np.int64))
+
+    orden, cadena = _encadenar(claves_ini, claves_fin)
+    n_cadenas = int(cadena[-1]) + 1
+    ultimo = np.append(np.flatnonzero(cadena[1:] != cadena[:-1]), len(orden) - 1)
+    # Cada cadena: el punto inicial de cada segmento y el final del último
+    coords = np.empty((len(orden) + n_cadenas, 2))
+    coords[np.arange(len(orden)) + cadena] = punto_ini[orden]
+    coords[ultimo + np.arange(n_cadenas) + 1] = punto_fin[orden[ultimo]]
+    inicios = np.concatenate(([0], ultimo[:-1] + np.arange(1, n_cadenas) + 1))
+    cotas = base + k[orden[ultimo]] * intervalo
+    # Las cadenas que pasan justo por un vértice se cortan allí; se unen por sus extremos
+    return unir_tramos(Curvas(cotas, coords, inicios), TOLERANCIA_VERTICE)
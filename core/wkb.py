@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""Decodificación de geometrías WKB a arreglos de coordenadas."""
+import struct
+
+import numpy as np
+
+# Tipos base de geometría según la especificación WKB
+PUNTO = 1
+LINEA = 2
+POLIGONO = 3
+MULTIPUNTO = 4
+MULTILINEA = 5
+MULTIPOLIGONO = 6
+COLECCION = 7
+
+
+def _tipo_y_dimensiones(tipo):
+    """Devuelve el tipo base y el número de ordenadas de un código WKB (ISO o EWKB)"""
+    tiene_z = bool(tipo & 0x80000000)
+    tiene_m = bool(tipo & 0x40000000)
+    tipo &= 0x0FFFFFFF
+    familia, base = divmod(tipo, 1000)
+    if familia in (1, 3):
+        tiene_z = True
+    if familia in (2, 3):
+        tiene_m = True
+    return base, 2 + int(tiene_z) + int(tiene_m)
+
+
+def _leer_coordenadas(buf, offset, endian, dimensiones):
+    """Lee una secuencia de puntos y devuelve un arreglo (n, 2) contiguo en float64"""
+    n = struct.unpack_from(endian + 'I', buf, offset)[0]
+    offset += 4
+    valores = np.frombuffer(buf, dtype=endian + 'f8', count=n * dimensiones, offset=offset)
+    coords = np.ascontiguousarray(valores.reshape(n, dimensiones)[:, :2], dtype=np.float64)
+    return coords, offset + n * dimensiones * 8
+
+
+def _leer_geometria(buf, offset):
+    """Lee una geometría a partir de ``offset`` y devuelve (tipo_base, partes, nuevo_offset)"""
+    endian = '<' if buf[offset] == 1 else '>'
+    tipo = struct.unpack_from(endian + 'I', buf, offset + 1)[0]
+    offset += 5
+    base, dimensiones = _tipo_y_dimensiones(tipo)
+
+    if base == PUNTO:
+        valores = np.frombuffer(buf, dtype=endian + 'f8', count=dimensiones, offset=offset)
+        coords = np.ascontiguousarray(valores[:2].reshape(1, 2), dtype=np.float64)
+        return base, [[coords]], offset + dimensiones * 8
+
+    if base == LINEA:
+        coords, offset = _leer_coordenadas(buf, offset, endian, dimensiones)
+        return base, [[coords]], offset
+
+    if base == POLIGONO:
+        n_anillos = struct.unpack_from(endian + 'I', buf, offset)[0]
+        offset += 4
+        anillos = []
+        for _ in range(n_anillos):
+            coords, offset = _leer_coordenadas(buf, offset, endian, dimensiones)
+            anillos.append(coords)
+        return base, [anillos], offset
+
+    if base in (MULTIPUNTO, MULTILINEA, MULTIPOLIGONO, COLECCION):
+        n_partes = struct.unpack_from(endian + 'I', buf, offset)[0]
+        offset += 4
+        partes = []
+        for _ in range(n_partes):
+            _, subpartes, offset = _leer_geometria(buf, offset)
+            partes.extend(subpartes)
+        return base, partes, offset
+
+    raise ValueError(f"Tipo de geometría WKB no soportado: {tipo}")
+
+
+def decodificar(wkb):
+    """
+    Decodifica una geometría WKB.
+
+    Devuelve el tipo base y una lista de partes; cada parte es una lista de
+    anillos (o una única secuencia para puntos y líneas) representados como
+    arreglos (n, 2) de float64. Las ordenadas Z y M se descartan.
+    """
+    buf = bytes(wkb)
+    base, partes, _ = _leer_geometria(buf, 0)
+    return base, partes
@@ -0,0 +1,8 @@
+# -*- coding: utf-8 -*-
+"""
+Proveedor de Processing del plugin Topografía.
+
+Expone las herramientas de líneas, polígonos y curvas de nivel como
+algoritmos de Processing, utilizables desde la interfaz por lotes, los
+modelos gráficos y ``qgis_process`` sin interfaz gráfica.
+"""
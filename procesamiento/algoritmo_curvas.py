@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsProcessing, QgsProcessingAlgorithm, QgsProcessingException,
+                       QgsProcessingParameterMapLayer, QgsProcessingParameterField,
+                       QgsProcessingParameterEnum, QgsProcessingParameterNumber,
+                       QgsProcessingParameterVectorDestination, QgsProcessingParameterRasterDestination,
+                       QgsRasterLayer, QgsVectorLayer,
+                       QgsWkbTypes)
+from qgis.PyQt.QtGui import QIcon
+import os
+
+from .base import RUTA_ICONOS
+from ..tools.calculo_curvas import (METODOS_INTERPOLACION, TIN, leer_puntos, interpolar_puntos, interpolar_rejilla,
+                                    triangular_puntos, guardar_rejilla, generar_curvas, escribir_curvas)
+from ..core.curvas import curvas_rejilla
+from ..core.interpolacion import ParametrosIdw
+from ..core.tin import curvas_tin
+
+
+class AlgoritmoCurvas(QgsProcessingAlgorithm):
+    """Equivalente en Processing del diálogo 'Curvas de Nivel'."""
+    INPUT = 'INPUT'
+    CAMPO_ALTURA = 'CAMPO_ALTURA'
+    METODO = 'METODO'
+    INTERVALO = 'INTERVALO'
+    BASE = 'BASE'
+    FACTOR_Z = 'FACTOR_Z'
+    POTENCIA = 'POTENCIA'
+    VECINOS = 'VECINOS'
+    RADIO = 'RADIO'
+    MINIMO_VECINOS = 'MINIMO_VECINOS'
+    PROCESOS = 'PROCESOS'
+    OUTPUT = 'OUTPUT'
+    RASTER = 'RASTER'
+
+    def createInstance(self):
+        return AlgoritmoCurvas()
+
+    def name(self):
+        return 'curvas_nivel'
+
+    def displayName(self):
+        return "Curvas de nivel"
+
+    def group(self):
+        return "Cálculos topográficos"
+
+    def groupId(self):
+        return 'calculos'
+
+    def icon(self):
+        return QIcon(os.path.join(RUTA_ICONOS, 'curvas.png'))
+
+    def shortHelpString(self):
+        return ("Genera curvas de nivel a partir de un ráster de elevación o de una capa de puntos "
+                "con un campo de altura. Con TIN las curvas se trazan directamente sobre la triangulación "
+                "de los puntos; con IDW los puntos se interpolan primero a un ráster (con los vecinos de "
+                "cada celda, buscados en un árbol KD). "
+                "Los ráster grandes se dividen en teselas que se procesan en varios procesos.")
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterMapLayer(
+            self.INPUT, "Capa de entrada (ráster o puntos)",
+            types=[QgsProcessing.TypeRaster, QgsProcessing.TypeVectorPoint]))
+        self.addParameter(QgsProcessingParameterField(
+            self.CAMPO_ALTURA, "Campo de altura (solo puntos)", parentLayerParameterName=self.INPUT,
+            type=QgsProcessingParameterField.Numeric, optional=True))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.METODO, "Método de interpolación (solo puntos)",
+            options=METODOS_INTERPOLACION, defaultValue=0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.POTENCIA, "Potencia IDW", QgsProcessingParameterNumber.Double,
+            defaultValue=2.0, minValue=0.1))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.VECINOS, "Vecinos más cercanos IDW (0 = todos los del radio)",
+            QgsProcessingParameterNumber.Integer, defaultValue=12, minValue=0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.RADIO, "Radio de búsqueda IDW (0 = sin límite)", QgsProcessingParameterNumber.Double,
+            defaultValue=0.0, minValue=0.0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.MINIMO_VECINOS, "Mínimo de vecinos IDW", QgsProcessingParameterNumber.Integer,
+            defaultValue=1, minValue=1))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.INTERVALO, "Intervalo", QgsProcessingParameterNumber.Double,
+            defaultValue=10.0, minValue=0.1))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.BASE, "Curva base", QgsProcessingParameterNumber.Double, defaultValue=0.0))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.FACTOR_Z, "Factor Z", QgsProcessingParameterNumber.Double,
+            defaultValue=1.0, minValue=0.001))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.PROCESOS, "Procesos de trabajo para ráster grandes (0 = automático, 1 = un solo paso)",
+            QgsProcessingParameterNumber.Integer, defaultValue=0, minValue=0))
+        self.addParameter(QgsProcessingParameterVectorDestination(
+            self.OUTPUT, "Curvas de nivel", QgsProcessing.TypeVectorLine))
+        self.addParameter(QgsProcessingParameterRasterDestination(
+            self.RASTER, "Ráster interpolado (solo puntos)", optional=True, createByDefault=False))
+
+    def processAlgorithm(self, parameters, context, feedback):
+        layer = self.parameterAsLayer(parameters, self.INPUT, context)
+        if layer is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        intervalo = self.parameterAsDouble(parameters, self.INTERVALO, context)
+        base = self.parameterAsDouble(parameters, self.BASE, context)
+        factor_z = self.parameterAsDouble(parameters, self.FACTOR_Z, context)
+        procesos = self.parameterAsInt(parameters, self.PROCESOS, context)
+        salida = self.parameterAsOutputLayer(parameters, self.OUTPUT, context)
+        ruta_raster = None
+
+        if isinstance(layer, QgsRasterLayer):
+            raster = layer.source()
+        elif isinstance(layer, QgsVectorLayer) and layer.geometryType() == QgsWkbTypes.PointGeometry:
+            campo_altura = self.parameterAsString(parameters, self.CAMPO_ALTURA, context)
+            if not campo_altura:
+                raise QgsProcessingException("Seleccione un campo de altura para la capa de puntos")
+            if layer.featureCount() < 3:
+                raise QgsProcessingException("La capa de puntos debe tener al menos 3 puntos")
+
+            metodo = self.parameterAsEnum(parameters, self.METODO, context)
+            ruta_raster = self.parameterAsOutputLayer(parameters, self.RASTER, context)
+            feedback.pushInfo(f"Interpolando puntos con {METODOS_INTERPOLACION[metodo]}...")
+            try:
+                parametros_idw = ParametrosIdw(
+                    self.parameterAsDouble(parameters, self.POTENCIA, context),
+                    self.parameterAsInt(parameters, self.VECINOS, context),
+                    self.parameterAsDouble(parameters, self.RADIO, context),
+                    self.parameterAsInt(parameters, self.MINIMO_VECINOS, context))
+                puntos = leer_puntos(layer, campo_altura)
+                # Con TIN las curvas salen directamente de la triangulación; el ráster solo si se pide
+                triangulacion = triangular_puntos(layer, campo_altura, puntos=puntos) if metodo == TIN else None
+                rejilla = None
+                if triangulacion is None or ruta_raster:
+                    rejilla = interpolar_rejilla(layer, campo_altura, metodo, puntos=puntos,
+                                                 parametros_idw=parametros_idw, trabajadores=procesos)
+                if rejilla is None and triangulacion is None:
+                    # Sin SciPy, TIN se interpola con Processing a través de un ráster
+                    raster = interpolar_puntos(layer, campo_altura, metodo,
+                                               ruta_raster or QgsProcessing.TEMPORARY_OUTPUT, context, feedback)
+            except (ValueError, RuntimeError) as e:
+                raise QgsProcessingException(str(e))
+
+            if rejilla is not None or triangulacion is not None:
+                # La triangulación o la rejilla en memoria pasan directamente al generador de curvas
+                resultados = {}
+                if ruta_raster:
+                    resultados[self.RASTER] = guardar_rejilla(rejilla, layer.crs(), ruta_raster)
+                if feedback.isCanceled():
+                    return {}
+                feedback.pushInfo("Generando curvas de nivel...")
+                if triangulacion is not None:
+                    curvas = curvas_tin(triangulacion, intervalo, base, factor_z)
+                else:
+                    curvas = curvas_rejilla(rejilla, intervalo, base, factor_z)
+                resultados[self.OUTPUT] = escribir_curvas(curvas, layer.crs(), salida)
+                return resultados
+        else:
+            raise QgsProcessingException("La capa de entrada debe ser un ráster o una capa de puntos")
+
+        if feedback.isCanceled():
+            return {}
+
+        feedback.pushInfo("Generando curvas de nivel...")
+        resultado = generar_curvas(raster, intervalo, base, factor_z, salida, context, feedback,
+                                   trabajadores=procesos)
+        if feedback.isCanceled():
+            return {}
+        if resultado is None:
+            raise QgsProcessingException("No se pudieron generar las curvas de nivel")
+        if ruta_raster:
+            return {self.OUTPUT: resultado, self.RASTER: raster}
+        return {self.OUTPUT: resultado}
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsProcessing, QgsProcessingException, QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterFeatureSink, QgsProcessingParameterEnum,
+                       QgsProcessingParameterNumber, QgsWkbTypes)
+
+from .base import AlgoritmoTopografia
+from ..core.angulos import FormateadorAngulos
+from ..tools.calculo_lineas import tabla_lineas, calcular_lineas, columnas_punto
+from ..tools.salida import campos_tabla
+
+
+class AlgoritmoLineas(AlgoritmoTopografia):
+    """Equivalente en Processing del diálogo 'Cálculos de Líneas'."""
+    AZIMUT = 'AZIMUT'
+    RUMBO = 'RUMBO'
+    DISTANCIA = 'DISTANCIA'
+    DIST_ACUM = 'DIST_ACUM'
+    UNIDAD = 'UNIDAD'
+    CADENAMIENTO = 'CADENAMIENTO'
+    INTERVALO = 'INTERVALO'
+    ESTACION_INICIAL = 'ESTACION_INICIAL'
+
+    ICONO = 'lineas.png'
+    TITULO_EXCEL = "Cálculos de Líneas"
+
+    def name(self):
+        return 'calculos_lineas'
+
+    def displayName(self):
+        return "Cálculos de líneas"
+
+    def shortHelpString(self):
+        return ("Calcula azimut, rumbo, longitud y longitud acumulada de cada segmento de las "
+                "líneas de entrada. Genera una capa de puntos en el punto medio de cada segmento "
+                "y, opcionalmente, un reporte de texto y tablas CSV y Excel.\n\n"
+                "En el modo cadenamiento genera en su lugar un punto por estación cada intervalo "
+                "(etiquetadas como 0+120.000), por vértice y al final de cada línea, con el azimut "
+                "y el rumbo del segmento que las contiene.")
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, "Capa de líneas", [QgsProcessing.TypeVectorLine]))
+        self.agregar_booleano(self.AZIMUT, "Calcular azimut")
+        self.agregar_booleano(self.RUMBO, "Calcular rumbo")
+        self.agregar_booleano(self.DISTANCIA, "Calcular distancia")
+        self.agregar_booleano(self.DIST_ACUM, "Calcular distancia acumulada")
+        self.addParameter(QgsProcessingParameterEnum(
+            self.UNIDAD, "Unidad angular",
+            options=["Grados Decimales", "Grados/Minutos/Segundos"], defaultValue=0))
+        self.agregar_booleano(self.CADENAMIENTO, "Modo cadenamiento (estaciones a intervalo fijo)", False)
+        self.addParameter(QgsProcessingParameterNumber(
+            self.INTERVALO, "Intervalo entre estaciones (m)", QgsProcessingParameterNumber.Double,
+            defaultValue=20.0, minValue=0.001))
+        self.addParameter(QgsProcessingParameterNumber(
+            self.ESTACION_INICIAL, "Estación inicial (m)", QgsProcessingParameterNumber.Double,
+            defaultValue=0.0, minValue=0.0))
+        self.agregar_parametros_comunes()
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, "Cálculos de líneas", QgsProcessing.TypeVectorPoint))
+        self.agregar_salidas_archivo()
+
+    def processAlgorithm(self, parameters, context, feedback):
+        fuente = self.parameterAsSource(parameters, self.INPUT, context)
+        if fuente is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        opciones = {
+            'azimut': self.parameterAsBoolean(parameters, self.AZIMUT, context),
+            'rumbo': self.parameterAsBoolean(parameters, self.RUMBO, context),
+            'distancia': self.parameterAsBoolean(parameters, self.DISTANCIA, context),
+            'dist_acum': self.parameterAsBoolean(parameters, self.DIST_ACUM, context),
+            'unidad': self.parameterAsEnum(parameters, self.UNIDAD, context),
+            'decimales': self.parameterAsInt(parameters, self.DECIMALES, context),
+            'cadenamiento': self.parameterAsBoolean(parameters, self.CADENAMIENTO, context),
+            'intervalo': self.parameterAsDouble(parameters, self.INTERVALO, context),
+            'estacion_inicial': self.parameterAsDouble(parameters, self.ESTACION_INICIAL, context),
+        }
+        if not (opciones['azimut'] or opciones['rumbo'] or opciones['distancia'] or opciones['dist_acum'] or
+                opciones['cadenamiento']):
+            raise QgsProcessingException("Seleccione al menos un tipo de cálculo")
+
+        crs = fuente.sourceCrs()
+        tabla = tabla_lineas(opciones)
+        fields = campos_tabla(tabla)
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.Point, crs)
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        motor = self.motor_medicion(parameters, context, crs)
+        formateador = FormateadorAngulos(opciones['unidad'], opciones['decimales'])
+        x, y = columnas_punto(opciones)
+        reporte = self.ejecutar(parameters, calcular_lineas, fuente, tabla, fields, sink, motor, formateador,
+                                opciones, fuente.sourceName(), feedback, x=x, y=y)
+
+        resultados = {self.OUTPUT: dest_id}
+        resultados.update(self.exportar_archivos(parameters, context, feedback, tabla, reporte))
+        return resultados
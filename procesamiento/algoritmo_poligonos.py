@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsProcessing, QgsProcessingException, QgsProcessingParameterFeatureSource,
+                       QgsProcessingParameterFeatureSink, QgsProcessingParameterEnum,
+                       QgsProcessingParameterNumber, QgsWkbTypes)
+
+from .base import AlgoritmoTopografia
+from ..core.angulos import FormateadorAngulos
+from ..core.linderos import tolerancia_ajuste
+from ..core.poligonos import UNIDADES_AREA
+from ..tools.calculo_poligonos import tabla_poligonos, calcular_poligonos, resumen_poligonos, columnas_punto
+from ..tools.salida import campos_tabla
+
+
+class AlgoritmoPoligonos(AlgoritmoTopografia):
+    """Equivalente en Processing del diálogo 'Cálculos de Polígonos'."""
+    INTERNOS = 'INTERNOS'
+    EXTERNOS = 'EXTERNOS'
+    AZIMUT = 'AZIMUT'
+    RUMBO = 'RUMBO'
+    DISTANCIA = 'DISTANCIA'
+    DIST_ACUM = 'DIST_ACUM'
+    AREA = 'AREA'
+    PERIMETRO = 'PERIMETRO'
+    FORMATO = 'FORMATO'
+    UNIDAD_AREA = 'UNIDAD_AREA'
+    EXCEL_RESUMEN = 'EXCEL_RESUMEN'
+    LINDEROS = 'LINDEROS'
+    TOLERANCIA = 'TOLERANCIA'
+
+    ICONO = 'poligonos.png'
+    TITULO_EXCEL = "Cálculos de Polígonos"
+
+    def name(self):
+        return 'calculos_poligonos'
+
+    def displayName(self):
+        return "Cálculos de polígonos"
+
+    def shortHelpString(self):
+        return ("Calcula ángulos internos y externos, azimut, rumbo y distancia de los lados, "
+                "distancia acumulada, área y perímetro de los polígonos de entrada. Genera una capa "
+                "de puntos con un punto por vértice y, opcionalmente, un reporte de texto y tablas "
+                "CSV y Excel (con hoja de resumen por polígono).\n\n"
+                "En el modo linderos cada lado compartido por polígonos contiguos se mide una sola vez: "
+                "la salida tiene un punto por lado único con los ids de los polígonos a su izquierda y a "
+                "su derecha. Los vértices se ajustan a la tolerancia indicada (0 = automática).")
+
+    def initAlgorithm(self, config=None):
+        self.addParameter(QgsProcessingParameterFeatureSource(
+            self.INPUT, "Capa de polígonos", [QgsProcessing.TypeVectorPolygon]))
+        self.agregar_booleano(self.INTERNOS, "Ángulos internos")
+        self.agregar_booleano(self.EXTERNOS, "Ángulos externos")
+        self.agregar_booleano(self.AZIMUT, "Azimut")
+        self.agregar_booleano(self.RUMBO, "Rumbo")
+        self.agregar_booleano(self.DISTANCIA, "Distancia")
+        self.agregar_booleano(self.DIST_ACUM, "Distancia acumulada")
+        self.agregar_booleano(self.AREA, "Área")
+        self.agregar_booleano(self.PERIMETRO, "Perímetro")
+        self.addParameter(QgsProcessingParameterEnum(
+            self.FORMATO, "Formato de ángulos",
+            options=["Grados Decimales", "Grados/Minutos/Segundos", "Radianes"], defaultValue=0))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.UNIDAD_AREA, "Unidades de área", options=UNIDADES_AREA, defaultValue=0))
+        self.agregar_booleano(self.LINDEROS, "Modo linderos (un registro por lado único)", False)
+        self.addParameter(QgsProcessingParameterNumber(
+            self.TOLERANCIA, "Tolerancia de ajuste de vértices (0 = automática)",
+            QgsProcessingParameterNumber.Double, defaultValue=0.0, minValue=0.0))
+        self.agregar_parametros_comunes()
+        self.addParameter(QgsProcessingParameterFeatureSink(
+            self.OUTPUT, "Cálculos de polígonos", QgsProcessing.TypeVectorPoint))
+        self.agregar_salidas_archivo()
+        self.agregar_booleano(self.EXCEL_RESUMEN, "Incluir hoja de resumen por polígono en el Excel", False)
+
+    def processAlgorithm(self, parameters, context, feedback):
+        fuente = self.parameterAsSource(parameters, self.INPUT, context)
+        if fuente is None:
+            raise QgsProcessingException(self.invalidSourceError(parameters, self.INPUT))
+
+        unidad_area = self.parameterAsEnum(parameters, self.UNIDAD_AREA, context)
+        opciones = {
+            'internos': self.parameterAsBoolean(parameters, self.INTERNOS, context),
+            'externos': self.parameterAsBoolean(parameters, self.EXTERNOS, context),
+            'azimut': self.parameterAsBoolean(parameters, self.AZIMUT, context),
+            'rumbo': self.parameterAsBoolean(parameters, self.RUMBO, context),
+            'distancia': self.parameterAsBoolean(parameters, self.DISTANCIA, context),
+            'dist_acum': self.parameterAsBoolean(parameters, self.DIST_ACUM, context),
+            'area': self.parameterAsBoolean(parameters, self.AREA, context),
+            'perimetro': self.parameterAsBoolean(parameters, self.PERIMETRO, context),
+            'formato': self.parameterAsEnum(parameters, self.FORMATO, context),
+            'unidad_area': unidad_area,
+            'unidad_area_txt': UNIDADES_AREA[unidad_area],
+            'decimales': self.parameterAsInt(parameters, self.DECIMALES, context),
+            'linderos': self.parameterAsBoolean(parameters, self.LINDEROS, context),
+        }
+        if not any(opciones[clave] for clave in ('internos', 'externos', 'azimut', 'rumbo',
+                                                 'distancia', 'dist_acum', 'area', 'perimetro')):
+            raise QgsProcessingException("Seleccione al menos un tipo de cálculo")
+
+        crs = fuente.sourceCrs()
+        opciones['tolerancia'] = tolerancia_ajuste(
+            self.parameterAsDouble(parameters, self.TOLERANCIA, context), crs.isGeographic())
+        tabla = tabla_poligonos(opciones)
+        fields = campos_tabla(tabla)
+        sink, dest_id = self.parameterAsSink(parameters, self.OUTPUT, context, fields, QgsWkbTypes.Point, crs)
+        if sink is None:
+            raise QgsProcessingException(self.invalidSinkError(parameters, self.OUTPUT))
+
+        motor = self.motor_medicion(parameters, context, crs)
+        formateador = FormateadorAngulos(opciones['formato'], opciones['decimales'])
+        x, y = columnas_punto(opciones)
+        reporte = self.ejecutar(parameters, calcular_poligonos, fuente, tabla, fields, sink, motor, formateador,
+                                opciones, fuente.sourceName(), feedback, x=x, y=y)
+
+        resumen = None
+        if self.parameterAsBoolean(parameters, self.EXCEL_RESUMEN, context) and not opciones['linderos']:
+            resumen = ("Resumen por polígono",) + resumen_poligonos(tabla)
+
+        resultados = {self.OUTPUT: dest_id}
+        resultados.update(self.exportar_archivos(parameters, context, feedback, tabla, reporte, resumen))
+        return resultados
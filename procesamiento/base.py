@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsProcessingAlgorithm, QgsProcessingException, QgsProcessingParameterBoolean,
+                       QgsProcessingParameterEnum, QgsProcessingParameterNumber,
+                       QgsProcessingParameterFileDestination, QgsFeatureSink, QgsDistanceArea)
+from qgis.PyQt.QtGui import QIcon
+import os
+
+from ..core.cronometro import Cronometro
+from ..core.excel import escribir_xlsx
+from ..core.tabla import escribir_csv
+from ..tools.medicion import MotorMedicion
+from ..tools.salida import entidades_tabla
+
+RUTA_ICONOS = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'icons')
+
+
+class AlgoritmoTopografia(QgsProcessingAlgorithm):
+    """
+    Base de los algoritmos de cálculo sobre entidades (líneas y polígonos).
+
+    Declara los parámetros comunes (decimales, tipo de distancia y archivos de
+    reporte, CSV y Excel) y ofrece la escritura de la tabla de resultados en
+    el sumidero de Processing y en los archivos opcionales.
+    """
+    INPUT = 'INPUT'
+    OUTPUT = 'OUTPUT'
+    DECIMALES = 'DECIMALES'
+    TIPO_DISTANCIA = 'TIPO_DISTANCIA'
+    REPORTE = 'REPORTE'
+    CSV = 'CSV'
+    EXCEL = 'EXCEL'
+
+    # Nombre del icono en la carpeta 'icons'
+    ICONO = 'icon.png'
+    # Título de la hoja de datos del Excel
+    TITULO_EXCEL = "Cálculos"
+
+    def createInstance(self):
+        return type(self)()
+
+    def group(self):
+        return "Cálculos topográficos"
+
+    def groupId(self):
+        return 'calculos'
+
+    def icon(self):
+        return QIcon(os.path.join(RUTA_ICONOS, self.ICONO))
+
+    def agregar_parametros_comunes(self):
+        """Parámetros de configuración compartidos por los cálculos"""
+        self.addParameter(QgsProcessingParameterNumber(
+            self.DECIMALES, "Decimales", QgsProcessingParameterNumber.Integer,
+            defaultValue=4, minValue=0, maxValue=10))
+        self.addParameter(QgsProcessingParameterEnum(
+            self.TIPO_DISTANCIA, "Tipo de distancia",
+            options=["Elipsoidal", "De cuadrícula (plana)"], defaultValue=0))
+
+    def agregar_salidas_archivo(self):
+        """Archivos de reporte, CSV y Excel (opcionales, no se crean por defecto)"""
+        for nombre, descripcion, filtro in (
+                (self.REPORTE, "Reporte", "Archivo de texto (*.txt)"),
+                (self.CSV, "Tabla CSV", "CSV (*.csv)"),
+                (self.EXCEL, "Tabla Excel", "Excel (*.xlsx)")):
+            self.addParameter(QgsProcessingParameterFileDestination(
+                nombre, descripcion, filtro, optional=True, createByDefault=False))
+
+    def motor_medicion(self, parameters, context, crs):
+        """MotorMedicion con el elipsoide del contexto (WGS84 si no hay ninguno)"""
+        distance_area = QgsDistanceArea()
+        distance_area.setSourceCrs(crs, context.transformContext())
+        elipsoide = context.ellipsoid()
+        distance_area.setEllipsoid(elipsoide if elipsoide and elipsoide != 'NONE' else 'WGS84')
+        planas = self.parameterAsEnum(parameters, self.TIPO_DISTANCIA, context) == 1
+        return MotorMedicion(crs, distance_area, planas)
+
+    def ejecutar(self, parameters, calcular, fuente, tabla, fields, sink, motor, formateador, opciones,
+                 nombre_capa, feedback, x='x', y='y'):
+        """
+        Recorre la fuente con la función de cálculo de la herramienta y escribe
+        cada bloque de filas en el sumidero.
+        :return: El AlmacenReporte del cálculo.
+        """
+        total = fuente.featureCount()
+
+        def al_agregar(inicio, n):
+            entidades = list(entidades_tabla(tabla, fields, inicio, inicio + n, x=x, y=y))
+            if not sink.addFeatures(entidades, QgsFeatureSink.FastInsert):
+                raise QgsProcessingException(self.writeFeatureError(sink, parameters, self.OUTPUT))
+
+        def informar(procesadas):
+            feedback.setProgress(100.0 * procesadas / total if total else 100.0)
+
+        cronometro = Cronometro()
+        reporte = calcular(fuente.getFeatures(), tabla, motor, formateador, opciones, nombre_capa,
+                           al_agregar, feedback.isCanceled, informar, cronometro=cronometro)
+        if reporte is None:
+            raise QgsProcessingException("Cálculo cancelado")
+        feedback.pushInfo(cronometro.texto())
+        return reporte
+
+    def exportar_archivos(self, parameters, context, feedback, tabla, reporte, resumen=None):
+        """Escribe los archivos opcionales pedidos y devuelve sus rutas para el resultado"""
+        resultados = {}
+        reporte_archivo = self.parameterAsFileOutput(parameters, self.REPORTE, context)
+        if reporte_archivo:
+            reporte.escribir(reporte_archivo)
+            resultados[self.REPORTE] = reporte_archivo
+        csv_archivo = self.parameterAsFileOutput(parameters, self.CSV, context)
+        if csv_archivo:
+            escribir_csv(tabla, csv_archivo)
+            resultados[self.CSV] = csv_archivo
+        excel_archivo = self.parameterAsFileOutput(parameters, self.EXCEL, context)
+        if excel_archivo:
+            n_hojas = escribir_xlsx(tabla, excel_archivo, self.TITULO_EXCEL, resumen)
+            if n_hojas > 1:
+                feedback.pushInfo(f"La tabla se dividió en {n_hojas} hojas de Excel")
+            resultados[self.EXCEL] = excel_archivo
+        return resultados
+
+    def agregar_booleano(self, nombre, descripcion, defecto=True):
+        self.addParameter(QgsProcessingParameterBoolean(nombre, descripcion, defaultValue=defecto))
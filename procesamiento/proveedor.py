@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsProcessingProvider
+from qgis.PyQt.QtGui import QIcon
+import os
+
+from .base import RUTA_ICONOS
+from .algoritmo_lineas import AlgoritmoLineas
+from .algoritmo_poligonos import AlgoritmoPoligonos
+from .algoritmo_curvas import AlgoritmoCurvas
+
+
+class ProveedorTopografia(QgsProcessingProvider):
+    """Proveedor de Processing con los cálculos del complemento"""
+
+    def loadAlgorithms(self):
+        for algoritmo in (AlgoritmoLineas(), AlgoritmoPoligonos(), AlgoritmoCurvas()):
+            self.addAlgorithm(algoritmo)
+
+    def id(self):
+        return 'topografia'
+
+    def name(self):
+        return "Topografía"
+
+    def icon(self):
+        return QIcon(os.path.join(RUTA_ICONOS, 'icon.png'))
+
+    def longName(self):
+        return self.name()
@@ -0,0 +1,10 @@
+# -*- coding: utf-8 -*-
+"""
+Las pruebas importan el núcleo (``core``) como paquete de primer nivel, sin
+cargar el plugin, de modo que se pueden ejecutar fuera de QGIS. Las que
+comparan con QGIS se omiten si ``qgis`` no está instalado.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Curvas de ráster por teselas comparadas con las de un solo paso.
+
+Ambos caminos deben dar las mismas líneas con cualquier cota base y factor
+Z. Necesitan GDAL (``osgeo``); se omiten si no está instalado.
+"""
+import numpy as np
+import pytest
+
+from core.curvas import curvas_raster, curvas_teselas, dividir_raster, origen_raster
+
+gdal = pytest.importorskip('osgeo.gdal')
+
+SIN_DATOS = -9999.0
+
+
+@pytest.fixture(scope='module')
+def origen(tmp_path_factory):
+    """Ráster de 301 x 257 píxeles con varias cimas, una hondonada y una zona sin datos"""
+    filas, columnas = 257, 301
+    y, x = np.mgrid[0:filas, 0:columnas].astype(np.float64)
+    valores = (40 * np.exp(-((x - 80) ** 2 + (y - 60) ** 2) / 1500.0)
+               + 30 * np.exp(-((x - 210) ** 2 + (y - 170) ** 2) / 3000.0)
+               - 25 * np.exp(-((x - 150) ** 2 + (y - 220) ** 2) / 800.0)
+               + 0.05 * x + 3 * np.sin(x / 17.0) * np.cos(y / 23.0))
+    valores[100:120, 20:45] = SIN_DATOS
+    ruta = str(tmp_path_factory.mktemp('curvas') / 'dem.tif')
+    datos = gdal.GetDriverByName('GTiff').Create(ruta, columnas, filas, 1, gdal.GDT_Float64)
+    datos.SetGeoTransform((500000.0, 2.0, 0.0, 4600000.0, 0.0, -2.0))
+    banda = datos.GetRasterBand(1)
+    banda.SetNoDataValue(SIN_DATOS)
+    banda.WriteArray(valores)
+    datos = None
+    return origen_raster(ruta)
+
+
+def _resumen(curvas):
+    """(cota, cerrada, longitud) de cada línea, ordenados"""
+    finales = np.append(curvas.inicios[1:], len(curvas.coords))
+    resumen = []
+    for cota, inicio, fin in zip(curvas.cota, curvas.inicios, finales):
+        linea = curvas.coords[inicio:fin]
+        longitud = np.hypot(*np.diff(linea, axis=0).T).sum()
+        resumen.append((round(float(cota), 9), bool(np.allclose(linea[0], linea[-1])), longitud))
+    return sorted(resumen)
+
+
+@pytest.mark.parametrize('base, factor_z', [(0.0, 1.0), (2.5, 1.7), (-1.25, 0.4)])
+def test_teselas_como_un_solo_paso(origen, base, factor_z):
+    intervalo = 5.0
+    unico = curvas_raster(origen, intervalo, base, factor_z)
+    teselas = curvas_teselas(origen, dividir_raster(origen.ancho, origen.alto, 64), 2, intervalo, base, factor_z)
+
+    assert len(unico.cota)
+    resumen_unico = _resumen(unico)
+    resumen_teselas = _resumen(teselas)
+    assert [r[:2] for r in resumen_teselas] == [r[:2] for r in resumen_unico]
+    np.testing.assert_allclose([r[2] for r in resumen_teselas], [r[2] for r in resumen_unico], rtol=1e-9)
+
+
+def test_cota_base_y_factor_z(origen):
+    intervalo, base, factor_z = 5.0, 2.5, 1.7
+    curvas = curvas_raster(origen, intervalo, base, factor_z)
+    pasos = (curvas.cota - base) / intervalo
+    np.testing.assert_allclose(pasos, np.round(pasos), atol=1e-9)
+    # Las cotas recorren el rango del ráster multiplicado por el factor Z
+    sin_escalar = curvas_raster(origen, intervalo, base, 1.0)
+    assert curvas.cota.max() > sin_escalar.cota.max()
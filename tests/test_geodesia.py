@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+Mediciones de ``core.geodesia`` comparadas con ``QgsDistanceArea``.
+
+Las pruebas de propiedades (sentido del anillo, meridiano de 180°, casos
+con resultado conocido) solo necesitan NumPy; las comparaciones con QGIS
+se omiten si no está disponible.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from core.geodesia import (WGS84, areas_anillos, areas_anillos_geodesicas, distancias_geodesicas,
+                           distancias_planas, medir_poligono, _diferencias_longitud, _inversa_biseccion)
+
+# Anillos de prueba en grados: un rectángulo (lados paralelos al ecuador), un
+# polígono irregular, uno que cruza el meridiano de 180° y uno cerca del polo
+ANILLOS = [
+    [(-3.0, 40.0), (-2.0, 40.0), (-2.0, 41.0), (-3.0, 41.0), (-3.0, 40.0)],
+    [(10.0, -5.0), (12.5, -4.2), (13.1, -1.0), (11.0, 0.3), (9.4, -2.7), (10.0, -5.0)],
+    [(179.5, 10.0), (-179.5, 10.0), (-179.2, 11.0), (179.8, 11.5), (179.5, 10.0)],
+    [(0.0, 85.0), (90.0, 85.0), (180.0, 85.0), (-90.0, 85.0), (0.0, 85.0)],
+]
+
+
+def _concatenar(anillos):
+    coords = np.concatenate([np.asarray(anillo, dtype=np.float64) for anillo in anillos])
+    inicios = np.cumsum([0] + [len(anillo) for anillo in anillos[:-1]])
+    return coords, inicios
+
+
+def _pares_aleatorios(n=200, semilla=7):
+    rng = np.random.default_rng(semilla)
+    lon1 = rng.uniform(-180.0, 180.0, n)
+    lat1 = rng.uniform(-80.0, 80.0, n)
+    lon2 = lon1 + rng.uniform(-20.0, 20.0, n)
+    lat2 = np.clip(lat1 + rng.uniform(-20.0, 20.0, n), -85.0, 85.0)
+    return lon1, lat1, lon2, lat2
+
+
+def test_distancia_sobre_el_ecuador():
+    distancias, azimuts = distancias_geodesicas([0.0], [0.0], [1.0], [0.0])
+    assert distancias[0] == pytest.approx(WGS84.semieje_mayor * math.pi / 180.0, rel=1e-12)
+    assert azimuts[0] == pytest.approx(math.pi / 2)
+
+
+def test_casi_antipodas_sobre_el_ecuador():
+    # Vincenty no converge: los pares se resuelven por bisección
+    distancias, azimuts = distancias_geodesicas([0.0, 0.0], [0.0, 0.0], [179.5, 180.0], [0.0, 0.0])
+    np.testing.assert_allclose(distancias, [19980861.909, 20003931.4586], rtol=1e-9)
+    assert azimuts[1] == pytest.approx(math.pi)
+
+
+def test_casi_antipodas_simetricas():
+    rng = np.random.default_rng(11)
+    lon1 = rng.uniform(-180.0, 180.0, 500)
+    lat1 = rng.uniform(-60.0, 60.0, 500)
+    lon2 = lon1 + 180.0 + rng.uniform(-1.0, 1.0, 500)
+    lat2 = -lat1 + rng.uniform(-1.0, 1.0, 500)
+    distancias, azimuts = distancias_geodesicas(lon1, lat1, lon2, lat2)
+    inversas, _ = distancias_geodesicas(lon2, lat2, lon1, lat1)
+    assert np.isfinite(azimuts).all()
+    # Ninguna geodésica supera la mitad del meridiano
+    assert (distancias <= 20003931.4586 * (1 + 1e-12)).all()
+    np.testing.assert_allclose(inversas, distancias, rtol=1e-9)
+
+
+def test_biseccion_como_vincenty_donde_converge():
+    lon1, lat1, lon2, lat2 = _pares_aleatorios()
+    distancias, azimuts = distancias_geodesicas(lon1, lat1, lon2, lat2)
+    biseccion, azimuts_biseccion = _inversa_biseccion(lon1, lat1, lon2, lat2, WGS84)
+    np.testing.assert_allclose(biseccion, distancias, rtol=1e-12, atol=1e-6)
+    np.testing.assert_allclose(np.angle(np.exp(1j * (azimuts_biseccion - azimuts))), 0.0, atol=1e-9)
+
+
+def test_distancias_planas():
+    distancias, azimuts = distancias_planas([0.0, 0.0], [0.0, 0.0], [3.0, 0.0], [4.0, -2.0])
+    np.testing.assert_allclose(distancias, [5.0, 2.0])
+    np.testing.assert_allclose(azimuts, [math.atan2(3.0, 4.0), math.pi])
+
+
+def test_area_plana_y_sentido_del_anillo():
+    cuadrado = [(0.0, 0.0), (2.0, 0.0), (2.0, 2.0), (0.0, 2.0)]
+    coords, inicios = _concatenar([cuadrado, cuadrado[::-1]])
+    np.testing.assert_allclose(areas_anillos(coords, inicios), [4.0, 4.0])
+
+
+def test_area_geodesica_independiente_del_sentido_y_de_la_vuelta():
+    coords, inicios = _concatenar(ANILLOS)
+    areas = areas_anillos_geodesicas(coords, inicios)
+    invertidos = areas_anillos_geodesicas(*_concatenar([anillo[::-1] for anillo in ANILLOS]))
+    desplazados = coords + [360.0, 0.0]
+    np.testing.assert_allclose(invertidos, areas, rtol=1e-12)
+    # Sumar 360° a las longitudes solo cambia el redondeo
+    np.testing.assert_allclose(areas_anillos_geodesicas(desplazados, inicios), areas, rtol=1e-9)
+
+
+def test_lado_de_180_grados_conserva_su_signo():
+    x1 = np.radians([170.0, -170.0, 0.0, 0.0, 0.0])
+    x2 = np.radians([-170.0, 170.0, 180.0, -180.0, 540.0])
+    np.testing.assert_allclose(np.degrees(_diferencias_longitud(x1, x2)), [20.0, -20.0, 180.0, -180.0, 180.0])
+
+
+def test_medir_poligono_con_hueco():
+    exterior = [(0.0, 0.0), (4.0, 0.0), (4.0, 4.0), (0.0, 4.0), (0.0, 0.0)]
+    hueco = [(1.0, 1.0), (2.0, 1.0), (2.0, 2.0), (1.0, 2.0), (1.0, 1.0)]
+    area, perimetro = medir_poligono([[np.array(exterior), np.array(hueco)]])
+    assert area == pytest.approx(15.0)
+    assert perimetro == pytest.approx(20.0)
+
+
+@pytest.fixture(scope='module')
+def distance_area():
+    qgis_core = pytest.importorskip('qgis.core')
+    app = qgis_core.QgsApplication.instance()
+    if app is None:
+        app = qgis_core.QgsApplication([], False)
+        app.initQgis()
+    da = qgis_core.QgsDistanceArea()
+    da.setSourceCrs(qgis_core.QgsCoordinateReferenceSystem('EPSG:4326'),
+                    qgis_core.QgsProject.instance().transformContext())
+    da.setEllipsoid('WGS84')
+    assert da.willUseEllipsoid()
+    # La aplicación debe seguir viva mientras se use el QgsDistanceArea
+    yield da
+    del app
+
+
+def _puntos(xs, ys):
+    from qgis.core import QgsPointXY
+    return [QgsPointXY(float(x), float(y)) for x, y in zip(xs, ys)]
+
+
+def test_distancias_como_qgis(distance_area):
+    lon1, lat1, lon2, lat2 = _pares_aleatorios()
+    distancias, _ = distancias_geodesicas(lon1, lat1, lon2, lat2)
+    esperadas = [distance_area.measureLine(p1, p2)
+                 for p1, p2 in zip(_puntos(lon1, lat1), _puntos(lon2, lat2))]
+    # Vincenty y GeographicLib (QGIS) difieren en menos de un milímetro
+    np.testing.assert_allclose(distancias, esperadas, rtol=0, atol=1e-3)
+
+
+def test_azimuts_como_qgis(distance_area):
+    lon1, lat1, lon2, lat2 = _pares_aleatorios()
+    _, azimuts = distancias_geodesicas(lon1, lat1, lon2, lat2)
+    esperados = np.mod([distance_area.bearing(p1, p2)
+                        for p1, p2 in zip(_puntos(lon1, lat1), _puntos(lon2, lat2))], 2 * np.pi)
+    diferencia = np.angle(np.exp(1j * (azimuts - esperados)))
+    np.testing.assert_allclose(diferencia, 0.0, atol=1e-8)
+
+
+def test_areas_como_qgis(distance_area):
+    coords, inicios = _concatenar(ANILLOS)
+    areas = areas_anillos_geodesicas(coords, inicios)
+    esperadas = [distance_area.measurePolygon(_puntos(*np.asarray(anillo).T)) for anillo in ANILLOS]
+    np.testing.assert_allclose(areas, esperadas, rtol=1e-10)
+
+
+def test_poligono_con_hueco_como_qgis(distance_area):
+    from qgis.core import QgsGeometry
+    exterior, hueco = ANILLOS[1], [(10.5, -3.5), (11.5, -3.5), (11.5, -2.5), (10.5, -2.5), (10.5, -3.5)]
+    geometria = QgsGeometry.fromPolygonXY([_puntos(*np.asarray(exterior).T), _puntos(*np.asarray(hueco).T)])
+    area, perimetro = medir_poligono([[np.asarray(exterior), np.asarray(hueco)]], WGS84)
+    assert area == pytest.approx(distance_area.measureArea(geometria), rel=1e-10)
+    assert perimetro == pytest.approx(distance_area.measurePerimeter(geometria), abs=1e-3)
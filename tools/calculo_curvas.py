@@ -0,0 +1,287 @@
+# -*- coding: utf-8 -*-
+"""
+Pasos de generación de curvas de nivel compartidos por el diálogo y el algoritmo de Processing.
+
+Cada función ejecuta un algoritmo de Processing. Si recibe un ``context`` se
+ejecuta como algoritmo hijo (dentro de otro algoritmo o de un modelo). Si
+recibe un ``cronometro`` el tiempo de ``processing.run`` se suma a su fase
+``PROCESSING``.
+
+Las curvas de los ráster no pasan por Processing: se generan con la misma
+rutina de GDAL en un solo paso o, en los ráster grandes, por teselas que se
+procesan en varios procesos (ver ``core.curvas``), y se escriben
+directamente en la salida. Las capas de puntos se interpolan a una
+rejilla en memoria (``core.interpolacion``) que se pasa directamente al
+generador de curvas, sin ráster temporal; con TIN las curvas se obtienen
+directamente de la triangulación de los puntos (``core.tin``).
+"""
+from contextlib import nullcontext
+
+from qgis import processing
+from qgis.core import (QgsApplication, QgsCoordinateReferenceSystem, QgsFeature, QgsFeatureRequest, QgsField,
+                       QgsFields, QgsGeometry, QgsLineString, QgsWkbTypes)
+from qgis.PyQt.QtCore import QVariant
+import numpy as np
+import os
+
+from .geometria import partes_geometria
+from .salida import SumideroEntidades, crear_capa_archivo
+from ..core.cronometro import PROCESSING, CALCULO, ESCRITURA, LECTURA, INTERPOLACION
+from ..core.curvas import MINIMO_PIXELES, origen_raster, dividir_raster, curvas_raster, curvas_teselas
+from ..core.interpolacion import (IDW_GLOBAL, Rejilla, SIN_DATOS, definir_rejilla, interpolar_idw,
+                                  interpolar_tin, tin_disponible)
+from ..core.paralelo import procesos_disponibles, trabajadores_automaticos
+from ..core.tin import triangular
+
+# Métodos de interpolación (mismo orden que el combo del diálogo)
+TIN = 0
+IDW = 1
+METODOS_INTERPOLACION = ["TIN Interpolation", "IDW Interpolation"]
+
+# Tamaño de píxel predeterminado del ráster interpolado
+TAMANO_PIXEL = 10
+
+# Versión del cálculo de curvas de ráster, parte de la clave de la caché: las
+# curvas guardadas por versiones anteriores (gdal:contour ignoraba la cota
+# base y el factor Z) no se reutilizan
+VERSION_CURVAS = 2
+
+
+def _ejecutar(algoritmo, parametros, context=None, feedback=None, cronometro=None):
+    with cronometro.fase(PROCESSING) if cronometro is not None else nullcontext():
+        return processing.run(algoritmo, parametros, context=context, feedback=feedback,
+                              is_child_algorithm=context is not None)
+
+
+def interpolar_puntos(capa, campo_altura, metodo, salida, context=None, feedback=None, cronometro=None):
+    """
+    Interpola una capa de puntos a un ráster con TIN o IDW.
+    :return: Ruta del ráster generado.
+    """
+    field_index = capa.fields().indexOf(campo_altura)
+    # Formato: 'layer_id::~::field_index::~::use_z_bool::~::source_type'
+    # use_z_bool: 0 (False) si se usa un campo de atributo, 1 (True) si se usan coordenadas Z reales
+    # source_type: 0 para fuente de puntos
+    interpolation_data_string = f"{capa.id()}::~::{field_index}::~::{0}::~::{0}"
+
+    if metodo == TIN:
+        algoritmo = "qgis:tininterpolation"
+        params_interpolation = {
+            'INTERPOLATION_DATA': interpolation_data_string,
+            'METHOD': 0,  # Método de interpolación TIN (Linear)
+            'EXTENT': capa.extent(),
+            'PIXEL_SIZE': TAMANO_PIXEL,
+            'OUTPUT': salida
+        }
+    elif metodo == IDW:
+        algoritmo = "qgis:idwinterpolation"
+        params_interpolation = {
+            'INTERPOLATION_DATA': interpolation_data_string,
+            'POWER': 2.0,  # Potencia para IDW
+            'RADIUS': 0.0,  # Radio de búsqueda (0.0 para global)
+            'EXTENT': capa.extent(),
+            'PIXEL_SIZE': TAMANO_PIXEL,
+            'OUTPUT': salida
+        }
+    else:
+        raise ValueError("Método de interpolación no válido seleccionado.")
+
+    result = _ejecutar(algoritmo, params_interpolation, context, feedback, cronometro)
+    if not result or not result.get('OUTPUT'):
+        raise RuntimeError(f"No se pudo generar el ráster interpolado a partir de los puntos con "
+                           f"{METODOS_INTERPOLACION[metodo]}.")
+    return result['OUTPUT']
+
+
+def leer_puntos(capa, campo_altura):
+    """
+    Coordenadas y cotas de los puntos con valor en ``campo_altura``.
+    Los vértices de un multipunto toman la cota de su entidad.
+    :return: (xy (n, 2), z (n,))
+    """
+    request = QgsFeatureRequest().setSubsetOfAttributes([campo_altura], capa.fields())
+    coords = []
+    cotas = []
+    for feature in capa.getFeatures(request):
+        cota = feature[campo_altura]
+        geom = feature.geometry()
+        if cota is None or geom.isEmpty():
+            continue
+        try:
+            cota = float(cota)
+        except (TypeError, ValueError):
+            continue
+        for parte in partes_geometria(geom)[1]:
+            coords.append(parte)
+            cotas.append(np.full(len(parte), cota))
+    if not coords:
+        return np.empty((0, 2)), np.empty(0)
+    return np.concatenate(coords), np.concatenate(cotas)
+
+
+def interpolar_rejilla(capa, campo_altura, metodo, tamano_pixel=TAMANO_PIXEL, cronometro=None, puntos=None,
+                       parametros_idw=IDW_GLOBAL, trabajadores=0):
+    """
+    Interpola una capa de puntos a una rejilla en memoria con TIN o IDW.
+    :param puntos: (xy, z) ya leídos con ``leer_puntos``; si es None se leen de la capa.
+    :param parametros_idw: ``interpolacion.ParametrosIdw`` (potencia, vecinos, radio y mínimo de vecinos).
+    :param trabajadores: Hilos de la búsqueda de vecinos de IDW (0 = automático).
+    :return: ``interpolacion.Rejilla``, o None si el método no está disponible
+        (TIN sin SciPy) y debe usarse ``interpolar_puntos``.
+    """
+    if metodo == TIN and not tin_disponible():
+        return None
+    if metodo not in (TIN, IDW):
+        raise ValueError("Método de interpolación no válido seleccionado.")
+    if puntos is None:
+        with cronometro.fase(LECTURA) if cronometro is not None else nullcontext():
+            puntos = leer_puntos(capa, campo_altura)
+    xy, z = puntos
+    if len(z) < 3:
+        raise ValueError("Se necesitan al menos 3 puntos con altura para la interpolación.")
+    extension = capa.extent()
+    columnas, filas, geotransformacion = definir_rejilla(extension.xMinimum(), extension.yMinimum(),
+                                                         extension.xMaximum(), extension.yMaximum(),
+                                                         tamano_pixel)
+    with cronometro.fase(INTERPOLACION) if cronometro is not None else nullcontext():
+        if metodo == TIN:
+            return interpolar_tin(xy, z, columnas, filas, geotransformacion)
+        return interpolar_idw(xy, z, columnas, filas, geotransformacion, parametros_idw,
+                              trabajadores or trabajadores_automaticos())
+
+
+def triangular_puntos(capa, campo_altura, cronometro=None, puntos=None):
+    """
+    Triangulación de Delaunay de una capa de puntos, para generar las curvas
+    TIN directamente sobre ella (``core.tin.curvas_tin``) sin pasar por un ráster.
+    :param puntos: (xy, z) ya leídos con ``leer_puntos``; si es None se leen de la capa.
+    :return: ``tin.Triangulacion``, o None sin SciPy (debe usarse ``interpolar_puntos``).
+    """
+    if not tin_disponible():
+        return None
+    if puntos is None:
+        with cronometro.fase(LECTURA) if cronometro is not None else nullcontext():
+            puntos = leer_puntos(capa, campo_altura)
+    xy, z = puntos
+    if len(z) < 3:
+        raise ValueError("Se necesitan al menos 3 puntos con altura para la interpolación.")
+    with cronometro.fase(INTERPOLACION) if cronometro is not None else nullcontext():
+        return triangular(xy, z)
+
+
+def guardar_rejilla(rejilla, crs, ruta):
+    """Guarda una rejilla en memoria como GeoTIFF"""
+    from osgeo import gdal
+    gdal.UseExceptions()
+    filas, columnas = rejilla.valores.shape
+    # En doble precisión, para que las curvas de una superficie guardada sean las de la rejilla original
+    datos = gdal.GetDriverByName('GTiff').Create(ruta, columnas, filas, 1, gdal.GDT_Float64,
+                                                 options=['COMPRESS=DEFLATE', 'PREDICTOR=3', 'TILED=YES'])
+    datos.SetGeoTransform(tuple(rejilla.geotransformacion))
+    datos.SetProjection(crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED))
+    banda = datos.GetRasterBand(1)
+    banda.SetNoDataValue(rejilla.sin_datos)
+    banda.WriteArray(rejilla.valores)
+    datos = None
+    return ruta
+
+
+def leer_rejilla(ruta, banda=1):
+    """Lee un ráster como ``interpolacion.Rejilla``"""
+    from osgeo import gdal
+    gdal.UseExceptions()
+    datos = gdal.Open(ruta)
+    banda = datos.GetRasterBand(banda)
+    sin_datos = banda.GetNoDataValue()
+    return Rejilla(banda.ReadAsArray().astype(np.float64), datos.GetGeoTransform(),
+                   SIN_DATOS if sin_datos is None else sin_datos)
+
+
+def directorio_cache():
+    """Directorio de la caché de superficies y curvas, en el perfil de usuario de QGIS"""
+    return os.path.join(QgsApplication.qgisSettingsDirPath(), 'topografia', 'cache_curvas')
+
+
+def preparar_teselas(raster, banda, trabajadores):
+    """
+    Decide si las curvas del ráster se generan por teselas en varios procesos.
+    :param trabajadores: Procesos pedidos (0 = automático).
+    :return: (origen, ventanas, trabajadores), o None para generarlas en un solo paso.
+    """
+    trabajadores = trabajadores or trabajadores_automaticos()
+    if trabajadores < 2 or not procesos_disponibles():
+        return None
+    origen = origen_raster(raster, banda)
+    if origen is None or origen.ancho * origen.alto < MINIMO_PIXELES:
+        return None
+    ventanas = dividir_raster(origen.ancho, origen.alto)
+    if len(ventanas) < 2:
+        return None
+    return origen, ventanas, trabajadores
+
+
+def campos_curvas():
+    """Campos 'ID' y 'ELEV' de las capas de curvas, como los de gdal:contour"""
+    fields = QgsFields()
+    fields.append(QgsField('ID', QVariant.Int))
+    fields.append(QgsField('ELEV', QVariant.Double))
+    return fields
+
+
+def entidades_curvas(curvas, fields):
+    """Genera una entidad de línea por cada curva"""
+    finales = curvas.inicios[1:].tolist() + [len(curvas.coords)]
+    for id_curva, (cota, inicio, fin) in enumerate(zip(curvas.cota.tolist(), curvas.inicios.tolist(), finales)):
+        vertices = curvas.coords[inicio:fin]
+        feat = QgsFeature(fields)
+        feat.setGeometry(QgsGeometry(QgsLineString(vertices[:, 0].tolist(), vertices[:, 1].tolist())))
+        feat.setAttributes([id_curva, cota])
+        yield feat
+
+
+def escribir_curvas(curvas, crs, salida):
+    """Escribe las curvas en un archivo con los campos 'ID' y 'ELEV'"""
+    fields = campos_curvas()
+    sumidero = SumideroEntidades([crear_capa_archivo(salida, fields, QgsWkbTypes.LineString, crs)])
+    sumidero.agregar_varias(entidades_curvas(curvas, fields))
+    sumidero.cerrar()
+    return salida
+
+
+def generar_curvas(raster, intervalo, base, factor_z, salida, context=None, feedback=None, banda=1,
+                   cronometro=None, trabajadores=0, cancelado=None, informar=None):
+    """
+    Genera las curvas de nivel de un ráster (campo de elevación 'ELEV').
+
+    Los ráster grandes se reparten en teselas entre varios procesos; los
+    demás se procesan en un solo paso. Ambos caminos usan la misma rutina de
+    GDAL (``core.curvas.lineas_gdal``), de modo que la cota base y el factor Z
+    dan las mismas curvas sea cual sea el tamaño del ráster o el número de
+    procesos (``gdal:contour`` no tiene factor Z).
+    :param raster: Ruta o fuente del ráster.
+    :param trabajadores: Procesos para las teselas (0 = automático, 1 = siempre en un solo paso).
+    :param cancelado: Función sin argumentos que devuelve True para detener el cálculo por teselas.
+    :param informar: ``informar(porcentaje)`` durante el cálculo por teselas.
+    :return: Ruta de la capa de curvas generada, o None si GDAL no puede abrir el ráster o se canceló.
+    """
+    teselas = preparar_teselas(raster, banda, trabajadores)
+    if teselas is not None:
+        origen, ventanas, trabajadores = teselas
+        if feedback is not None:
+            feedback.pushInfo(f"Curvas por teselas: {len(ventanas)} teselas en "
+                              f"{min(trabajadores, len(ventanas))} procesos")
+            cancelado = cancelado or feedback.isCanceled
+            informar = informar or feedback.setProgress
+        curvas = curvas_teselas(origen, ventanas, trabajadores, intervalo, base, factor_z,
+                                cancelado, informar, cronometro)
+        if curvas is None:
+            return None
+    else:
+        origen = origen_raster(raster, banda)
+        if origen is None:
+            return None
+        with cronometro.fase(CALCULO) if cronometro is not None else nullcontext():
+            curvas = curvas_raster(origen, intervalo, base, factor_z)
+
+    with cronometro.fase(ESCRITURA) if cronometro is not None else nullcontext():
+        return escribir_curvas(curvas, QgsCoordinateReferenceSystem.fromWkt(origen.crs), salida)
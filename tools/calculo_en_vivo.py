@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtCore import QObject, QTimer, pyqtSignal
+from qgis.core import QgsFeatureRequest
+
+from .salida import entidades_tabla
+from ..core.incremental import huella
+
+
+class CalculoEnVivo(QObject):
+    """
+    Mantiene al día el resultado de un cálculo mientras se edita la capa de origen.
+
+    Escucha ``geometryChanged``, ``featureAdded`` y ``featureDeleted`` de la
+    capa, junta los ids afectados y, tras una breve pausa, vuelve a medir solo
+    esas entidades. Sus filas se sustituyen en la capa temporal de salida y la
+    tabla y el reporte se recomponen sin medir las demás entidades.
+    """
+    # Entidades recalculadas, nueva tabla y nuevo reporte
+    actualizado = pyqtSignal(int, object, object)
+
+    # Pausa (ms) tras la última edición antes de recalcular
+    PAUSA = 300
+
+    def __init__(self, capa, resultados, medir, completar, capa_salida=None, fields=None,
+                 x='x', y='y', solo_conocidas=False, parent=None):
+        """
+        :param capa: Capa de origen que se edita.
+        :param resultados: ResultadosIncrementales del último cálculo completo.
+        :param medir: ``medir(entidades, tabla)`` mide las entidades en ``tabla``
+            y genera sus filas ``(id, inicio, n)``.
+        :param completar: ``completar(filas, tabla)`` devuelve el reporte de la tabla.
+        :param capa_salida: Capa temporal de puntos cuyas entidades se actualizan.
+        :param fields: Campos de la capa de salida.
+        :param x: Columna con la coordenada X de los puntos de salida.
+        :param y: Columna con la coordenada Y de los puntos de salida.
+        :param solo_conocidas: True para seguir solo las entidades del cálculo
+            (p. ej. si se calcularon solo las seleccionadas).
+        """
+        super().__init__(parent)
+        self.capa = capa
+        self.resultados = resultados
+        self.medir = medir
+        self.completar = completar
+        self.capa_salida = capa_salida
+        self.fields = fields
+        self.x = x
+        self.y = y
+        self.solo_conocidas = solo_conocidas
+        self.pendientes = set()
+        self.salida = self.entidades_salida()
+
+        self.temporizador = QTimer(self)
+        self.temporizador.setSingleShot(True)
+        self.temporizador.setInterval(self.PAUSA)
+        self.temporizador.timeout.connect(self.aplicar)
+
+        self.capa.geometryChanged.connect(self.marcar)
+        self.capa.featureAdded.connect(self.marcar)
+        self.capa.featureDeleted.connect(self.marcar)
+        self.capa.committedFeaturesAdded.connect(self.entidades_guardadas)
+        self.capa.willBeDeleted.connect(self.detener)
+        if self.capa_salida is not None:
+            self.capa_salida.willBeDeleted.connect(self.olvidar_salida)
+
+    def entidades_salida(self):
+        """Ids de las entidades de la capa de salida agrupados por id de la entidad de origen"""
+        salida = {}
+        if self.capa_salida is None:
+            return salida
+        columna = self.resultados.columna_id
+        request = QgsFeatureRequest().setFlags(QgsFeatureRequest.NoGeometry)
+        request.setSubsetOfAttributes([columna], self.capa_salida.fields())
+        for feature in self.capa_salida.getFeatures(request):
+            salida.setdefault(feature[columna], []).append(feature.id())
+        return salida
+
+    def marcar(self, fid, *args):
+        """Anota una entidad afectada y reinicia la pausa"""
+        if self.solo_conocidas and fid not in self.resultados:
+            return
+        self.pendientes.add(fid)
+        self.temporizador.start()
+
+    def entidades_guardadas(self, layer_id, features):
+        """Al guardar la edición, las entidades nuevas cambian sus ids temporales por los definitivos"""
+        for fid in self.resultados.ids_temporales():
+            self.marcar(fid)
+        for feature in features:
+            self.marcar(feature.id())
+
+    def olvidar_salida(self):
+        self.capa_salida = None
+        self.salida = {}
+
+    def detener(self):
+        """Deja de escuchar la capa de origen"""
+        self.temporizador.stop()
+        if self.capa is None:
+            return
+        for senal in (self.capa.geometryChanged, self.capa.featureAdded, self.capa.featureDeleted):
+            senal.disconnect(self.marcar)
+        self.capa.committedFeaturesAdded.disconnect(self.entidades_guardadas)
+        self.capa.willBeDeleted.disconnect(self.detener)
+        self.capa = None
+
+    def aplicar(self):
+        """Recalcula las entidades pendientes y actualiza la tabla, el reporte y la capa de salida"""
+        if self.capa is None or not self.pendientes:
+            return
+        ids, self.pendientes = self.pendientes, set()
+        actuales = {f.id(): f for f in self.capa.getFeatures(QgsFeatureRequest().setFilterFids(list(ids)))}
+
+        recalculadas = 0
+        for fid in ids:
+            feature = actuales.get(fid)
+            if feature is None:
+                self.resultados.eliminar(fid)
+                continue
+            geom = feature.geometry()
+            huella_nueva = None if geom.isEmpty() else huella(geom.asWkb())
+            if self.resultados.sin_cambios(fid, huella_nueva):
+                continue
+            parcial = self.resultados.tabla.vacia()
+            for _ in self.medir([feature], parcial):
+                pass
+            self.resultados.reemplazar(fid, parcial, huella_nueva)
+            recalculadas += 1
+
+        cambios = self.resultados.cambios
+        if not cambios:
+            return
+        tabla, filas = self.resultados.recomponer()
+        self.actualizar_salida(cambios)
+        self.actualizado.emit(recalculadas, tabla, self.completar(filas, tabla))
+
+    def actualizar_salida(self, cambios):
+        """Sustituye en la capa de salida los puntos de las entidades que cambiaron"""
+        if self.capa_salida is None:
+            return
+        proveedor = self.capa_salida.dataProvider()
+        borrar = [fid_salida for fid in cambios for fid_salida in self.salida.pop(fid, [])]
+        if borrar:
+            proveedor.deleteFeatures(borrar)
+        for fid, parcial in cambios.items():
+            if parcial is None or not len(parcial):
+                continue
+            ok, agregadas = proveedor.addFeatures(list(entidades_tabla(parcial, self.fields, x=self.x, y=self.y)))
+            if ok:
+                self.salida[fid] = [f.id() for f in agregadas]
+        self.capa_salida.updateExtents()
+        self.capa_salida.triggerRepaint()
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+"""
+Cálculo de segmentos de líneas compartido por el diálogo y el algoritmo de Processing.
+
+No depende de ningún widget: recibe las entidades, el motor de medición, el
+formateador de ángulos y un diccionario de opciones, y llena una tabla de
+resultados y su reporte.
+"""
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from ..core.cronometro import (Cronometro, LECTURA, CALCULO, FORMATO, ESCRITURA, REPORTE,
+                               ENTIDADES, VERTICES)
+from ..core.medicion import MotorWkb
+from ..core.paralelo import entidades_ogr, filas_bloques
+from ..core.reporte import AlmacenReporte
+from ..core.segmentos import calcular_segmentos, calcular_estaciones, etiquetas_estaciones
+from ..core.tabla import TablaResultados, ENTERO, REAL, TEXTO
+
+# Decimales de los metros en las etiquetas de estación (0+120.000)
+DECIMALES_ESTACION = 3
+
+
+def columnas_lineas(opciones):
+    """Define las columnas de la tabla de resultados (y de la capa de salida)"""
+    columnas = [
+        ("id_linea", ENTERO),
+        ("segmento", ENTERO),
+        ("x_ini", REAL),
+        ("y_ini", REAL),
+        ("x_fin", REAL),
+        ("y_fin", REAL)
+    ]
+
+    if opciones['distancia']:
+        columnas.append(("longitud", REAL))
+
+    if opciones['dist_acum']:
+        columnas.append(("long_acum", REAL))
+
+    if opciones['azimut']:
+        columnas.append(("azimut_txt", TEXTO))
+        columnas.append(("azimut_num", REAL))
+
+    if opciones['rumbo']:
+        columnas.append(("rumbo_txt", TEXTO))
+        columnas.append(("rumbo_num", REAL))
+
+    # Punto medio del segmento: geometría de la capa, no se exporta
+    columnas.append(("x_med", REAL, False))
+    columnas.append(("y_med", REAL, False))
+    return columnas
+
+
+def columnas_estaciones(opciones):
+    """Columnas de la tabla de estaciones del modo cadenamiento"""
+    columnas = [
+        ("id_linea", ENTERO),
+        ("estacion", TEXTO),
+        ("cadenamiento", REAL),
+        ("tipo", TEXTO),
+        ("segmento", ENTERO),
+        ("x", REAL),
+        ("y", REAL)
+    ]
+
+    if opciones['azimut']:
+        columnas.append(("azimut_txt", TEXTO))
+        columnas.append(("azimut_num", REAL))
+
+    if opciones['rumbo']:
+        columnas.append(("rumbo_txt", TEXTO))
+        columnas.append(("rumbo_num", REAL))
+    return columnas
+
+
+def tabla_lineas(opciones):
+    """Tabla de resultados vacía con las columnas de las opciones elegidas"""
+    if opciones['cadenamiento']:
+        return TablaResultados(columnas_estaciones(opciones))
+    return TablaResultados(columnas_lineas(opciones))
+
+
+def columnas_punto(opciones):
+    """Columnas con las coordenadas de los puntos de la capa de salida"""
+    return ('x', 'y') if opciones['cadenamiento'] else ('x_med', 'y_med')
+
+
+def plantillas_reporte(reporte, opciones, tabla):
+    """Registra las plantillas del reporte; los segmentos se leen de la tabla de resultados"""
+    if opciones['cadenamiento']:
+        return plantillas_estaciones(reporte, opciones, tabla)
+
+    def linea(id_linea, n_segmentos):
+        return [f"Línea ID: {id_linea}", f"Número de segmentos: {n_segmentos}"]
+
+    def segmento(fila):
+        valor = tabla.valor
+        lineas = [
+            "",
+            f"Segmento {valor('segmento', fila)}:",
+            f"  Punto inicio: ({valor('x_ini', fila):.4f}, {valor('y_ini', fila):.4f})",
+            f"  Punto fin: ({valor('x_fin', fila):.4f}, {valor('y_fin', fila):.4f})"
+        ]
+        if opciones['distancia']:
+            lineas.append(f"  Longitud: {valor('longitud', fila):.4f} m")
+        if opciones['dist_acum']:
+            lineas.append(f"  Longitud acumulada: {valor('long_acum', fila):.4f} m")
+        if opciones['azimut']:
+            lineas.append(f"  Azimut: {valor('azimut_txt', fila)}")
+        if opciones['rumbo']:
+            lineas.append(f"  Rumbo: {valor('rumbo_txt', fila)}")
+        return lineas
+
+    n_segmento = 4 + sum(1 for clave in ('distancia', 'dist_acum', 'azimut', 'rumbo') if opciones[clave])
+    return (
+        reporte.registrar_plantilla(linea, 2),
+        reporte.registrar_plantilla(segmento, n_segmento),
+        reporte.registrar_plantilla(lambda: ["", "=" * 50, ""], 3)
+    )
+
+
+def plantillas_estaciones(reporte, opciones, tabla):
+    """Plantillas del reporte del modo cadenamiento: una línea de texto por estación"""
+    def linea(id_linea, n_estaciones):
+        return [f"Línea ID: {id_linea}", f"Número de estaciones: {n_estaciones}"]
+
+    def estacion(fila):
+        valor = tabla.valor
+        texto = (f"  {valor('estacion', fila)} [{valor('tipo', fila)}] "
+                 f"({valor('x', fila):.4f}, {valor('y', fila):.4f})")
+        if opciones['azimut']:
+            texto += f"  Azimut: {valor('azimut_txt', fila)}"
+        if opciones['rumbo']:
+            texto += f"  Rumbo: {valor('rumbo_txt', fila)}"
+        return [texto]
+
+    return (
+        reporte.registrar_plantilla(linea, 2),
+        reporte.registrar_plantilla(estacion, 1),
+        reporte.registrar_plantilla(lambda: ["", "=" * 50, ""], 3)
+    )
+
+
+def medir_estaciones(entidades, tabla, motor, formateador, opciones, cronometro):
+    """
+    Calcula las estaciones del cadenamiento de cada línea (cada
+    ``opciones['intervalo']``, en los vértices y al final) y las añade a
+    ``tabla``. Genera ``(id_linea, inicio, n_estaciones)`` por entidad.
+    """
+    for feature in cronometro.iterar(LECTURA, entidades):
+        with cronometro.fase(CALCULO):
+            geom = feature.geometry()
+            partes, longitudes = motor.lineas(geom) if not geom.isEmpty() else ([], None)
+            n_estaciones = 0
+            if partes:
+                # Todas las estaciones de la línea sobre sus longitudes acumuladas, sin interpolar una a una
+                est = calcular_estaciones(partes, longitudes, opciones['intervalo'], opciones['estacion_inicial'])
+                n_estaciones = len(est.cadenamiento)
+                azimuts_grados = np.degrees(est.azimut)
+                cronometro.contar(VERTICES, sum(len(p) for p in partes))
+
+        if not n_estaciones:
+            yield feature.id(), None, 0
+            continue
+
+        with cronometro.fase(FORMATO):
+            etiquetas = etiquetas_estaciones(est.cadenamiento, DECIMALES_ESTACION)
+            azimut_txt = formateador.textos(est.azimut) if opciones['azimut'] else None
+            rumbo_txt = formateador.rumbos(est.azimut) if opciones['rumbo'] else None
+
+        with cronometro.fase(ESCRITURA):
+            inicio = tabla.agregar_bloque(
+                n_estaciones,
+                id_linea=feature.id(),
+                estacion=etiquetas,
+                cadenamiento=est.cadenamiento,
+                tipo=est.tipo,
+                segmento=est.segmento,
+                x=est.x, y=est.y,
+                azimut_txt=azimut_txt,
+                azimut_num=azimuts_grados if opciones['azimut'] else None,
+                rumbo_txt=rumbo_txt,
+                rumbo_num=azimuts_grados if opciones['rumbo'] else None
+            )
+        yield feature.id(), inicio, n_estaciones
+
+
+def medir_lineas(entidades, tabla, motor, formateador, opciones, cronometro):
+    """
+    Calcula los segmentos de cada línea y los añade a ``tabla``.
+    Genera ``(id_linea, inicio, n_segmentos)`` por entidad, con ``n_segmentos``
+    igual a 0 si la línea no tiene segmentos.
+    En el modo cadenamiento las filas son las estaciones (ver ``medir_estaciones``).
+    """
+    if opciones['cadenamiento']:
+        yield from medir_estaciones(entidades, tabla, motor, formateador, opciones, cronometro)
+        return
+
+    for feature in cronometro.iterar(LECTURA, entidades):
+        with cronometro.fase(CALCULO):
+            geom = feature.geometry()
+            # Vértices de cada parte y longitud de cada segmento en bloque
+            partes, longitudes = motor.lineas(geom) if not geom.isEmpty() else ([], None)
+            if partes:
+                # Calcular todos los segmentos de la línea de una sola vez
+                seg = calcular_segmentos(partes, longitudes)
+                n_segmentos = len(seg.azimut)
+                azimuts_grados = np.degrees(seg.azimut)
+                cronometro.contar(VERTICES, sum(len(p) for p in partes))
+
+        if not partes:
+            yield feature.id(), None, 0
+            continue
+
+        with cronometro.fase(FORMATO):
+            azimut_txt = formateador.textos(seg.azimut) if opciones['azimut'] else None
+            rumbo_txt = formateador.rumbos(seg.azimut) if opciones['rumbo'] else None
+
+        with cronometro.fase(ESCRITURA):
+            # Todas las filas de la línea se añaden a la tabla en bloque
+            inicio = tabla.agregar_bloque(
+                n_segmentos,
+                id_linea=feature.id(),
+                segmento=np.arange(1, n_segmentos + 1),
+                x_ini=seg.x_ini, y_ini=seg.y_ini,
+                x_fin=seg.x_fin, y_fin=seg.y_fin,
+                longitud=seg.longitud if opciones['distancia'] else None,
+                long_acum=seg.long_acum if opciones['dist_acum'] else None,
+                azimut_txt=azimut_txt,
+                azimut_num=azimuts_grados if opciones['azimut'] else None,
+                rumbo_txt=rumbo_txt,
+                rumbo_num=azimuts_grados if opciones['rumbo'] else None,
+                x_med=seg.x_med, y_med=seg.y_med
+            )
+        yield feature.id(), inicio, n_segmentos
+
+
+def completar_lineas(filas, tabla, opciones, nombre_capa, al_agregar=None, cancelado=None, informar=None,
+                     cronometro=None):
+    """Recorre las filas medidas de cada línea, las entrega a ``al_agregar`` y arma el reporte"""
+    if cronometro is None:
+        cronometro = Cronometro()
+    reporte = AlmacenReporte()
+    plantilla_linea, plantilla_segmento, plantilla_fin = plantillas_reporte(reporte, opciones, tabla)
+    reporte.agregar_texto("REPORTE DE CÁLCULOS DE LÍNEAS")
+    reporte.agregar_texto(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    reporte.agregar_texto(f"Capa de origen: {nombre_capa}")
+    reporte.agregar_texto("")
+
+    # Procesar cada línea (siempre para todos los segmentos)
+    processed = 0
+
+    for id_linea, inicio, n_segmentos in filas:
+        if cancelado is not None and cancelado():
+            return None
+
+        if n_segmentos:
+            if al_agregar is not None:
+                with cronometro.fase(ESCRITURA):
+                    al_agregar(inicio, n_segmentos)
+
+            with cronometro.fase(REPORTE):
+                # Agregar al reporte (se formatea solo al mostrarse o guardarse)
+                reporte.agregar(plantilla_linea, id_linea, n_segmentos, entidad=id_linea)
+                for fila in range(inicio, inicio + n_segmentos):
+                    reporte.agregar(plantilla_segmento, fila)
+                reporte.agregar(plantilla_fin)
+
+        processed += 1
+        if informar is not None:
+            informar(processed)
+
+    cronometro.contar(ENTIDADES, processed)
+    return reporte
+
+
+def calcular_lineas(entidades, tabla, motor, formateador, opciones, nombre_capa,
+                    al_agregar=None, cancelado=None, informar=None, cronometro=None):
+    """
+    Calcula los segmentos de cada línea y los añade a ``tabla``.
+
+    :param entidades: Iterable de QgsFeature de líneas.
+    :param al_agregar: ``al_agregar(inicio, n)`` se llama tras añadir las filas
+        de cada línea (p. ej. para escribirlas en una capa).
+    :param cancelado: Función sin argumentos que devuelve True para detener el cálculo.
+    :param informar: ``informar(procesadas)`` para notificar el progreso.
+    :param cronometro: Cronometro opcional donde se acumula el tiempo de cada fase.
+    :return: El AlmacenReporte del cálculo, o None si se canceló.
+    """
+    if cronometro is None:
+        cronometro = Cronometro()
+    filas = medir_lineas(entidades, tabla, motor, formateador, opciones, cronometro)
+    return completar_lineas(filas, tabla, opciones, nombre_capa, al_agregar, cancelado, informar, cronometro)
+
+
+def medir_bloque_lineas(origen, formateador, opciones, ids):
+    """
+    Mide un bloque de líneas dentro de un proceso de trabajo.
+    :return: (tabla parcial, filas de cada línea, contadores)
+    """
+    tabla = tabla_lineas(opciones)
+    cronometro = Cronometro()
+    motor = MotorWkb(origen.planas, origen.elipsoide)
+    filas = list(medir_lineas(entidades_ogr(origen, ids), tabla, motor, formateador, opciones, cronometro))
+    return tabla, filas, cronometro.contadores
+
+
+def calcular_lineas_procesos(origen, bloques, trabajadores, tabla, formateador, opciones, nombre_capa,
+                             al_agregar=None, cancelado=None, informar=None, cronometro=None):
+    """
+    Igual que ``calcular_lineas``, pero mide los bloques de ids en varios
+    procesos que leen la fuente ``origen`` (un ``OrigenOgr``) por su cuenta.
+    Las filas se unen en el orden de los bloques.
+    """
+    if cronometro is None:
+        cronometro = Cronometro()
+    filas = filas_bloques(partial(medir_bloque_lineas, origen, formateador, opciones),
+                          bloques, trabajadores, tabla, cronometro)
+    return completar_lineas(filas, tabla, opciones, nombre_capa, al_agregar, cancelado, informar, cronometro)
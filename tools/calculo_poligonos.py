@@ -0,0 +1,451 @@
+# -*- coding: utf-8 -*-
+"""
+Cálculo de vértices de polígonos compartido por el diálogo y el algoritmo de Processing.
+
+No depende de ningún widget: recibe las entidades, el motor de medición, el
+formateador de ángulos y un diccionario de opciones, y llena una tabla de
+resultados y su reporte.
+"""
+from datetime import datetime
+from functools import partial
+
+import numpy as np
+
+from ..core.linderos import SIN_POLIGONO, indice_linderos
+from ..core.poligonos import areas_con_signo, calcular_vertices, convertir_area, siguientes
+from ..core.segmentos import azimut
+from ..core.cronometro import (Cronometro, LECTURA, CALCULO, FORMATO, ESCRITURA, REPORTE,
+                               ENTIDADES, VERTICES)
+from ..core.medicion import MotorWkb
+from ..core.paralelo import entidades_ogr, filas_bloques
+from ..core.reporte import AlmacenReporte
+from ..core.tabla import TablaResultados, ENTERO, REAL, TEXTO
+
+
+def columnas_poligonos(opciones):
+    """Define las columnas de la tabla de resultados (y de la capa de salida)"""
+    columnas = [
+        ("id_pol", ENTERO),
+        ("parte", ENTERO),
+        ("anillo", ENTERO),
+        ("vertice", ENTERO),
+        ("x", REAL),
+        ("y", REAL)
+    ]
+
+    if opciones['distancia']:
+        columnas.append(("distancia", REAL))
+
+    if opciones['dist_acum']:
+        columnas.append(("dist_acum", REAL))
+
+    if opciones['area']:
+        columnas.append(("area", REAL))
+
+    if opciones['perimetro']:
+        columnas.append(("perimetro", REAL))
+
+    if opciones['internos']:
+        columnas.append(("ang_int_txt", TEXTO))
+        columnas.append(("ang_int_num", REAL))
+
+    if opciones['externos']:
+        columnas.append(("ang_ext_txt", TEXTO))
+        columnas.append(("ang_ext_num", REAL))
+
+    if opciones['azimut']:
+        columnas.append(("azimut_txt", TEXTO))
+        columnas.append(("azimut_num", REAL))
+
+    if opciones['rumbo']:
+        columnas.append(("rumbo_txt", TEXTO))
+        columnas.append(("rumbo_num", REAL))
+    return columnas
+
+
+def columnas_linderos(opciones):
+    """Columnas de la tabla de linderos: un registro por lado único con los polígonos a cada lado"""
+    columnas = [
+        ("id_lindero", ENTERO),
+        ("id_izq", ENTERO),
+        ("id_der", ENTERO),
+        ("poligonos", ENTERO),
+        ("x_ini", REAL),
+        ("y_ini", REAL),
+        ("x_fin", REAL),
+        ("y_fin", REAL)
+    ]
+
+    if opciones['distancia']:
+        columnas.append(("distancia", REAL))
+
+    if opciones['azimut']:
+        columnas.append(("azimut_txt", TEXTO))
+        columnas.append(("azimut_num", REAL))
+
+    if opciones['rumbo']:
+        columnas.append(("rumbo_txt", TEXTO))
+        columnas.append(("rumbo_num", REAL))
+
+    # Punto medio del lindero: geometría de la capa, no se exporta
+    columnas.append(("x_med", REAL, False))
+    columnas.append(("y_med", REAL, False))
+    return columnas
+
+
+def tabla_poligonos(opciones):
+    """Tabla de resultados vacía con las columnas de las opciones elegidas"""
+    if opciones['linderos']:
+        return TablaResultados(columnas_linderos(opciones))
+    return TablaResultados(columnas_poligonos(opciones))
+
+
+def columnas_punto(opciones):
+    """Columnas con las coordenadas de los puntos de la capa de salida"""
+    return ('x_med', 'y_med') if opciones['linderos'] else ('x', 'y')
+
+
+def plantillas_reporte(reporte, opciones, tabla):
+    """Registra las plantillas del reporte; los valores se leen de la tabla de resultados"""
+    valor = tabla.valor
+
+    def poligono(fila):
+        lineas = [f"Polígono ID: {valor('id_pol', fila)}"]
+        if opciones['area']:
+            lineas.append(f"Área: {valor('area', fila):.4f} {opciones['unidad_area_txt']}")
+        if opciones['perimetro']:
+            lineas.append(f"Perímetro: {valor('perimetro', fila):.4f} metros")
+        lineas.append("Vértices:")
+        return lineas
+
+    def anillo(fila):
+        tipo = "exterior" if valor('anillo', fila) == 0 else f"hueco {valor('anillo', fila)}"
+        return [f" Parte {valor('parte', fila)}, anillo {tipo}:"]
+
+    def vertice(fila):
+        n = valor('vertice', fila)
+        # El último vértice de cada anillo cierra con el primero
+        siguiente = n + 1 if fila + 1 < len(tabla) and valor('vertice', fila + 1) == n + 1 else 1
+        lado = f"{n}-{siguiente}"
+        lineas = []
+        if opciones['internos']:
+            lineas.append(f"  Vértice {n}: Ángulo interno: {valor('ang_int_txt', fila)}")
+        if opciones['externos']:
+            lineas.append(f"  Vértice {n}: Ángulo externo: {valor('ang_ext_txt', fila)}")
+        if opciones['azimut']:
+            lineas.append(f"  Lado {lado}: Azimut: {valor('azimut_txt', fila)}")
+        if opciones['rumbo']:
+            lineas.append(f"  Lado {lado}: Rumbo: {valor('rumbo_txt', fila)}")
+        if opciones['distancia']:
+            lineas.append(f"  Lado {lado}: Distancia: {valor('distancia', fila):.4f} m")
+        if opciones['dist_acum']:
+            lineas.append(f"  Distancia acumulada hasta vértice {n}: {valor('dist_acum', fila):.4f} m")
+        return lineas
+
+    n_poligono = 2 + int(opciones['area']) + int(opciones['perimetro'])
+    n_vertice = sum(1 for clave in ('internos', 'externos', 'azimut', 'rumbo', 'distancia', 'dist_acum')
+                    if opciones[clave])
+    return (
+        reporte.registrar_plantilla(poligono, n_poligono),
+        reporte.registrar_plantilla(anillo, 1),
+        reporte.registrar_plantilla(vertice, n_vertice) if n_vertice else None
+    )
+
+
+def resumen_poligonos(tabla):
+    """Encabezados y filas de la hoja de resumen: una fila con los totales de cada polígono"""
+    ids = tabla.columna('id_pol').arreglo()[0]
+    # Las filas de cada polígono son contiguas en la tabla
+    inicios = np.concatenate(([0], np.flatnonzero(np.diff(ids)) + 1)) if len(ids) else ids
+    encabezados = ["id_pol", "vertices"]
+    columnas = [ids[inicios].tolist(), np.diff(np.append(inicios, len(ids))).tolist()]
+    if 'area' in tabla:
+        encabezados.append("area")
+        columnas.append(tabla.columna('area').arreglo()[0][inicios].tolist())
+    if 'perimetro' in tabla:
+        encabezados.append("perimetro")
+        columnas.append(tabla.columna('perimetro').arreglo()[0][inicios].tolist())
+    if 'distancia' in tabla and len(ids):
+        encabezados.append("suma_lados")
+        columnas.append(np.add.reduceat(tabla.columna('distancia').arreglo()[0], inicios).tolist())
+    return encabezados, zip(*columnas)
+
+
+def medir_poligonos(entidades, tabla, motor, formateador, opciones, cronometro):
+    """
+    Calcula ángulos, lados, área y perímetro de cada polígono y los añade a ``tabla``.
+    Genera ``(id_pol, inicio, n_vertices)`` por entidad, con ``n_vertices``
+    igual a 0 si ningún anillo del polígono tiene tres vértices.
+
+    Los anillos (exteriores y huecos de todas las partes) se decodifican una
+    sola vez; ángulos, lados, área y perímetro se calculan por anillo a partir
+    de esa decodificación.
+    """
+    for feature in cronometro.iterar(LECTURA, entidades):
+        with cronometro.fase(CALCULO):
+            geom = feature.geometry()
+            n = 0
+            if not geom.isEmpty():
+                anillos, vertices_medicion = motor.poligonos(geom)
+                n = len(anillos.x)
+                cronometro.contar(VERTICES, n)
+            if n:
+                # Lados, área y perímetro en bloque
+                distancias = motor.lados(anillos, vertices_medicion)
+                area_m2, perimetro_m = motor.area_perimetro(anillos, vertices_medicion, distancias)
+
+                # Ángulos y azimuts de todos los vértices, cada anillo cerrado sobre sí mismo
+                v = calcular_vertices(np.column_stack((anillos.x, anillos.y)), distancias, anillos.inicios)
+
+        if not n:
+            yield feature.id(), None, 0
+            continue
+
+        with cronometro.fase(FORMATO):
+            ang_int_txt = formateador.textos(v.interno) if opciones['internos'] else None
+            ang_ext_txt = formateador.textos(v.externo) if opciones['externos'] else None
+            azimut_txt = formateador.textos(v.azimut) if opciones['azimut'] else None
+            rumbo_txt = formateador.rumbos(v.azimut) if opciones['rumbo'] else None
+
+        with cronometro.fase(ESCRITURA):
+            # Área y perímetro solo en el primer vértice
+            solo_primero = [None] * (n - 1)
+
+            # Todas las filas del polígono se añaden a la tabla en bloque
+            inicio = tabla.agregar_bloque(
+                n,
+                id_pol=feature.id(),
+                parte=anillos.parte + 1,
+                anillo=anillos.anillo,
+                vertice=anillos.vertice + 1,
+                x=v.x, y=v.y,
+                distancia=v.distancia if opciones['distancia'] else None,
+                dist_acum=v.dist_acum if opciones['dist_acum'] else None,
+                area=([convertir_area(area_m2, opciones['unidad_area'])] + solo_primero
+                      if opciones['area'] else None),
+                perimetro=[perimetro_m] + solo_primero if opciones['perimetro'] else None,
+                ang_int_txt=ang_int_txt,
+                ang_int_num=formateador.valores(v.interno) if opciones['internos'] else None,
+                ang_ext_txt=ang_ext_txt,
+                ang_ext_num=formateador.valores(v.externo) if opciones['externos'] else None,
+                azimut_txt=azimut_txt,
+                azimut_num=formateador.valores(v.azimut) if opciones['azimut'] else None,
+                rumbo_txt=rumbo_txt,
+                rumbo_num=np.degrees(v.azimut) if opciones['rumbo'] else None
+            )
+        yield feature.id(), inicio, n
+
+
+def completar_poligonos(filas, tabla, opciones, nombre_capa, al_agregar=None, cancelado=None, informar=None,
+                        cronometro=None):
+    """Recorre las filas medidas de cada polígono, las entrega a ``al_agregar`` y arma el reporte"""
+    if cronometro is None:
+        cronometro = Cronometro()
+    reporte = AlmacenReporte()
+    plantilla_poligono, plantilla_anillo, plantilla_vertice = plantillas_reporte(reporte, opciones, tabla)
+    reporte.agregar_texto("REPORTE DE CÁLCULOS TOPOGRÁFICOS")
+    reporte.agregar_texto(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+    reporte.agregar_texto(f"Capa de origen: {nombre_capa}")
+    reporte.agregar_texto("")
+    processed = 0
+
+    for id_pol, inicio, n in filas:
+        if cancelado is not None and cancelado():
+            return None
+
+        if n:
+            if al_agregar is not None:
+                with cronometro.fase(ESCRITURA):
+                    al_agregar(inicio, n)
+
+            with cronometro.fase(REPORTE):
+                # Agregar al reporte (se formatea solo al mostrarse o guardarse)
+                reporte.agregar(plantilla_poligono, inicio, entidad=id_pol)
+                # Con huecos o varias partes, cada anillo lleva su encabezado
+                varios_anillos = tabla.valor('vertice', inicio + n - 1) != n
+                for fila in range(inicio, inicio + n):
+                    if varios_anillos and tabla.valor('vertice', fila) == 1:
+                        reporte.agregar(plantilla_anillo, fila)
+                    if plantilla_vertice is not None:
+                        reporte.agregar(plantilla_vertice, fila)
+                reporte.agregar_texto("")
+
+        processed += 1
+        if informar is not None:
+            informar(processed)
+
+    cronometro.contar(ENTIDADES, processed)
+    return reporte
+
+
+def calcular_poligonos(entidades, tabla, motor, formateador, opciones, nombre_capa,
+                       al_agregar=None, cancelado=None, informar=None, cronometro=None):
+    """
+    Calcula ángulos, lados, área y perímetro de cada polígono y los añade a ``tabla``.
+    En el modo linderos se mide cada lado único una sola vez (ver ``calcular_linderos``).
+
+    :param entidades: Iterable de QgsFeature de polígonos.
+    :param al_agregar: ``al_agregar(inicio, n)`` se llama tras añadir las filas
+        de cada polígono (p. ej. para escribirlas en una capa).
+    :param cancelado: Función sin argumentos que devuelve True para detener el cálculo.
+    :param informar: ``informar(procesados)`` para notificar el progreso.
+    :param cronometro: Cronometro opcional donde se acumula el tiempo de cada fase.
+    :return: El AlmacenReporte del cálculo, o None si se canceló.
+    """
+    if cronometro is None:
+        cronometro = Cronometro()
+    if opciones['linderos']:
+        return calcular_linderos(entidades, tabla, motor, formateador, opciones, nombre_capa,
+                                 al_agregar, cancelado, informar, cronometro)
+    filas = medir_poligonos(entidades, tabla, motor, formateador, opciones, cronometro)
+    return completar_poligonos(filas, tabla, opciones, nombre_capa, al_agregar, cancelado, informar,
+                                cronometro)
+
+
+def medir_bloque_poligonos(origen, formateador, opciones, ids):
+    """
+    Mide un bloque de polígonos dentro de un proceso de trabajo.
+    :return: (tabla parcial, filas de cada polígono, contadores)
+    """
+    tabla = tabla_poligonos(opciones)
+    cronometro = Cronometro()
+    motor = MotorWkb(origen.planas, origen.elipsoide)
+    filas = list(medir_poligonos(entidades_ogr(origen, ids), tabla, motor, formateador, opciones, cronometro))
+    return tabla, filas, cronometro.contadores
+
+
+def calcular_poligonos_procesos(origen, bloques, trabajadores, tabla, formateador, opciones, nombre_capa,
+                                al_agregar=None, cancelado=None, informar=None, cronometro=None):
+    """
+    Igual que ``calcular_poligonos``, pero mide los bloques de ids en varios
+    procesos que leen la fuente ``origen`` (un ``OrigenOgr``) por su cuenta.
+    Las filas se unen en el orden de los bloques.
+    """
+    if cronometro is None:
+        cronometro = Cronometro()
+    filas = filas_bloques(partial(medir_bloque_poligonos, origen, formateador, opciones),
+                          bloques, trabajadores, tabla, cronometro)
+    return completar_poligonos(filas, tabla, opciones, nombre_capa, al_agregar, cancelado, informar,
+                                cronometro)
+
+
+def _ids_con_nulos(ids):
+    return [None if i == SIN_POLIGONO else i for i in ids.tolist()]
+
+
+def calcular_linderos(entidades, tabla, motor, formateador, opciones, nombre_capa,
+                      al_agregar=None, cancelado=None, informar=None, cronometro=None):
+    """
+    Mide una sola vez cada lado de un conjunto de polígonos contiguos.
+
+    Se recorren todos los polígonos reuniendo sus lados; los lados que
+    comparten extremos (ajustados a ``opciones['tolerancia']``) se agrupan en
+    un único lindero con los ids de los polígonos a su izquierda y a su
+    derecha. Solo se miden y escriben los linderos únicos, en el orden en que
+    aparecen por primera vez. Recibe los mismos argumentos que ``calcular_poligonos``.
+    :return: El AlmacenReporte del cálculo, o None si se canceló.
+    """
+    if cronometro is None:
+        cronometro = Cronometro()
+    inicios, fines, inicios_medicion, fines_medicion, ids, izquierdas = [], [], [], [], [], []
+    processed = 0
+    for feature in cronometro.iterar(LECTURA, entidades):
+        if cancelado is not None and cancelado():
+            return None
+        with cronometro.fase(CALCULO):
+            geom = feature.geometry()
+            n = 0
+            if not geom.isEmpty():
+                anillos, vertices_medicion = motor.poligonos(geom)
+                n = len(anillos.x)
+            if n:
+                cronometro.contar(VERTICES, n)
+                coordenadas = np.column_stack((anillos.x, anillos.y))
+                proximos = siguientes(anillos.inicios, n)
+                # El polígono queda a la izquierda de los lados de un exterior
+                # antihorario y de un hueco horario
+                antihorario = areas_con_signo(coordenadas, anillos.inicios) > 0
+                exterior = anillos.anillo[anillos.inicios] == 0
+                izquierdas.append(np.repeat(antihorario == exterior, np.diff(np.append(anillos.inicios, n))))
+                inicios.append(coordenadas)
+                fines.append(coordenadas[proximos])
+                inicios_medicion.append(vertices_medicion)
+                fines_medicion.append(vertices_medicion[proximos])
+                ids.append(np.full(n, feature.id(), dtype=np.int64))
+        processed += 1
+        if informar is not None:
+            informar(processed)
+    cronometro.contar(ENTIDADES, processed)
+
+    with cronometro.fase(CALCULO):
+        vacio = np.empty((0, 2), dtype=np.float64)
+        inicio = np.concatenate(inicios) if inicios else vacio
+        fin = np.concatenate(fines) if fines else vacio
+        indice = indice_linderos(inicio, fin, np.concatenate(ids) if ids else [],
+                                 np.concatenate(izquierdas) if izquierdas else [], opciones['tolerancia'])
+        # Cada lindero se mide una sola vez, en el sentido de su primera aparición
+        primero = indice.primero
+        n_linderos = len(primero)
+        inicio, fin = inicio[primero], fin[primero]
+        distancias = None
+        if opciones['distancia'] and n_linderos:
+            distancias = motor.distancias(np.concatenate(inicios_medicion)[primero],
+                                          np.concatenate(fines_medicion)[primero])[0]
+        azimuts = azimut(fin[:, 0] - inicio[:, 0], fin[:, 1] - inicio[:, 1])
+
+    with cronometro.fase(FORMATO):
+        azimut_txt = formateador.textos(azimuts) if opciones['azimut'] else None
+        rumbo_txt = formateador.rumbos(azimuts) if opciones['rumbo'] else None
+
+    with cronometro.fase(ESCRITURA):
+        primera_fila = tabla.agregar_bloque(
+            n_linderos,
+            id_lindero=np.arange(1, n_linderos + 1),
+            id_izq=_ids_con_nulos(indice.izquierda),
+            id_der=_ids_con_nulos(indice.derecha),
+            poligonos=indice.ocurrencias,
+            x_ini=inicio[:, 0], y_ini=inicio[:, 1],
+            x_fin=fin[:, 0], y_fin=fin[:, 1],
+            distancia=distancias,
+            azimut_txt=azimut_txt,
+            azimut_num=formateador.valores(azimuts) if opciones['azimut'] else None,
+            rumbo_txt=rumbo_txt,
+            rumbo_num=np.degrees(azimuts) if opciones['rumbo'] else None,
+            x_med=(inicio[:, 0] + fin[:, 0]) / 2.0, y_med=(inicio[:, 1] + fin[:, 1]) / 2.0
+        )
+        if al_agregar is not None and n_linderos:
+            al_agregar(primera_fila, n_linderos)
+
+    with cronometro.fase(REPORTE):
+        reporte = AlmacenReporte()
+        reporte.agregar_texto("REPORTE DE LINDEROS")
+        reporte.agregar_texto(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        reporte.agregar_texto(f"Capa de origen: {nombre_capa}")
+        reporte.agregar_texto(f"Polígonos: {processed}")
+        reporte.agregar_texto(f"Lados recorridos: {len(indice.grupo)}")
+        reporte.agregar_texto(f"Linderos únicos: {n_linderos} "
+                              f"(compartidos: {int(np.count_nonzero(indice.ocurrencias > 1))})")
+        superpuestos = int(np.count_nonzero(indice.ocurrencias > 2))
+        if superpuestos:
+            reporte.agregar_texto(f"Linderos con más de dos polígonos (superposiciones): {superpuestos}")
+        reporte.agregar_texto("")
+
+        valor = tabla.valor
+
+        def lindero(fila):
+            izquierda, derecha = valor('id_izq', fila), valor('id_der', fila)
+            texto = (f"Lindero {valor('id_lindero', fila)}: "
+                     f"izquierda {'-' if izquierda is None else izquierda}, "
+                     f"derecha {'-' if derecha is None else derecha}")
+            if opciones['distancia']:
+                texto += f"  Distancia: {valor('distancia', fila):.4f} m"
+            if opciones['azimut']:
+                texto += f"  Azimut: {valor('azimut_txt', fila)}"
+            if opciones['rumbo']:
+                texto += f"  Rumbo: {valor('rumbo_txt', fila)}"
+            return [texto]
+
+        plantilla_lindero = reporte.registrar_plantilla(lindero, 1)
+        for fila in range(primera_fila, primera_fila + n_linderos):
+            reporte.agregar(plantilla_lindero, fila)
+    return reporte
@@ -3,21 +3,31 @@
 from qgis.PyQt.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QSpinBox, 
     QDoubleSpinBox, QDialogButtonBox, QGroupBox, QWidget, QInputDialog, QFileDialog,
-    QCheckBox, QMessageBox, QAction 
+    QCheckBox, QMessageBox, QAction, QProgressDialog
 )
 from qgis.PyQt.QtGui import QColor, QIcon
-from qgis.PyQt.QtCore import Qt, QVariant
+from qgis.PyQt.QtCore import Qt, QVariant, QCoreApplication
 from qgis.core import (
-    QgsRasterLayer, QgsVectorLayer, QgsField, QgsFields, QgsFeature, 
+    QgsVectorLayer, QgsField, QgsFields, QgsFeature, 
     QgsGeometry, QgsWkbTypes, QgsProject, QgsDistanceArea,
     QgsMapLayerProxyModel, QgsMapLayer, QgsVectorFileWriter,
-    QgsCoordinateTransformContext, Qgis, QgsExpression
+    QgsCoordinateTransformContext, Qgis, QgsExpression, QgsCoordinateReferenceSystem
 )
-from qgis.gui import QgsMapLayerComboBox
-from qgis import processing
+from qgis.gui import QgsMapLayerComboBox, QgsFileWidget
+from functools import partial
 import os
-import tempfile
-import uuid
+import shutil
+
+from .calculo_curvas import (METODOS_INTERPOLACION, TIN, IDW, TAMANO_PIXEL, leer_puntos, interpolar_puntos,
+                             interpolar_rejilla, triangular_puntos, guardar_rejilla, leer_rejilla, generar_curvas,
+                             escribir_curvas, directorio_cache, VERSION_CURVAS)
+from ..core.cache import CacheArchivos, clave_cache, firma_archivo, huella_arreglos
+from ..core.curvas import curvas_rejilla
+from ..core.interpolacion import ParametrosIdw, tin_disponible
+from ..core.tin import curvas_tin, guardar_triangulacion, leer_triangulacion
+from .visor_metricas import PanelMetricas, registrar_metricas
+from ..core.cronometro import (Cronometro, LECTURA, ESCRITURA, INTERPOLACION, CURVAS, CARGA, EXPORTACION,
+                               ENTIDADES)
 
 class CurvasNivelDialog(QDialog):
     """
@@ -28,6 +38,9 @@ class CurvasNivelDialog(QDialog):
         self.iface = iface
         self.setWindowTitle("Generar Curvas de Nivel")
         self.setMinimumWidth(550)
+        self.cronometro = Cronometro()
+        # (clave, triangulación) de la última capa de puntos triangulada
+        self.ultima_triangulacion = None
         try:
             self.setup_ui()
         except Exception as e:
@@ -63,9 +76,57 @@ class CurvasNivelDialog(QDialog):
         self.interpolation_method_label = QLabel("Método de Interpolación (solo para puntos):")
         input_layout.addWidget(self.interpolation_method_label)
         self.interpolation_method_combo = QComboBox()
-        self.interpolation_method_combo.addItems(["TIN Interpolation", "IDW Interpolation"])
+        self.interpolation_method_combo.addItems(METODOS_INTERPOLACION)
         input_layout.addWidget(self.interpolation_method_combo)
 
+        # Parámetros de IDW: los vecinos de cada celda se buscan en un árbol KD
+        self.idw_widget = QWidget()
+        idw_layout = QVBoxLayout()
+        idw_layout.setContentsMargins(0, 0, 0, 0)
+
+        grid_layout = QHBoxLayout()
+        grid_layout.addWidget(QLabel("Potencia IDW:"))
+        self.idw_power_spinbox = QDoubleSpinBox()
+        self.idw_power_spinbox.setRange(0.1, 10.0)
+        self.idw_power_spinbox.setSingleStep(0.5)
+        self.idw_power_spinbox.setValue(2.0)
+        grid_layout.addWidget(self.idw_power_spinbox)
+        idw_layout.addLayout(grid_layout)
+
+        grid_layout = QHBoxLayout()
+        grid_layout.addWidget(QLabel("Vecinos más cercanos:"))
+        self.idw_neighbors_spinbox = QSpinBox()
+        self.idw_neighbors_spinbox.setRange(0, 1000)
+        self.idw_neighbors_spinbox.setSpecialValueText("Todos")
+        self.idw_neighbors_spinbox.setValue(12)
+        self.idw_neighbors_spinbox.setToolTip("Puntos más cercanos que intervienen en cada celda. "
+                                              "Todos = todos los puntos del radio.")
+        grid_layout.addWidget(self.idw_neighbors_spinbox)
+        idw_layout.addLayout(grid_layout)
+
+        grid_layout = QHBoxLayout()
+        grid_layout.addWidget(QLabel("Radio de búsqueda:"))
+        self.idw_radius_spinbox = QDoubleSpinBox()
+        self.idw_radius_spinbox.setRange(0.0, 1000000.0)
+        self.idw_radius_spinbox.setDecimals(3)
+        self.idw_radius_spinbox.setSpecialValueText("Sin límite")
+        self.idw_radius_spinbox.setValue(0.0)
+        grid_layout.addWidget(self.idw_radius_spinbox)
+        idw_layout.addLayout(grid_layout)
+
+        grid_layout = QHBoxLayout()
+        grid_layout.addWidget(QLabel("Mínimo de vecinos:"))
+        self.idw_min_neighbors_spinbox = QSpinBox()
+        self.idw_min_neighbors_spinbox.setRange(1, 1000)
+        self.idw_min_neighbors_spinbox.setValue(1)
+        self.idw_min_neighbors_spinbox.setToolTip("Las celdas con menos puntos en el radio quedan sin datos.")
+        grid_layout.addWidget(self.idw_min_neighbors_spinbox)
+        idw_layout.addLayout(grid_layout)
+
+        self.idw_widget.setLayout(idw_layout)
+        input_layout.addWidget(self.idw_widget)
+        self.interpolation_method_combo.currentIndexChanged.connect(self.update_input_options)
+
         self.input_layer_combo.layerChanged.connect(self.update_input_options)
         input_group.setLayout(input_layout)
         layout.addWidget(input_group)
@@ -114,6 +175,19 @@ class CurvasNivelDialog(QDialog):
         grid_layout.addWidget(self.major_interval_spinbox)
         params_layout.addLayout(grid_layout)
 
+        # Procesos de trabajo para ráster grandes (0 = según los núcleos del equipo)
+        grid_layout = QHBoxLayout()
+        grid_layout.addWidget(QLabel("Procesos de trabajo:"))
+        self.procesos_spinbox = QSpinBox()
+        self.procesos_spinbox.setRange(0, os.cpu_count() or 1)
+        self.procesos_spinbox.setSpecialValueText("Automático")
+        self.procesos_spinbox.setValue(0)
+        self.procesos_spinbox.setToolTip("Los ráster grandes se dividen en teselas que se procesan en "
+                                         "procesos independientes. 1 = un solo paso. "
+                                         "IDW busca los vecinos con el mismo número de hilos.")
+        grid_layout.addWidget(self.procesos_spinbox)
+        params_layout.addLayout(grid_layout)
+
         params_group.setLayout(params_layout)
         layout.addWidget(params_group)
 
@@ -150,9 +224,37 @@ class CurvasNivelDialog(QDialog):
         self.export_options_widget.setVisible(False)
         output_layout.addWidget(self.export_options_widget)
 
+        # El ráster interpolado de las capas de puntos solo se escribe si se pide
+        self.guardar_raster_checkbox = QCheckBox("Guardar ráster interpolado (solo puntos):")
+        output_layout.addWidget(self.guardar_raster_checkbox)
+        self.raster_file_widget = QgsFileWidget()
+        self.raster_file_widget.setFilter("GeoTIFF (*.tif);;Todos los archivos (*)")
+        self.raster_file_widget.setEnabled(False)
+        self.raster_file_widget.setStorageMode(QgsFileWidget.SaveFile)
+        self.guardar_raster_checkbox.toggled.connect(self.raster_file_widget.setEnabled)
+        output_layout.addWidget(self.raster_file_widget)
+
+        self.telemetria_checkbox = QCheckBox("Guardar telemetría (JSONL):")
+        output_layout.addWidget(self.telemetria_checkbox)
+        self.telemetria_file_widget = QgsFileWidget()
+        self.telemetria_file_widget.setFilter("JSON Lines (*.jsonl);;Todos los archivos (*)")
+        self.telemetria_file_widget.setEnabled(False)
+        self.telemetria_file_widget.setStorageMode(QgsFileWidget.SaveFile)
+        self.telemetria_checkbox.toggled.connect(self.telemetria_file_widget.setEnabled)
+        output_layout.addWidget(self.telemetria_file_widget)
+
         output_group.setLayout(output_layout)
         layout.addWidget(output_group)
 
+        # Registro: tiempos y memoria por fase de la última ejecución
+        self.metricas_group = QGroupBox("Registro")
+        metricas_layout = QVBoxLayout()
+        self.metricas_panel = PanelMetricas()
+        metricas_layout.addWidget(self.metricas_panel)
+        self.metricas_group.setLayout(metricas_layout)
+        self.metricas_group.setVisible(False)
+        layout.addWidget(self.metricas_group)
+
         button_box = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         button_box.accepted.connect(self.process_contours)
         button_box.rejected.connect(self.reject)
@@ -173,6 +275,8 @@ class CurvasNivelDialog(QDialog):
         self.height_field_combo.setEnabled(is_point_layer)
         self.interpolation_method_label.setEnabled(is_point_layer)
         self.interpolation_method_combo.setEnabled(is_point_layer)
+        self.guardar_raster_checkbox.setEnabled(is_point_layer)
+        self.idw_widget.setEnabled(bool(is_point_layer) and self.interpolation_method_combo.currentIndex() == IDW)
 
         if is_point_layer:
             self.populate_height_field_combo(layer)
@@ -204,39 +308,36 @@ class CurvasNivelDialog(QDialog):
             QMessageBox.warning(self, "Error", "Debe seleccionar una capa de entrada.")
             return
 
-        # Variables para archivos temporales
-        temp_raster_path = None
-        temp_contour_vector_path = None
+        # Tiempos de cada fase (las exportaciones se suman desde export_layer_to_file)
+        cronometro = self.cronometro = Cronometro()
+
+        # Las superficies y las curvas se guardan en la caché; las capas añadidas leen de ella
+        cache = CacheArchivos(directorio_cache())
+        en_uso = self.archivos_en_uso()
 
         try:
             # Para capas raster
             if input_layer.type() == QgsMapLayer.RasterLayer:
-                # Definir una ruta de archivo temporal para la salida de gdal:contour
-                temp_contour_vector_path = os.path.join(tempfile.gettempdir(), f"contours_raster_{uuid.uuid4().hex}.gpkg")
-
-                params_contour = {
-                    'INPUT': input_layer.source(), 
-                    'BAND': 1, # Asumimos la primera banda para el ráster
-                    'INTERVAL': interval,
-                    'BASE_CONTOUR': base_contour,
-                    'Z_FACTOR': z_factor,
-                    'FIELD_NAME': 'ELEV', # Nombre del campo de elevación en las curvas de salida
-                    'OUTPUT': temp_contour_vector_path # Salida a archivo temporal
-                }
-                result = processing.run("gdal:contour", params_contour)
+                clave_curvas = clave_cache('curvas', VERSION_CURVAS, firma_archivo(input_layer.source()), 1,
+                                           interval, base_contour, z_factor)
+                contours_path = cache.buscar(clave_curvas, 'gpkg')
+                if contours_path is None:
+                    with cronometro.fase(CURVAS):
+                        contours_path = cache.guardar(
+                            clave_curvas, 'gpkg',
+                            lambda ruta: self.generar_curvas(input_layer.source(), interval, base_contour,
+                                                             z_factor, ruta, cronometro),
+                            en_uso)
                 
-                if result and 'OUTPUT' in result:
-                    # Cargar la capa desde el archivo temporal
-                    contours_layer = QgsVectorLayer(result['OUTPUT'], "Curvas de Nivel", "ogr")
+                if contours_path:
+                    # Cargar la capa desde la caché
+                    with cronometro.fase(CARGA):
+                        contours_layer = QgsVectorLayer(contours_path, "Curvas de Nivel", "ogr")
                     if not contours_layer.isValid():
                         QMessageBox.critical(self, "Error", "No se pudo cargar la capa de curvas de nivel generada.")
                         return
                     # self.apply_style(contours_layer, interval, base_contour, major_interval) # Llamada a apply_style eliminada
-                    QgsProject.instance().addMapLayer(contours_layer)
-                    self.iface.messageBar().pushMessage("Éxito", "Curvas de nivel generadas y añadidas al proyecto.", level=Qgis.Success)
-                    if self.export_to_file_checkbox.isChecked():
-                        self.export_layer_to_file(contours_layer)
-                    self.accept()
+                    self.publicar_curvas(contours_layer, cronometro, input_layer.name())
                 else:
                     QMessageBox.warning(self, "Error", "No se pudieron generar las curvas de nivel desde el ráster.")
 
@@ -257,99 +358,172 @@ class CurvasNivelDialog(QDialog):
                     QMessageBox.critical(self, "Error de Capa", "No se pudo encontrar la capa de puntos seleccionada en el proyecto. Por favor, asegúrate de que esté cargada.")
                     return
                 
-                # Crear nombres de archivos temporales únicos para el ráster interpolado y el vector de contornos
-                temp_dir = tempfile.gettempdir()
-                temp_raster_path = os.path.join(temp_dir, f"interpolated_raster_{uuid.uuid4().hex}.tif")
-                temp_contour_vector_path = os.path.join(temp_dir, f"contours_points_{uuid.uuid4().hex}.gpkg") # Nuevo temporal para la salida de contornos
-                
-                selected_interpolation_method = self.interpolation_method_combo.currentText()
-                field_index = resolved_point_layer.fields().indexOf(height_field)
-
-                if selected_interpolation_method == "TIN Interpolation":
-                    # Formato para TIN: 'layer_id::~::field_index::~::use_z_bool::~::source_type'
-                    # use_z_bool: 0 (False) si se usa un campo de atributo, 1 (True) si se usan coordenadas Z reales
-                    # source_type: 0 para fuente de puntos
-                    interpolation_data_string = f"{resolved_point_layer.id()}::~::{field_index}::~::{0}::~::{0}"
-                    
-                    params_interpolation = {
-                        'INTERPOLATION_DATA': interpolation_data_string,
-                        'METHOD': 0, # Método de interpolación TIN (Linear)
-                        'EXTENT': resolved_point_layer.extent(),
-                        'PIXEL_SIZE': 10, # Tamaño de píxel predeterminado
-                        'OUTPUT': temp_raster_path
-                    }
-                    result_interpolation = processing.run("qgis:tininterpolation", params_interpolation)
-
-                elif selected_interpolation_method == "IDW Interpolation":
-                    # Formato para IDW: 'layer_id::~::field_index::~::use_z_bool::~::source_type'
-                    interpolation_data_string = f"{resolved_point_layer.id()}::~::{field_index}::~::{0}::~::{0}"
-
-                    params_interpolation = {
-                        'INTERPOLATION_DATA': interpolation_data_string,
-                        'POWER': 2.0, # Potencia para IDW
-                        'RADIUS': 0.0, # Radio de búsqueda (0.0 para global)
-                        'EXTENT': resolved_point_layer.extent(),
-                        'PIXEL_SIZE': 10, # Tamaño de píxel predeterminado
-                        'OUTPUT': temp_raster_path
-                    }
-                    result_interpolation = processing.run("qgis:idwinterpolation", params_interpolation)
-                else:
-                    QMessageBox.warning(self, "Error", "Método de interpolación no válido seleccionado.")
-                    return
-
-                if not result_interpolation or not result_interpolation['OUTPUT']:
-                    QMessageBox.critical(self, "Error", f"No se pudo generar el ráster interpolado a partir de los puntos con {selected_interpolation_method}.")
+                selected_interpolation_method = self.interpolation_method_combo.currentIndex()
+                cronometro.contar(ENTIDADES, resolved_point_layer.featureCount())
+                ruta_raster = self.raster_file_widget.filePath() if self.guardar_raster_checkbox.isChecked() else ''
+                if self.guardar_raster_checkbox.isChecked() and not ruta_raster:
+                    QMessageBox.warning(self, "Error", "Debe indicar la ruta del ráster interpolado.")
                     return
 
-                interpolated_raster = QgsRasterLayer(result_interpolation['OUTPUT'], "Raster Interpolado Temporal")
-                if not interpolated_raster.isValid():
-                    QMessageBox.critical(self, "Error", "No se pudo cargar el ráster interpolado temporal.")
-                    return
-
-                # Paso 2: Generar líneas de contorno a partir del ráster interpolado utilizando gdal:contour
-                params_contour = {
-                    'INPUT': interpolated_raster.source(),
-                    'BAND': 1,
-                    'INTERVAL': interval,
-                    'BASE_CONTOUR': base_contour,
-                    'Z_FACTOR': z_factor,
-                    'FIELD_NAME': 'ELEV',
-                    'OUTPUT': temp_contour_vector_path # Salida a archivo temporal
-                }
-                result_contour = processing.run("gdal:contour", params_contour)
-
-                if result_contour and result_contour['OUTPUT']:
-                    # Cargar la capa de contornos desde el archivo temporal
-                    contours_layer = QgsVectorLayer(result_contour['OUTPUT'], "Curvas de Nivel", "ogr")
+                # La superficie se identifica por los puntos, el sistema, el método, el píxel y la extensión
+                with cronometro.fase(LECTURA):
+                    puntos = leer_puntos(resolved_point_layer, height_field)
+                extension = resolved_point_layer.extent()
+                crs = resolved_point_layer.crs()
+                wkt = crs.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED)
+                parametros_idw = self.parametros_idw()
+                clave_superficie = clave_cache(
+                    'superficie', huella_arreglos(*puntos), wkt,
+                    selected_interpolation_method, TAMANO_PIXEL,
+                    (extension.xMinimum(), extension.yMinimum(), extension.xMaximum(), extension.yMaximum()),
+                    tuple(parametros_idw) if selected_interpolation_method == IDW else None)
+                # Con TIN las curvas salen directamente de la triangulación, que solo depende de los puntos
+                directo = selected_interpolation_method == TIN and tin_disponible()
+                if directo:
+                    clave_tin = clave_cache('triangulacion', huella_arreglos(*puntos))
+                    clave_curvas = clave_cache('curvas', clave_tin, wkt, interval, base_contour, z_factor)
+                else:
+                    clave_curvas = clave_cache('curvas', clave_superficie, interval, base_contour, z_factor)
+
+                rejilla = None
+                ruta_superficie = None
+                # Con TIN directo el ráster solo se calcula si se pide guardarlo
+                if not directo or ruta_raster:
+                    ruta_superficie = cache.buscar(clave_superficie, 'tif')
+                    if ruta_superficie is None:
+                        # Interpolación a una rejilla en memoria que se pasa directamente al generador de curvas
+                        try:
+                            rejilla = interpolar_rejilla(resolved_point_layer, height_field,
+                                                         selected_interpolation_method, cronometro=cronometro,
+                                                         puntos=puntos, parametros_idw=parametros_idw,
+                                                         trabajadores=self.procesos_spinbox.value())
+                            if rejilla is not None:
+                                escribir = partial(guardar_rejilla, rejilla, crs)
+                            else:
+                                # Sin SciPy, TIN se interpola con Processing directamente en la caché
+                                escribir = partial(interpolar_puntos, resolved_point_layer, height_field,
+                                                   selected_interpolation_method, cronometro=cronometro)
+                            with cronometro.fase(INTERPOLACION if rejilla is None else ESCRITURA):
+                                ruta_superficie = cache.guardar(clave_superficie, 'tif', escribir, en_uso)
+                        except (ValueError, RuntimeError) as e:
+                            QMessageBox.critical(self, "Error", str(e))
+                            return
+                if ruta_raster and ruta_superficie:
+                    with cronometro.fase(EXPORTACION):
+                        shutil.copyfile(ruta_superficie, ruta_raster)
+
+                contours_path = cache.buscar(clave_curvas, 'gpkg')
+                if contours_path is None and directo:
+                    # Cambiar el intervalo o la base solo repite el recorrido de los triángulos
+                    try:
+                        triangulacion = self.triangulacion(cache, clave_tin, resolved_point_layer, height_field,
+                                                           puntos, en_uso, cronometro)
+                    except (ValueError, RuntimeError) as e:
+                        QMessageBox.critical(self, "Error", str(e))
+                        return
+                    with cronometro.fase(CURVAS):
+                        curvas = curvas_tin(triangulacion, interval, base_contour, z_factor)
+                    with cronometro.fase(ESCRITURA):
+                        contours_path = cache.guardar(clave_curvas, 'gpkg', partial(escribir_curvas, curvas, crs),
+                                                      en_uso)
+                elif contours_path is None and ruta_superficie:
+                    # Cambiar solo el intervalo o la base reutiliza la superficie sin interpolar de nuevo
+                    if rejilla is None:
+                        with cronometro.fase(CARGA):
+                            rejilla = leer_rejilla(ruta_superficie)
+                    with cronometro.fase(CURVAS):
+                        curvas = curvas_rejilla(rejilla, interval, base_contour, z_factor)
+                    with cronometro.fase(ESCRITURA):
+                        contours_path = cache.guardar(clave_curvas, 'gpkg', partial(escribir_curvas, curvas, crs),
+                                                      en_uso)
+
+                if contours_path:
+                    # Cargar la capa de contornos desde la caché
+                    with cronometro.fase(CARGA):
+                        contours_layer = QgsVectorLayer(contours_path, "Curvas de Nivel", "ogr")
                     if not contours_layer.isValid():
                         QMessageBox.critical(self, "Error", "No se pudo cargar la capa de curvas de nivel generada.")
                         return
 
                     # self.apply_style(contours_layer, interval, base_contour, major_interval) # Llamada a apply_style eliminada
-                    QgsProject.instance().addMapLayer(contours_layer)
-                    self.iface.messageBar().pushMessage("Éxito", "Curvas de nivel generadas y añadidas al proyecto.", level=Qgis.Success)
-                    if self.export_to_file_checkbox.isChecked():
-                        self.export_layer_to_file(contours_layer)
-                    self.accept()
+                    self.publicar_curvas(contours_layer, cronometro, input_layer.name())
                 else:
                     QMessageBox.critical(self, "Error", "El algoritmo de contorno no generó una salida válida.")
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error al generar las curvas de nivel: {e}")
+
+    def parametros_idw(self):
+        """Parámetros de IDW elegidos en el diálogo"""
+        return ParametrosIdw(self.idw_power_spinbox.value(), self.idw_neighbors_spinbox.value(),
+                             self.idw_radius_spinbox.value(), self.idw_min_neighbors_spinbox.value())
+
+    def triangulacion(self, cache, clave, capa, campo, puntos, en_uso, cronometro):
+        """Triangulación de los puntos: la última usada, la guardada en la caché o una nueva"""
+        if self.ultima_triangulacion is not None and self.ultima_triangulacion[0] == clave:
+            return self.ultima_triangulacion[1]
+        ruta = cache.buscar(clave, 'npz')
+        if ruta is not None:
+            with cronometro.fase(CARGA):
+                triangulacion = leer_triangulacion(ruta)
+        else:
+            triangulacion = triangular_puntos(capa, campo, cronometro, puntos)
+            with cronometro.fase(ESCRITURA):
+                cache.guardar(clave, 'npz', partial(guardar_triangulacion, triangulacion), en_uso)
+        self.ultima_triangulacion = (clave, triangulacion)
+        return triangulacion
+
+    def archivos_en_uso(self):
+        """Archivos que leen las capas del proyecto; la caché no los elimina"""
+        return [capa.source().split('|')[0] for capa in QgsProject.instance().mapLayers().values()]
+
+    def publicar_curvas(self, contours_layer, cronometro, nombre_capa):
+        """Añade la capa de curvas al proyecto, la exporta si se pidió y muestra los tiempos"""
+        with cronometro.fase(CARGA):
+            QgsProject.instance().addMapLayer(contours_layer)
+        cronometro.detener()
+        self.iface.messageBar().pushMessage("Éxito", "Curvas de nivel generadas y añadidas al proyecto.", level=Qgis.Success)
+        if self.export_to_file_checkbox.isChecked():
+            self.export_layer_to_file(contours_layer)
+        self.mostrar_metricas(cronometro, nombre_capa)
+
+    def generar_curvas(self, raster, interval, base_contour, z_factor, salida, cronometro):
+        """
+        Genera las curvas del ráster con una barra de progreso que permite
+        cancelar el cálculo por teselas de los ráster grandes.
+        """
+        progreso = QProgressDialog("Generando curvas de nivel...", "Cancelar", 0, 100, self)
+        progreso.setWindowModality(Qt.WindowModal)
+        progreso.setMinimumDuration(500)
+
+        def informar(porcentaje):
+            progreso.setValue(porcentaje)
+            QCoreApplication.processEvents()
+
+        try:
+            ruta = generar_curvas(raster, interval, base_contour, z_factor, salida, cronometro=cronometro,
+                                  trabajadores=self.procesos_spinbox.value(),
+                                  cancelado=progreso.wasCanceled, informar=informar)
         finally:
-            # Limpieza de archivos temporales
-            try:
-                if temp_raster_path and os.path.exists(temp_raster_path):
-                    os.remove(temp_raster_path)
-                if temp_contour_vector_path and os.path.exists(temp_contour_vector_path):
-                    os.remove(temp_contour_vector_path)
-            except Exception as e:
-                self.iface.messageBar().pushMessage("Advertencia", 
-                    f"No se pudieron eliminar archivos temporales: {str(e)}", 
-                    level=Qgis.Warning, duration=5)
+            cancelado = progreso.wasCanceled()
+            progreso.close()
+        if cancelado:
+            self.iface.messageBar().pushMessage("Cancelado", "Se canceló la generación de curvas de nivel.",
+                                                level=Qgis.Info)
+        return ruta
 
     # El método apply_style ha sido eliminado.
 
+    def mostrar_metricas(self, cronometro, nombre_capa):
+        """Muestra los tiempos de la ejecución en el registro y los guarda en la telemetría"""
+        ruta_jsonl = self.telemetria_file_widget.filePath() if self.telemetria_checkbox.isChecked() else None
+        error = registrar_metricas("Curvas de nivel", cronometro, ruta_jsonl, capa=nombre_capa,
+                                   intervalo=self.interval_spinbox.value())
+        if error:
+            QMessageBox.warning(self, "Error", error)
+        self.metricas_panel.mostrar(cronometro)
+        self.metricas_group.setVisible(True)
+
     def export_layer_to_file(self, layer):
         """Exporta la capa de contorno a un archivo."""
         selected_format = self.output_format_combo.currentText()
@@ -380,12 +554,13 @@ class CurvasNivelDialog(QDialog):
 
             transform_context = QgsProject.instance().transformContext()
 
-            error = QgsVectorFileWriter.writeAsVectorFormatV2(
-                layer,
-                file_name,
-                transform_context,
-                options
-            )
+            with self.cronometro.fase(EXPORTACION):
+                error = QgsVectorFileWriter.writeAsVectorFormatV2(
+                    layer,
+                    file_name,
+                    transform_context,
+                    options
+                )
 
             if error[0] == QgsVectorFileWriter.NoError:
                 self.iface.messageBar().pushMessage(
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Funciones de expresión de QGIS con los cálculos del plugin.
+
+Permiten etiquetar o calcular campos con azimuts, rumbos, ángulos internos y
+longitudes de cada segmento sin crear la capa de puntos de los diálogos. Los
+resultados de cada geometría se guardan en una caché (por su huella WKB,
+sistema de referencia y elipsoide), de modo que al redibujar el mapa cada
+geometría se mide una sola vez aunque se evalúen varias funciones sobre ella.
+"""
+from collections import OrderedDict
+import threading
+
+import numpy as np
+from qgis.core import (QgsCoordinateReferenceSystem, QgsDistanceArea, QgsExpression, QgsProject,
+                       QgsWkbTypes, qgsfunction)
+
+from .medicion import MotorMedicion
+from ..core.angulos import FormateadorAngulos, DECIMAL
+from ..core.incremental import huella
+from ..core.poligonos import calcular_vertices
+from ..core.segmentos import calcular_segmentos
+
+GRUPO = "Topografía"
+
+# Geometrías medidas que se conservan en la caché
+TAMANO_CACHE = 4096
+
+_cache = OrderedDict()
+_motores = {}
+_bloqueo = threading.Lock()
+
+
+def limpiar_cache():
+    with _bloqueo:
+        _cache.clear()
+        _motores.clear()
+
+
+def _motor(context):
+    """
+    Motor de medición del sistema de la capa y el elipsoide del proyecto.
+    Cada hilo de renderizado usa su propio motor (y su propia transformación).
+    :return: (clave del sistema y elipsoide, motor)
+    """
+    crs = context.variable('layer_crs') or ''
+    elipsoide = context.variable('project_ellipsoid') or 'NONE'
+    clave = (crs, elipsoide)
+    clave_hilo = clave + (threading.get_ident(),)
+    with _bloqueo:
+        motor = _motores.get(clave_hilo)
+    if motor is None:
+        sistema = QgsCoordinateReferenceSystem(crs)
+        distance_area = QgsDistanceArea()
+        distance_area.setSourceCrs(sistema, QgsProject.instance().transformContext())
+        distance_area.setEllipsoid(elipsoide)
+        # Sin elipsoide en el proyecto se mide en el plano (o sobre WGS84 si la capa es geográfica)
+        planas = not distance_area.willUseEllipsoid()
+        if planas:
+            distance_area.setEllipsoid('WGS84')
+        motor = MotorMedicion(sistema, distance_area, planas)
+        with _bloqueo:
+            _motores[clave_hilo] = motor
+    return clave, motor
+
+
+def _medir(geom, motor):
+    """(azimuts en radianes, longitudes, ángulos internos en radianes o None) de una geometría"""
+    tipo = geom.type()
+    if tipo == QgsWkbTypes.LineGeometry:
+        partes, longitudes = motor.lineas(geom)
+        seg = calcular_segmentos(partes, longitudes)
+        return seg.azimut, seg.longitud, None
+    if tipo == QgsWkbTypes.PolygonGeometry:
+        anillos, vertices_medicion = motor.poligonos(geom)
+        if not len(anillos.x):
+            return None
+        v = calcular_vertices(np.column_stack((anillos.x, anillos.y)),
+                              motor.lados(anillos, vertices_medicion), anillos.inicios)
+        return v.azimut, v.distancia, v.interno
+    return None
+
+
+def medicion_entidad(feature, context):
+    """Medición de la geometría de la entidad, tomada de la caché si ya se calculó"""
+    if feature is None:
+        return None
+    geom = feature.geometry()
+    if geom is None or geom.isEmpty():
+        return None
+    clave_motor, motor = _motor(context)
+    clave = (clave_motor, huella(geom.asWkb()))
+    with _bloqueo:
+        if clave in _cache:
+            _cache.move_to_end(clave)
+            return _cache[clave]
+    resultado = _medir(geom, motor)
+    with _bloqueo:
+        _cache[clave] = resultado
+        if len(_cache) > TAMANO_CACHE:
+            _cache.popitem(last=False)
+    return resultado
+
+
+def _valor(indice, feature, parent, context, posicion):
+    """Elemento ``posicion`` de la medición en el segmento o vértice ``indice`` (desde 1)"""
+    medicion = medicion_entidad(feature, context)
+    if medicion is None or medicion[posicion] is None:
+        return None
+    valores = medicion[posicion]
+    n = int(indice)
+    if not 1 <= n <= len(valores):
+        parent.setEvalErrorString(f"Índice {n} fuera de rango (1 a {len(valores)})")
+        return None
+    return float(valores[n - 1])
+
+
+@qgsfunction(args='auto', group=GRUPO, usesgeometry=True, register=False)
+def topo_azimut(segmento, feature, parent, context):
+    """
+    Azimut en grados (desde el norte, en sentido horario) del segmento de una
+    línea o del lado de un polígono.
+    <h4>Sintaxis</h4><p>topo_azimut(<i>segmento</i>)</p>
+    <h4>Argumentos</h4><p><i>segmento</i>: número del segmento o lado, desde 1.</p>
+    <h4>Ejemplo</h4><p>topo_azimut(1) &rarr; 45.0</p>
+    """
+    azimut = _valor(segmento, feature, parent, context, 0)
+    return None if azimut is None else float(np.degrees(azimut)) % 360.0
+
+
+@qgsfunction(args='auto', group=GRUPO, usesgeometry=True, register=False)
+def topo_rumbo(segmento, decimales, feature, parent, context):
+    """
+    Rumbo por cuadrantes del segmento de una línea o del lado de un polígono.
+    <h4>Sintaxis</h4><p>topo_rumbo(<i>segmento</i>, <i>decimales</i>)</p>
+    <h4>Argumentos</h4><p><i>segmento</i>: número del segmento o lado, desde 1.<br>
+    <i>decimales</i>: decimales de los grados.</p>
+    <h4>Ejemplo</h4><p>topo_rumbo(1, 2) &rarr; 'N 45.00° E'</p>
+    """
+    azimut = _valor(segmento, feature, parent, context, 0)
+    if azimut is None:
+        return None
+    return FormateadorAngulos(DECIMAL, int(decimales)).rumbos(np.array([azimut]))[0]
+
+
+@qgsfunction(args='auto', group=GRUPO, usesgeometry=True, register=False)
+def topo_angulo_interno(vertice, feature, parent, context):
+    """
+    Ángulo interno en grados de un vértice de un polígono.
+    <h4>Sintaxis</h4><p>topo_angulo_interno(<i>vertice</i>)</p>
+    <h4>Argumentos</h4><p><i>vertice</i>: número del vértice, desde 1.</p>
+    <h4>Ejemplo</h4><p>topo_angulo_interno(1) &rarr; 90.0</p>
+    """
+    angulo = _valor(vertice, feature, parent, context, 2)
+    return None if angulo is None else float(np.degrees(angulo))
+
+
+@qgsfunction(args='auto', group=GRUPO, usesgeometry=True, register=False)
+def topo_longitud(segmento, feature, parent, context):
+    """
+    Longitud en metros del segmento de una línea o del lado de un polígono,
+    medida sobre el elipsoide del proyecto (o en el plano si el proyecto no
+    usa elipsoide).
+    <h4>Sintaxis</h4><p>topo_longitud(<i>segmento</i>)</p>
+    <h4>Argumentos</h4><p><i>segmento</i>: número del segmento o lado, desde 1.</p>
+    <h4>Ejemplo</h4><p>topo_longitud(2) &rarr; 120.532</p>
+    """
+    return _valor(segmento, feature, parent, context, 1)
+
+
+@qgsfunction(args='auto', group=GRUPO, usesgeometry=True, register=False)
+def topo_segmentos(feature, parent, context):
+    """
+    Número de segmentos de una línea o de lados (vértices) de un polígono.
+    <h4>Sintaxis</h4><p>topo_segmentos()</p>
+    <h4>Ejemplo</h4><p>topo_segmentos() &rarr; 4</p>
+    """
+    medicion = medicion_entidad(feature, context)
+    return 0 if medicion is None else len(medicion[0])
+
+
+FUNCIONES = (topo_azimut, topo_rumbo, topo_angulo_interno, topo_longitud, topo_segmentos)
+
+
+def registrar_funciones():
+    """Registra las funciones de expresión del plugin"""
+    for funcion in FUNCIONES:
+        if not QgsExpression.isFunctionName(funcion.name()):
+            QgsExpression.registerFunction(funcion)
+
+
+def eliminar_funciones():
+    """Elimina las funciones de expresión del plugin y vacía la caché"""
+    for funcion in FUNCIONES:
+        QgsExpression.unregisterFunction(funcion.name())
+    limpiar_cache()
@@ -0,0 +1,15 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsGeometry, QgsWkbTypes
+from ..core import wkb
+
+
+def partes_geometria(geom):
+    """
+    Extrae las coordenadas de una geometría QGIS sin crear objetos por vértice.
+
+    Las geometrías curvas se segmentan antes de decodificarse.
+    :return: (tipo_base, partes) tal como lo devuelve ``core.wkb.decodificar``.
+    """
+    if QgsWkbTypes.isCurvedType(geom.wkbType()):
+        geom = QgsGeometry(geom.constGet().segmentize())
+    return wkb.decodificar(geom.asWkb())
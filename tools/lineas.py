@@ -1,19 +1,29 @@
 from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QLabel, QComboBox, 
-                                QSpinBox, QDialogButtonBox, QHBoxLayout,
+                                QSpinBox, QDoubleSpinBox, QDialogButtonBox, QHBoxLayout,
                                 QCheckBox, QMessageBox, QGroupBox, 
-                                QTabWidget, QWidget, QApplication, QTextEdit)
-from qgis.PyQt.QtCore import Qt, QVariant
+                                QTabWidget, QWidget, QPushButton)
+from qgis.PyQt.QtCore import Qt, QCoreApplication
 from qgis.gui import QgsMapLayerComboBox, QgsFileWidget
 from qgis.core import (QgsProject, QgsVectorLayer, QgsMapLayerProxyModel,
-                      QgsWkbTypes, QgsFields, QgsField, QgsFeature,
-                      QgsGeometry, QgsPointXY, QgsCoordinateTransformContext,
-                      QgsVectorFileWriter, QgsDistanceArea)
-import math
+                      QgsWkbTypes, QgsCoordinateTransformContext,
+                      QgsDistanceArea, QgsApplication,
+                      QgsFeatureRequest, QgsVectorLayerFeatureSource, Qgis)
 import os
-import csv
-from datetime import datetime
+from functools import partial
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
-from openpyxl import Workbook
+from .calculo_lineas import (tabla_lineas, calcular_lineas, calcular_lineas_procesos, medir_lineas,
+                             completar_lineas, columnas_punto)
+from .salida import SumideroEntidades, crear_capa_archivo, campos_tabla, entidades_tabla
+from .medicion import MotorMedicion, preparar_procesos
+from .calculo_en_vivo import CalculoEnVivo
+from .tareas import TareaCalculo
+from .visor_metricas import PanelMetricas, registrar_metricas
+from .visor_reporte import VisorReporte, imprimir_reporte
+from ..core.angulos import FormateadorAngulos
+from ..core.cronometro import Cronometro, ESCRITURA, EXPORTACION
+from ..core.excel import escribir_xlsx
+from ..core.incremental import ResultadosIncrementales, con_huellas
+from ..core.tabla import escribir_csv
 
 class CalculosLineasDialog(QDialog):
     def __init__(self, iface):
@@ -25,6 +35,10 @@ class CalculosLineasDialog(QDialog):
         self.distance_area = QgsDistanceArea()
         self.distance_area.setEllipsoid('WGS84')
         self.report_data = []
+        self.opciones = self.leer_opciones()
+        self.tareas = []
+        self.cronometro = Cronometro()
+        self.en_vivo = None
 
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -79,12 +93,52 @@ class CalculosLineasDialog(QDialog):
         config_layout.addWidget(self.dist_acum_cb)
         config_layout.addWidget(self.reporte_cb)
         
+        # Cadenamiento: estaciones cada cierto intervalo, en los vértices y al final de la línea
+        self.cadenamiento_cb = QCheckBox("Modo cadenamiento (estaciones a intervalo fijo)")
+        self.cadenamiento_cb.setToolTip("En lugar de un punto por segmento se genera un punto por estación "
+                                        "(p. ej. 0+120.000), por vértice y al final de cada línea.")
+        config_layout.addWidget(self.cadenamiento_cb)
+        
+        cadenamiento_layout = QHBoxLayout()
+        cadenamiento_layout.addWidget(QLabel("Intervalo (m):"))
+        self.intervalo_spin = QDoubleSpinBox()
+        self.intervalo_spin.setRange(0.001, 1000000)
+        self.intervalo_spin.setDecimals(3)
+        self.intervalo_spin.setValue(20)
+        cadenamiento_layout.addWidget(self.intervalo_spin)
+        cadenamiento_layout.addWidget(QLabel("Estación inicial (m):"))
+        self.estacion_inicial_spin = QDoubleSpinBox()
+        self.estacion_inicial_spin.setRange(0, 100000000)
+        self.estacion_inicial_spin.setDecimals(3)
+        cadenamiento_layout.addWidget(self.estacion_inicial_spin)
+        config_layout.addLayout(cadenamiento_layout)
+        self.intervalo_spin.setEnabled(False)
+        self.estacion_inicial_spin.setEnabled(False)
+        self.cadenamiento_cb.toggled.connect(self.intervalo_spin.setEnabled)
+        self.cadenamiento_cb.toggled.connect(self.estacion_inicial_spin.setEnabled)
+        # Distancias y distancias acumuladas son propias de los segmentos
+        self.cadenamiento_cb.toggled.connect(lambda activo: self.distancia_cb.setEnabled(not activo))
+        self.cadenamiento_cb.toggled.connect(lambda activo: self.dist_acum_cb.setEnabled(not activo))
+        
+        # Modo en vivo: mantener el resultado al día mientras se edita la capa
+        self.en_vivo_cb = QCheckBox("Modo en vivo: recalcular al editar la capa")
+        self.en_vivo_cb.setToolTip("Tras el cálculo, las entidades que se modifiquen, añadan o eliminen "
+                                   "se recalculan y se actualizan en la capa temporal y el reporte.")
+        self.en_vivo_cb.toggled.connect(lambda activo: activo or self.detener_en_vivo())
+        config_layout.addWidget(self.en_vivo_cb)
+        
         # Unidades angulares
         config_layout.addWidget(QLabel("Unidades angulares:"))
         self.unit_combo = QComboBox()
         self.unit_combo.addItems(["Grados Decimales", "Grados/Minutos/Segundos"])
         config_layout.addWidget(self.unit_combo)
         
+        # Tipo de distancia
+        config_layout.addWidget(QLabel("Tipo de distancia:"))
+        self.distancia_tipo_combo = QComboBox()
+        self.distancia_tipo_combo.addItems(["Elipsoidal", "De cuadrícula (plana)"])
+        config_layout.addWidget(self.distancia_tipo_combo)
+        
         # Precisión decimal
         config_layout.addWidget(QLabel("Precisión decimal:"))
         self.decimal_spin = QSpinBox()
@@ -92,6 +146,24 @@ class CalculosLineasDialog(QDialog):
         self.decimal_spin.setValue(4)
         config_layout.addWidget(self.decimal_spin)
         
+        # Tamaño de lote para la escritura de entidades
+        config_layout.addWidget(QLabel("Tamaño de lote de escritura:"))
+        self.lote_spin = QSpinBox()
+        self.lote_spin.setRange(100, 1000000)
+        self.lote_spin.setSingleStep(1000)
+        self.lote_spin.setValue(10000)
+        config_layout.addWidget(self.lote_spin)
+        
+        # Procesos de trabajo para capas grandes (0 = según los núcleos del equipo)
+        config_layout.addWidget(QLabel("Procesos de trabajo:"))
+        self.procesos_spin = QSpinBox()
+        self.procesos_spin.setRange(0, os.cpu_count() or 1)
+        self.procesos_spin.setSpecialValueText("Automático")
+        self.procesos_spin.setValue(0)
+        self.procesos_spin.setToolTip("Las capas OGR con muchas entidades se reparten en bloques "
+                                      "que se calculan en procesos independientes. 1 = un solo proceso.")
+        config_layout.addWidget(self.procesos_spin)
+        
         config_group.setLayout(config_layout)
         self.param_layout.addWidget(config_group)
 
@@ -149,12 +221,22 @@ class CalculosLineasDialog(QDialog):
         self.pdf_file_widget.setStorageMode(QgsFileWidget.SaveFile)
         output_layout.addWidget(self.pdf_file_widget)
         
+        self.telemetria_rb = QCheckBox("Guardar telemetría (JSONL):")
+        output_layout.addWidget(self.telemetria_rb)
+        
+        self.telemetria_file_widget = QgsFileWidget()
+        self.telemetria_file_widget.setFilter("JSON Lines (*.jsonl);;Todos los archivos (*)")
+        self.telemetria_file_widget.setEnabled(False)
+        self.telemetria_file_widget.setStorageMode(QgsFileWidget.SaveFile)
+        output_layout.addWidget(self.telemetria_file_widget)
+        
         # Conectar señales
         self.file_rb.toggled.connect(self.file_widget.setEnabled)
         self.reporte_file_rb.toggled.connect(self.reporte_file_widget.setEnabled)
         self.export_csv_rb.toggled.connect(self.csv_file_widget.setEnabled)
         self.export_excel_rb.toggled.connect(self.excel_file_widget.setEnabled)
         self.export_pdf_rb.toggled.connect(self.pdf_file_widget.setEnabled)
+        self.telemetria_rb.toggled.connect(self.telemetria_file_widget.setEnabled)
         
         output_group.setLayout(output_layout)
         self.param_layout.addWidget(output_group)
@@ -169,11 +251,20 @@ class CalculosLineasDialog(QDialog):
         self.log_label.setWordWrap(True)
         
         # Añadir área para el reporte resumen
-        self.reporte_text = QTextEdit()
-        self.reporte_text.setReadOnly(True)
+        self.reporte_visor = VisorReporte()
+        
+        # Botón para detener el cálculo en segundo plano
+        self.cancelar_button = QPushButton("Cancelar cálculo")
+        self.cancelar_button.setEnabled(False)
+        self.cancelar_button.clicked.connect(self.cancelar_calculo)
         
         self.log_layout.addWidget(self.log_label)
-        self.log_layout.addWidget(self.reporte_text)
+        self.log_layout.addWidget(self.cancelar_button)
+        
+        # Tiempos y memoria por fase de la última ejecución
+        self.metricas_panel = PanelMetricas()
+        self.log_layout.addWidget(self.metricas_panel)
+        self.log_layout.addWidget(self.reporte_visor)
         self.log_tab.setLayout(self.log_layout)
         self.tabs.addTab(self.log_tab, "Registro y Reporte")
 
@@ -193,332 +284,297 @@ class CalculosLineasDialog(QDialog):
         layer = self.layer_combo.currentLayer()
         self.selected_only.setEnabled(layer and layer.selectedFeatureCount() > 0)
 
-    def calcular_azimut(self, punto_inicio, punto_fin):
-        """Calcula el azimut entre dos puntos"""
-        dx = punto_fin.x() - punto_inicio.x()
-        dy = punto_fin.y() - punto_inicio.y()
-        
-        azimut_rad = math.atan2(dx, dy)
-        if azimut_rad < 0:
-            azimut_rad += 2 * math.pi
-            
-        return azimut_rad
-
-    def azimut_a_rumbo(self, azimut_rad):
-        """Convierte azimut a rumbo"""
-        decimales = self.decimal_spin.value()
-        azimut_grados = math.degrees(azimut_rad)
-        
-        if 0 <= azimut_grados < 90:
-            return f"N {azimut_grados:.{decimales}f}° E"
-        elif 90 <= azimut_grados < 180:
-            return f"S {180 - azimut_grados:.{decimales}f}° E"
-        elif 180 <= azimut_grados < 270:
-            return f"S {azimut_grados - 180:.{decimales}f}° W"
-        else:
-            return f"N {360 - azimut_grados:.{decimales}f}° W"
-
-    def formatear_angulo(self, angulo_rad, es_rumbo=False):
-        """Formatea el ángulo según las unidades seleccionadas"""
-        decimales = self.decimal_spin.value()
-        angulo_grados = math.degrees(angulo_rad) % 360
-        
-        if es_rumbo:
-            return self.azimut_a_rumbo(angulo_rad)
-        
-        if self.unit_combo.currentIndex() == 0:  # Grados decimales
-            return f"{angulo_grados:.{decimales}f}°"
-        else:  # Grados/Minutos/Segundos
-            grados = int(angulo_grados)
-            minutos_float = abs(angulo_grados - grados) * 60
-            minutos = int(minutos_float)
-            segundos = round((minutos_float - minutos) * 60, decimales)
-            
-            # Ajustar redondeo
-            if segundos >= 60:
-                segundos -= 60
-                minutos += 1
-            if minutos >= 60:
-                minutos -= 60
-                grados += 1
-            
-            return f"{grados}° {minutos}' {segundos}\""
+    def leer_opciones(self):
+        """Captura la configuración del diálogo para usarla fuera del hilo principal"""
+        return {
+            'azimut': self.azimut_cb.isChecked(),
+            'rumbo': self.rumbo_cb.isChecked(),
+            'distancia': self.distancia_cb.isChecked(),
+            'dist_acum': self.dist_acum_cb.isChecked(),
+            'cadenamiento': self.cadenamiento_cb.isChecked(),
+            'intervalo': self.intervalo_spin.value(),
+            'estacion_inicial': self.estacion_inicial_spin.value(),
+            'reporte': self.reporte_cb.isChecked(),
+            'unidad': self.unit_combo.currentIndex(),
+            'decimales': self.decimal_spin.value(),
+            'planas': self.distancia_tipo_combo.currentIndex() == 1,
+            'lote': self.lote_spin.value(),
+            'procesos': self.procesos_spin.value(),
+            'en_vivo': self.en_vivo_cb.isChecked(),
+            'temporal': self.temp_rb.isChecked(),
+            'archivo': self.file_widget.filePath() if self.file_rb.isChecked() else None,
+            'reporte_archivo': self.reporte_file_widget.filePath() if self.reporte_file_rb.isChecked() else None,
+            'csv': self.csv_file_widget.filePath() if self.export_csv_rb.isChecked() else None,
+            'excel': self.excel_file_widget.filePath() if self.export_excel_rb.isChecked() else None,
+            'pdf': self.pdf_file_widget.filePath() if self.export_pdf_rb.isChecked() else None,
+            'telemetria': self.telemetria_file_widget.filePath() if self.telemetria_rb.isChecked() else None,
+        }
 
     def calcular_azimut_rumbo(self):
-        """Método principal para realizar cálculos sobre líneas"""
+        """Método principal: valida la configuración y lanza el cálculo en segundo plano"""
         try:
-            if not (self.azimut_cb.isChecked() or self.rumbo_cb.isChecked() or 
+            if not (self.azimut_cb.isChecked() or self.rumbo_cb.isChecked() or self.cadenamiento_cb.isChecked() or
                     self.distancia_cb.isChecked() or self.dist_acum_cb.isChecked()):
                 QMessageBox.warning(self, "Error", "Seleccione al menos un tipo de cálculo")
                 return
 
-            self.log_label.setText("Iniciando cálculo...")
-            self.button_box.setEnabled(False)
-            QApplication.processEvents()
-            
             layer = self.layer_combo.currentLayer()
             if not layer:
                 QMessageBox.warning(self, "Error", "Seleccione una capa de líneas")
                 return
 
+            # Un nuevo cálculo completo reemplaza al resultado en vivo anterior
+            self.detener_en_vivo()
+
+            opciones = self.leer_opciones()
+            if self.file_rb.isChecked() and not opciones['archivo']:
+                QMessageBox.warning(self, "Error", "Seleccione un archivo de salida")
+                return
+
+            self.opciones = opciones
             crs = layer.crs()
             self.distance_area.setSourceCrs(crs, QgsCoordinateTransformContext())
+            motor = MotorMedicion(crs, self.distance_area, opciones['planas'])
+            # El formato de ángulos se fija una sola vez para todo el cálculo
+            formateador = FormateadorAngulos(opciones['unidad'], opciones['decimales'])
             
+            # Fuente de entidades independiente de la capa, segura para otro hilo
+            request = QgsFeatureRequest()
+            ids = None
             if self.selected_only.isChecked() and self.selected_only.isEnabled():
-                features = layer.selectedFeatures()
+                ids = layer.selectedFeatureIds()
+                request.setFilterFids(ids)
+                total = layer.selectedFeatureCount()
             else:
-                features = layer.getFeatures()
-
-            # Configurar campos de salida
-            fields = QgsFields()
-            fields.append(QgsField("id_linea", QVariant.Int))
-            fields.append(QgsField("segmento", QVariant.Int))
-            fields.append(QgsField("x_ini", QVariant.Double))
-            fields.append(QgsField("y_ini", QVariant.Double))
-            fields.append(QgsField("x_fin", QVariant.Double))
-            fields.append(QgsField("y_fin", QVariant.Double))
-            
-            if self.distancia_cb.isChecked():
-                fields.append(QgsField("longitud", QVariant.Double))
-            
-            if self.dist_acum_cb.isChecked():
-                fields.append(QgsField("long_acum", QVariant.Double))
-            
-            if self.azimut_cb.isChecked():
-                fields.append(QgsField("azimut_txt", QVariant.String))
-                fields.append(QgsField("azimut_num", QVariant.Double))
-            
-            if self.rumbo_cb.isChecked():
-                fields.append(QgsField("rumbo_txt", QVariant.String))
-                fields.append(QgsField("rumbo_num", QVariant.Double))
-
-            # Lista para capas de salida
-            output_layers = []
-            reporte_lines = []
-            reporte_lines.append("REPORTE DE CÁLCULOS DE LÍNEAS")
-            reporte_lines.append(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            reporte_lines.append(f"Capa de origen: {layer.name()}")
-            reporte_lines.append("")
-
-            # Crear capas según selección
-            if self.temp_rb.isChecked():
-                temp_layer = QgsVectorLayer(
-                    f"Point?crs={crs.authid()}",
-                    "calculos_lineas",
-                    "memory"
-                )
-                temp_layer.dataProvider().addAttributes(fields)
-                temp_layer.updateFields()
-                output_layers.append(temp_layer)
-
-            if self.file_rb.isChecked():
-                output_path = self.file_widget.filePath()
-                if not output_path:
-                    QMessageBox.warning(self, "Error", "Seleccione un archivo de salida")
-                    return
-                
-                file_layer = QgsVectorLayer(
-                    f"Point?crs={crs.authid()}",
-                    "calculos_lineas",
-                    "memory"
-                )
-                file_layer.dataProvider().addAttributes(fields)
-                file_layer.updateFields()
-                output_layers.append(file_layer)
-
-            # Procesar cada línea (siempre para todos los segmentos)
-            total = layer.selectedFeatureCount() if self.selected_only.isChecked() else layer.featureCount()
-            processed = 0
-            
-            for feature in features:
-                geom = feature.geometry()
-                if geom.isEmpty():
-                    processed += 1
-                    continue
-                    
-                vertices = geom.asPolyline()
-                if len(vertices) < 2:
-                    processed += 1
-                    continue
-                
-                reporte_lines.append(f"Línea ID: {feature.id()}")
-                reporte_lines.append(f"Número de segmentos: {len(vertices)-1}")
-                
-                # Calcular para cada segmento
-                distancia_acumulada = 0.0
-                for i in range(len(vertices)-1):
-                    punto_inicio = QgsPointXY(vertices[i])
-                    punto_fin = QgsPointXY(vertices[i+1])
-                    
-                    # Calcular longitud del segmento
-                    longitud = self.distance_area.measureLine(punto_inicio, punto_fin)
-                    distancia_acumulada += longitud
-                    
-                    # Punto medio para la geometría
-                    punto_medio = QgsPointXY(
-                        (punto_inicio.x() + punto_fin.x()) / 2,
-                        (punto_inicio.y() + punto_fin.y()) / 2
-                    )
-                    
-                    # Calcular azimut
-                    azimut_rad = self.calcular_azimut(punto_inicio, punto_fin) if self.azimut_cb.isChecked() else 0
-                    
-                    # Crear feature para cada capa de salida
-                    for output_layer in output_layers:
-                        feat = QgsFeature(fields)
-                        feat.setGeometry(QgsGeometry.fromPointXY(punto_medio))
-                        
-                        # Atributos comunes
-                        atributos = [
-                            feature.id(),
-                            i + 1,
-                            punto_inicio.x(),
-                            punto_inicio.y(),
-                            punto_fin.x(),
-                            punto_fin.y()
-                        ]
-                        
-                        # Agregar atributos según selección
-                        if self.distancia_cb.isChecked():
-                            atributos.append(longitud)
-                        
-                        if self.dist_acum_cb.isChecked():
-                            atributos.append(distancia_acumulada)
-                        
-                        if self.azimut_cb.isChecked():
-                            azimut_txt = self.formatear_angulo(azimut_rad)
-                            atributos.extend([azimut_txt, math.degrees(azimut_rad)])
-                        
-                        if self.rumbo_cb.isChecked():
-                            rumbo_txt = self.formatear_angulo(azimut_rad, es_rumbo=True)
-                            atributos.extend([rumbo_txt, math.degrees(azimut_rad)])
-                        
-                        feat.setAttributes(atributos)
-                        output_layer.dataProvider().addFeature(feat)
-                    
-                    # Agregar al reporte
-                    reporte_lines.append(f"\nSegmento {i+1}:")
-                    reporte_lines.append(f"  Punto inicio: ({punto_inicio.x():.4f}, {punto_inicio.y():.4f})")
-                    reporte_lines.append(f"  Punto fin: ({punto_fin.x():.4f}, {punto_fin.y():.4f})")
-                    if self.distancia_cb.isChecked():
-                        reporte_lines.append(f"  Longitud: {longitud:.4f} m")
-                    if self.dist_acum_cb.isChecked():
-                        reporte_lines.append(f"  Longitud acumulada: {distancia_acumulada:.4f} m")
-                    if self.azimut_cb.isChecked():
-                        reporte_lines.append(f"  Azimut: {self.formatear_angulo(azimut_rad)}")
-                    if self.rumbo_cb.isChecked():
-                        reporte_lines.append(f"  Rumbo: {self.formatear_angulo(azimut_rad, es_rumbo=True)}")
-                
-                reporte_lines.append("\n" + "="*50 + "\n")
-                processed += 1
-                self.log_label.setText(f"Procesando... {processed}/{total} líneas")
-                QApplication.processEvents()
+                total = layer.featureCount()
+            fuente = QgsVectorLayerFeatureSource(layer)
+            # Las capas grandes se reparten entre varios procesos que leen la fuente por su cuenta
+            procesos = preparar_procesos(layer, motor, opciones['procesos'], ids)
+
+            tarea = TareaCalculo(
+                f"Cálculos de líneas: {layer.name()}",
+                partial(self.procesar_lineas, fuente=fuente, request=request, motor=motor,
+                        formateador=formateador, crs=crs, nombre_capa=layer.name(),
+                        opciones=opciones, procesos=procesos, id_capa=layer.id()),
+                self.calculo_terminado,
+                total
+            )
+            tarea.progressChanged.connect(lambda _: self.log_label.setText(f"Procesando... {tarea.estado}"))
+            self.tareas.append(tarea)
+
+            self.log_label.setText("Iniciando cálculo..." if procesos is None else
+                                   f"Iniciando cálculo en {min(procesos[2], len(procesos[1]))} procesos...")
+            self.button_box.button(QDialogButtonBox.Ok).setEnabled(False)
+            self.cancelar_button.setEnabled(True)
+            self.tabs.setCurrentIndex(1)
+            QgsApplication.taskManager().addTask(tarea)
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(e)}")
+            self.log_label.setText(f"Error: {str(e)}")
+
+    def iniciar_en_vivo(self, resultado):
+        """Empieza a recalcular las entidades que se editen en la capa de origen"""
+        capa = QgsProject.instance().mapLayer(resultado['id_capa'])
+        if capa is None:
+            return
+        opciones = self.opciones
+        resultados = ResultadosIncrementales(resultado['tabla'], 'id_linea', resultado['huellas'])
+        self.en_vivo = CalculoEnVivo(
+            capa, resultados,
+            partial(medir_lineas, motor=resultado['motor'], formateador=resultado['formateador'],
+                    opciones=opciones, cronometro=Cronometro()),
+            partial(completar_lineas, opciones=opciones, nombre_capa=resultado['nombre_capa']),
+            resultado['capa_temporal'], campos_tabla(resultado['tabla']), *columnas_punto(opciones),
+            solo_conocidas=resultado['solo_seleccion'], parent=self)
+        self.en_vivo.actualizado.connect(self.en_vivo_actualizado)
+
+    def en_vivo_actualizado(self, recalculadas, tabla, reporte):
+        """Muestra el resultado recompuesto tras una edición de la capa de origen"""
+        if self.opciones['reporte']:
+            self.reporte_visor.establecer_almacen(reporte)
+        self.log_label.setText(f"Modo en vivo: {recalculadas} entidades recalculadas ({len(tabla)} filas)")
+
+    def detener_en_vivo(self):
+        """Deja de seguir las ediciones de la capa de origen"""
+        if self.en_vivo is not None:
+            self.en_vivo.detener()
+            self.en_vivo.deleteLater()
+            self.en_vivo = None
+
+    def cancelar_calculo(self):
+        """Solicita la cancelación de los cálculos en curso"""
+        for tarea in self.tareas:
+            tarea.cancel()
+
+    def procesar_lineas(self, tarea, fuente, request, motor, formateador, crs, nombre_capa, opciones,
+                        procesos=None, id_capa=None):
+        """Núcleo del cálculo sobre líneas (se ejecuta en el hilo de la tarea)"""
+        tabla = tabla_lineas(opciones)
+        fields = campos_tabla(tabla)
+        cronometro = Cronometro()
+        resultado = {'capa_temporal': None, 'archivo': None, 'tabla': tabla,
+                     'reporte': None, 'errores': [], 'cronometro': cronometro, 'nombre_capa': nombre_capa,
+                     'id_capa': id_capa, 'motor': motor, 'formateador': formateador, 'huellas': None,
+                     'solo_seleccion': request.filterType() == QgsFeatureRequest.FilterFids}
+
+        # Lista para capas de salida
+        output_layers = []
+
+        # Crear capas según selección
+        if opciones['temporal']:
+            temp_layer = QgsVectorLayer(
+                f"Point?crs={crs.authid()}",
+                "cadenamiento_lineas" if opciones['cadenamiento'] else "calculos_lineas",
+                "memory"
+            )
+            temp_layer.dataProvider().addAttributes(fields)
+            temp_layer.updateFields()
+            output_layers.append(temp_layer)
+            resultado['capa_temporal'] = temp_layer
+
+        # El archivo se escribe directamente por lotes, sin capa intermedia en memoria
+        file_layer = None
+        if opciones['archivo']:
+            file_layer = crear_capa_archivo(opciones['archivo'], fields, QgsWkbTypes.Point, crs)
+            output_layers.append(file_layer)
+
+        # Un único sumidero escribe cada fila de la tabla en todas las capas de salida
+        sumidero = SumideroEntidades(output_layers, opciones['lote'])
+
+        x, y = columnas_punto(opciones)
+
+        def al_agregar(inicio, n):
+            if output_layers:
+                sumidero.agregar_varias(entidades_tabla(tabla, fields, inicio, inicio + n, x=x, y=y))
+
+        if procesos is not None:
+            origen, bloques, trabajadores = procesos
+            reporte = calcular_lineas_procesos(origen, bloques, trabajadores, tabla, formateador, opciones,
+                                               nombre_capa, al_agregar, tarea.isCanceled, tarea.informar,
+                                               cronometro)
+        else:
+            entidades = fuente.getFeatures(request)
+            if opciones['en_vivo']:
+                # Huellas de las geometrías para reconocer después las entidades que no cambian
+                resultado['huellas'] = {}
+                entidades = con_huellas(entidades, resultado['huellas'])
+            reporte = calcular_lineas(entidades, tabla, motor, formateador, opciones,
+                                      nombre_capa, al_agregar, tarea.isCanceled, tarea.informar, cronometro)
+        if reporte is None:
+            return None
+        resultado['reporte'] = reporte
+
+        # Escribir el último lote y crear los índices espaciales
+        with cronometro.fase(ESCRITURA):
+            sumidero.cerrar()
 
+        if file_layer is not None:
+            resultado['archivo'] = opciones['archivo']
+            # Liberar el proveedor OGR para que el archivo quede cerrado
+            output_layers.remove(file_layer)
+            file_layer = None
+
+        # Guardar reporte en archivo
+        if opciones['reporte_archivo']:
+            try:
+                with cronometro.fase(EXPORTACION):
+                    reporte.escribir(opciones['reporte_archivo'])
+            except Exception as e:
+                resultado['errores'].append(f"No se pudo guardar el reporte:\n{str(e)}")
+                resultado['reporte_archivo_error'] = True
+
+        # Las capas se crearon en este hilo: se entregan al hilo principal
+        for capa in output_layers:
+            capa.moveToThread(QCoreApplication.instance().thread())
+        cronometro.detener()
+        return resultado
+
+    def calculo_terminado(self, ok, tarea):
+        """Registra los resultados de una tarea en el proyecto (hilo principal)"""
+        if tarea in self.tareas:
+            self.tareas.remove(tarea)
+        self.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        self.cancelar_button.setEnabled(bool(self.tareas))
+
+        if tarea.excepcion is not None:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(tarea.excepcion)}")
+            self.log_label.setText(f"Error: {str(tarea.excepcion)}")
+            return
+        if not ok or tarea.resultado is None:
+            self.log_label.setText("Cálculo cancelado")
+            self.iface.messageBar().pushMessage("Cálculos de líneas", "Cálculo cancelado", level=Qgis.Warning)
+            return
+
+        resultado = tarea.resultado
+        opciones = self.opciones
+        self.cronometro = resultado['cronometro']
+        try:
             # Actualizar reporte en la interfaz
-            if self.reporte_cb.isChecked():
-                self.reporte_text.setPlainText("\n".join(reporte_lines))
-
-            # Guardar y cargar capas
-            for layer in output_layers:
-                if self.file_rb.isChecked() and layer == file_layer:
-                    options = QgsVectorFileWriter.SaveVectorOptions()
-                    options.driverName = "ESRI Shapefile" if self.file_widget.filePath().endswith('.shp') else "GPKG"
-                    transform_context = QgsCoordinateTransformContext()
-                    
-                    QgsVectorFileWriter.writeAsVectorFormatV2(
-                        layer,
-                        self.file_widget.filePath(),
-                        transform_context,
-                        options
-                    )
-                    result_layer = QgsVectorLayer(self.file_widget.filePath(), os.path.basename(self.file_widget.filePath()), "ogr")
-                    QgsProject.instance().addMapLayer(result_layer)
-                elif self.temp_rb.isChecked() and layer == temp_layer:
-                    QgsProject.instance().addMapLayer(layer)
-
-            # Guardar reporte en archivo
-            if self.reporte_file_rb.isChecked() and self.reporte_file_widget.filePath():
-                try:
-                    with open(self.reporte_file_widget.filePath(), 'w', encoding='utf-8') as f:
-                        f.write("\n".join(reporte_lines))
-                    QMessageBox.information(self, "Éxito", f"Reporte guardado en:\n{self.reporte_file_widget.filePath()}")
-                except Exception as e:
-                    QMessageBox.warning(self, "Error", f"No se pudo guardar el reporte:\n{str(e)}")
-
-            # Exportaciones adicionales
-            if self.export_csv_rb.isChecked() and self.csv_file_widget.filePath():
-                self.exportar_a_csv(self.csv_file_widget.filePath(), output_layers[0])
+            if opciones['reporte']:
+                self.reporte_visor.establecer_almacen(resultado['reporte'])
+
+            # Cargar capas
+            if resultado['capa_temporal'] is not None:
+                QgsProject.instance().addMapLayer(resultado['capa_temporal'])
+            if resultado['archivo']:
+                result_layer = QgsVectorLayer(resultado['archivo'], os.path.basename(resultado['archivo']), "ogr")
+                QgsProject.instance().addMapLayer(result_layer)
+
+            if opciones['en_vivo']:
+                self.iniciar_en_vivo(resultado)
+
+            for error in resultado['errores']:
+                QMessageBox.warning(self, "Error", error)
+            if opciones['reporte_archivo'] and not resultado.get('reporte_archivo_error'):
+                QMessageBox.information(self, "Éxito", f"Reporte guardado en:\n{opciones['reporte_archivo']}")
+
+            # Exportaciones adicionales (leen directamente la tabla de resultados)
+            if opciones['csv']:
+                self.exportar_a_csv(opciones['csv'], resultado['tabla'])
             
-            if self.export_excel_rb.isChecked() and self.excel_file_widget.filePath():
-                self.exportar_a_excel(self.excel_file_widget.filePath(), output_layers[0])
+            if opciones['excel']:
+                self.exportar_a_excel(opciones['excel'], resultado['tabla'])
             
-            if self.export_pdf_rb.isChecked() and self.pdf_file_widget.filePath():
-                self.exportar_a_pdf(self.pdf_file_widget.filePath())
+            if opciones['pdf']:
+                self.exportar_a_pdf(opciones['pdf'])
+
+            # Tiempos y memoria de cada fase
+            error = registrar_metricas("Cálculos de líneas", self.cronometro, opciones['telemetria'],
+                                       capa=resultado['nombre_capa'], filas=len(resultado['tabla']))
+            if error:
+                QMessageBox.warning(self, "Error", error)
+            self.metricas_panel.mostrar(self.cronometro)
 
             self.log_label.setText("Proceso completado con éxito")
             self.tabs.setCurrentIndex(1)  # Mostrar pestaña de registro/reporte
-            self.accept()
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(e)}")
             self.log_label.setText(f"Error: {str(e)}")
-        finally:
-            self.button_box.setEnabled(True)
-            QApplication.processEvents()
 
-    def exportar_a_csv(self, file_path, layer):
+    def exportar_a_csv(self, file_path, tabla):
         """Exporta los resultados a CSV"""
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Escribir encabezados
-                headers = [field.name() for field in layer.fields()]
-                writer.writerow(headers)
-                
-                # Escribir datos con manejo de valores NULL
-                for feature in layer.getFeatures():
-                    row = []
-                    for field in headers:
-                        value = feature[field]
-                        # Convertir NULL/None a cadena vacía
-                        if value is None or str(value).upper() == 'NULL':
-                            row.append('')
-                        else:
-                            row.append(value)
-                    writer.writerow(row)
-                
+            # Los valores nulos se escriben como celdas vacías
+            with self.cronometro.fase(EXPORTACION):
+                escribir_csv(tabla, file_path)
             QMessageBox.information(self, "Éxito", f"Datos exportados a CSV:\n{file_path}")
             return True
         except Exception as e:
             QMessageBox.warning(self, "Error", f"No se pudo exportar a CSV:\n{str(e)}")
             return False
 
-    def exportar_a_excel(self, file_path, layer):
+    def exportar_a_excel(self, file_path, tabla):
         """Exporta los resultados a Excel"""
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Cálculos de Líneas"
-            
-            # Escribir encabezados
-            headers = [field.name() for field in layer.fields()]
-            ws.append(headers)
-            
-            # Escribir datos con manejo de valores NULL
-            for feature in layer.getFeatures():
-                row = []
-                for field in headers:
-                    value = feature[field]
-                    # Convertir NULL/None a cadena vacía
-                    if value is None or str(value).upper() == 'NULL':
-                        row.append('')
-                    else:
-                        row.append(value)
-                ws.append(row)
-            
-            wb.save(file_path)
-            QMessageBox.information(self, "Éxito", f"Datos exportados a Excel:\n{file_path}")
+            # Escritura en flujo: se abre una hoja nueva al llegar al límite de filas de Excel
+            with self.cronometro.fase(EXPORTACION):
+                n_hojas = escribir_xlsx(tabla, file_path, "Cálculos de Líneas")
+            mensaje = f"Datos exportados a Excel:\n{file_path}"
+            if n_hojas > 1:
+                mensaje += f"\n({n_hojas} hojas de datos)"
+            QMessageBox.information(self, "Éxito", mensaje)
             return True
         except Exception as e:
             QMessageBox.warning(self, "Error", f"No se pudo exportar a Excel:\n{str(e)}")
@@ -536,7 +592,8 @@ class CalculosLineasDialog(QDialog):
             printer.setPageMargins(15, 15, 15, 15, QPrinter.Millimeter)
             
             # Imprimir
-            self.reporte_text.document().print_(printer)
+            with self.cronometro.fase(EXPORTACION):
+                imprimir_reporte(self.reporte_visor.almacen, printer)
             
             QMessageBox.information(self, "Éxito", f"Reporte exportado a PDF:\n{file_path}")
             return True
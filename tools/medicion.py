@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsCoordinateReferenceSystem, QgsCoordinateTransform, QgsGeometry, QgsProject,
+                       QgsProviderRegistry, QgsWkbTypes)
+
+from .geometria import partes_geometria
+from ..core.geodesia import Elipsoide
+from ..core.medicion import MotorWkb
+from ..core.paralelo import (OrigenOgr, MINIMO_BLOQUE, dividir_ids, procesos_disponibles,
+                             trabajadores_automaticos)
+
+
+class MotorMedicion(MotorWkb):
+    """
+    Mide distancias, azimuts, áreas y perímetros sobre arreglos completos.
+
+    Cada geometría se transforma una sola vez al sistema geográfico del
+    elipsoide de ``QgsDistanceArea`` y se mide en bloque. Si la capa está
+    proyectada y se piden distancias de cuadrícula, se mide en el plano sin
+    ninguna transformación.
+    """
+    def __init__(self, crs, distance_area, planas=False):
+        """
+        :param crs: Sistema de referencia de la capa de origen.
+        :param distance_area: QgsDistanceArea con el elipsoide configurado.
+        :param planas: True para usar distancias de cuadrícula en capas proyectadas.
+        """
+        planas = bool(planas) and not crs.isGeographic()
+        super().__init__(planas, None if planas else Elipsoide(distance_area.ellipsoidSemiMajor(),
+                                                               distance_area.ellipsoidSemiMinor()))
+        self.transformacion = None
+        if not self.planas:
+            self.transformacion = QgsCoordinateTransform(
+                crs, distance_area.ellipsoidCrs(), QgsProject.instance().transformContext())
+
+    def partes(self, geom):
+        return partes_geometria(geom)
+
+    def partes_medicion(self, geom):
+        """Partes de la geometría en el sistema en que se mide (plano o geográfico)"""
+        if not self.planas:
+            geom = QgsGeometry(geom)
+            geom.transform(self.transformacion)
+        return partes_geometria(geom)[1]
+
+
+def origen_ogr(layer, motor):
+    """
+    Describe la capa para que los procesos de trabajo la lean con OGR.
+    :return: OrigenOgr, o None si la capa debe calcularse en un único proceso
+        (no es OGR, tiene curvas o ediciones sin guardar, su filtro es una
+        consulta SQL o el proyecto define una transformación propia).
+    """
+    if layer.providerType() != 'ogr' or QgsWkbTypes.isCurvedType(layer.wkbType()):
+        return None
+    if layer.isEditable() and layer.isModified():
+        return None
+    filtro = layer.subsetString()
+    if filtro.lstrip().upper().startswith('SELECT'):
+        return None
+
+    crs_capa = crs_medicion = None
+    if not motor.planas and not motor.transformacion.isShortCircuited():
+        origen, destino = motor.transformacion.sourceCrs(), motor.transformacion.destinationCrs()
+        # Sin operación propia, OGR y QGIS eligen la misma transformación de PROJ
+        if QgsProject.instance().transformContext().hasTransform(origen, destino):
+            return None
+        crs_capa = origen.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED)
+        crs_medicion = destino.toWkt(QgsCoordinateReferenceSystem.WKT_PREFERRED)
+
+    partes = QgsProviderRegistry.instance().decodeUri('ogr', layer.source())
+    capa = partes.get('layerName') or partes.get('layerId') or 0
+    return OrigenOgr(partes['path'], capa, filtro, crs_capa, crs_medicion, motor.planas, motor.elipsoide)
+
+
+def preparar_procesos(layer, motor, trabajadores, ids=None):
+    """
+    Decide si el cálculo se reparte en varios procesos.
+    :param trabajadores: Procesos pedidos (0 = automático).
+    :param ids: Ids de las entidades a calcular (por defecto, toda la capa).
+    :return: (origen, bloques, trabajadores), o None para calcular en un único proceso.
+    """
+    trabajadores = trabajadores or trabajadores_automaticos()
+    total = layer.featureCount() if ids is None else len(ids)
+    if trabajadores < 2 or total < 2 * MINIMO_BLOQUE or not procesos_disponibles():
+        return None
+    origen = origen_ogr(layer, motor)
+    if origen is None:
+        return None
+    bloques = dividir_ids(layer.allFeatureIds() if ids is None else ids, trabajadores)
+    if len(bloques) < 2:
+        return None
+    return origen, bloques, trabajadores
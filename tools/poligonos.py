@@ -1,19 +1,31 @@
 from qgis.PyQt.QtWidgets import (QDialog, QVBoxLayout, QLabel, QComboBox, 
-                                QSpinBox, QDialogButtonBox, QHBoxLayout,
+                                QSpinBox, QDoubleSpinBox, QDialogButtonBox, QHBoxLayout,
                                 QCheckBox, QMessageBox, QGroupBox, 
-                                QTabWidget, QWidget, QApplication, QTextEdit)
-from qgis.PyQt.QtCore import Qt, QVariant
+                                QTabWidget, QWidget, QPushButton)
+from qgis.PyQt.QtCore import Qt, QCoreApplication
 from qgis.gui import QgsMapLayerComboBox, QgsFileWidget
 from qgis.core import (QgsProject, QgsVectorLayer, QgsMapLayerProxyModel,
-                      QgsWkbTypes, QgsFields, QgsField, QgsFeature,
-                      QgsGeometry, QgsPointXY, QgsCoordinateTransformContext,
-                      QgsVectorFileWriter, QgsDistanceArea)
-import math
+                      QgsWkbTypes, QgsCoordinateTransformContext,
+                      QgsDistanceArea, QgsApplication,
+                      QgsFeatureRequest, QgsVectorLayerFeatureSource, Qgis)
 import os
-import csv
-from datetime import datetime
+from functools import partial
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
-from openpyxl import Workbook
+from .calculo_poligonos import (tabla_poligonos, calcular_poligonos, calcular_poligonos_procesos,
+                                medir_poligonos, completar_poligonos, resumen_poligonos, columnas_punto)
+from .salida import SumideroEntidades, crear_capa_archivo, campos_tabla, entidades_tabla
+from .medicion import MotorMedicion, preparar_procesos
+from .calculo_en_vivo import CalculoEnVivo
+from .tareas import TareaCalculo
+from .visor_metricas import PanelMetricas, registrar_metricas
+from .visor_reporte import VisorReporte, imprimir_reporte
+from ..core.angulos import FormateadorAngulos
+from ..core.cronometro import Cronometro, ESCRITURA, EXPORTACION
+from ..core.excel import escribir_xlsx
+from ..core.incremental import ResultadosIncrementales, con_huellas
+from ..core.linderos import tolerancia_ajuste
+from ..core.poligonos import UNIDADES_AREA
+from ..core.tabla import escribir_csv
 
 class CalculosPoligonosDialog(QDialog):
     def __init__(self, iface):
@@ -26,6 +38,10 @@ class CalculosPoligonosDialog(QDialog):
         self.distance_area.setEllipsoid('WGS84')
         self.report_data = []
         self.output_layer = None
+        self.opciones = self.leer_opciones()
+        self.tareas = []
+        self.cronometro = Cronometro()
+        self.en_vivo = None
 
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -87,6 +103,37 @@ class CalculosPoligonosDialog(QDialog):
         config_layout.addWidget(self.perimetro_cb)
         config_layout.addWidget(self.reporte_cb)
         
+        # Modo en vivo: mantener el resultado al día mientras se edita la capa
+        self.en_vivo_cb = QCheckBox("Modo en vivo: recalcular al editar la capa")
+        self.en_vivo_cb.setToolTip("Tras el cálculo, las entidades que se modifiquen, añadan o eliminen "
+                                   "se recalculan y se actualizan en la capa temporal y el reporte.")
+        self.en_vivo_cb.toggled.connect(lambda activo: activo or self.detener_en_vivo())
+        config_layout.addWidget(self.en_vivo_cb)
+        
+        # Linderos: cada lado compartido por dos polígonos se mide y escribe una sola vez
+        self.linderos_cb = QCheckBox("Modo linderos: un registro por lado con los polígonos a cada lado")
+        self.linderos_cb.setToolTip("Los lados compartidos por polígonos contiguos se miden una sola vez. "
+                                    "La salida tiene un punto por lindero con los ids de los polígonos "
+                                    "a su izquierda y a su derecha.")
+        config_layout.addWidget(self.linderos_cb)
+        
+        tolerancia_layout = QHBoxLayout()
+        tolerancia_layout.addWidget(QLabel("Tolerancia de ajuste de vértices:"))
+        self.tolerancia_spin = QDoubleSpinBox()
+        self.tolerancia_spin.setDecimals(9)
+        self.tolerancia_spin.setRange(0, 1000)
+        self.tolerancia_spin.setSingleStep(0.001)
+        self.tolerancia_spin.setSpecialValueText("Automática")
+        self.tolerancia_spin.setValue(0)
+        self.tolerancia_spin.setToolTip("En unidades de la capa. Automática: 1 mm en capas proyectadas, "
+                                        "1e-8 grados en capas geográficas.")
+        self.tolerancia_spin.setEnabled(False)
+        tolerancia_layout.addWidget(self.tolerancia_spin)
+        config_layout.addLayout(tolerancia_layout)
+        self.linderos_cb.toggled.connect(self.tolerancia_spin.setEnabled)
+        # Los linderos se calculan sobre toda la capa a la vez: sin modo en vivo
+        self.linderos_cb.toggled.connect(lambda activo: self.en_vivo_cb.setEnabled(not activo))
+        
         # Formato de ángulo
         config_layout.addWidget(QLabel("Formato de salida:"))
         self.format_combo = QComboBox()
@@ -96,9 +143,15 @@ class CalculosPoligonosDialog(QDialog):
         # Unidades de área
         config_layout.addWidget(QLabel("Unidades de área:"))
         self.area_unit_combo = QComboBox()
-        self.area_unit_combo.addItems(["Metros cuadrados", "Hectáreas", "Kilómetros cuadrados"])
+        self.area_unit_combo.addItems(UNIDADES_AREA)
         config_layout.addWidget(self.area_unit_combo)
         
+        # Tipo de distancia
+        config_layout.addWidget(QLabel("Tipo de distancia:"))
+        self.distancia_tipo_combo = QComboBox()
+        self.distancia_tipo_combo.addItems(["Elipsoidal", "De cuadrícula (plana)"])
+        config_layout.addWidget(self.distancia_tipo_combo)
+        
         # Precisión decimal
         config_layout.addWidget(QLabel("Precisión decimal:"))
         self.decimal_spin = QSpinBox()
@@ -106,6 +159,24 @@ class CalculosPoligonosDialog(QDialog):
         self.decimal_spin.setValue(4)
         config_layout.addWidget(self.decimal_spin)
         
+        # Tamaño de lote para la escritura de entidades
+        config_layout.addWidget(QLabel("Tamaño de lote de escritura:"))
+        self.lote_spin = QSpinBox()
+        self.lote_spin.setRange(100, 1000000)
+        self.lote_spin.setSingleStep(1000)
+        self.lote_spin.setValue(10000)
+        config_layout.addWidget(self.lote_spin)
+        
+        # Procesos de trabajo para capas grandes (0 = según los núcleos del equipo)
+        config_layout.addWidget(QLabel("Procesos de trabajo:"))
+        self.procesos_spin = QSpinBox()
+        self.procesos_spin.setRange(0, os.cpu_count() or 1)
+        self.procesos_spin.setSpecialValueText("Automático")
+        self.procesos_spin.setValue(0)
+        self.procesos_spin.setToolTip("Las capas OGR con muchas entidades se reparten en bloques "
+                                      "que se calculan en procesos independientes. 1 = un solo proceso.")
+        config_layout.addWidget(self.procesos_spin)
+        
         config_group.setLayout(config_layout)
         self.param_layout.addWidget(config_group)
 
@@ -154,6 +225,10 @@ class CalculosPoligonosDialog(QDialog):
         self.excel_file_widget.setStorageMode(QgsFileWidget.SaveFile)
         output_layout.addWidget(self.excel_file_widget)
         
+        self.excel_resumen_cb = QCheckBox("Incluir hoja de resumen por polígono")
+        self.excel_resumen_cb.setEnabled(False)
+        output_layout.addWidget(self.excel_resumen_cb)
+        
         self.export_pdf_rb = QCheckBox("Exportar a PDF:")
         output_layout.addWidget(self.export_pdf_rb)
         
@@ -163,12 +238,23 @@ class CalculosPoligonosDialog(QDialog):
         self.pdf_file_widget.setStorageMode(QgsFileWidget.SaveFile)
         output_layout.addWidget(self.pdf_file_widget)
         
+        self.telemetria_rb = QCheckBox("Guardar telemetría (JSONL):")
+        output_layout.addWidget(self.telemetria_rb)
+        
+        self.telemetria_file_widget = QgsFileWidget()
+        self.telemetria_file_widget.setFilter("JSON Lines (*.jsonl);;Todos los archivos (*)")
+        self.telemetria_file_widget.setEnabled(False)
+        self.telemetria_file_widget.setStorageMode(QgsFileWidget.SaveFile)
+        output_layout.addWidget(self.telemetria_file_widget)
+        
         # Conectar señales
         self.file_rb.toggled.connect(self.file_widget.setEnabled)
         self.reporte_file_rb.toggled.connect(self.reporte_file_widget.setEnabled)
         self.export_csv_rb.toggled.connect(self.csv_file_widget.setEnabled)
         self.export_excel_rb.toggled.connect(self.excel_file_widget.setEnabled)
+        self.export_excel_rb.toggled.connect(self.excel_resumen_cb.setEnabled)
         self.export_pdf_rb.toggled.connect(self.pdf_file_widget.setEnabled)
+        self.telemetria_rb.toggled.connect(self.telemetria_file_widget.setEnabled)
         
         output_group.setLayout(output_layout)
         self.param_layout.addWidget(output_group)
@@ -183,10 +269,19 @@ class CalculosPoligonosDialog(QDialog):
         self.log_label.setWordWrap(True)
         self.log_layout.addWidget(self.log_label)
         
+        # Botón para detener el cálculo en segundo plano
+        self.cancelar_button = QPushButton("Cancelar cálculo")
+        self.cancelar_button.setEnabled(False)
+        self.cancelar_button.clicked.connect(self.cancelar_calculo)
+        self.log_layout.addWidget(self.cancelar_button)
+        
+        # Tiempos y memoria por fase de la última ejecución
+        self.metricas_panel = PanelMetricas()
+        self.log_layout.addWidget(self.metricas_panel)
+        
         # Añadir área para el reporte resumen
-        self.reporte_text = QTextEdit()
-        self.reporte_text.setReadOnly(True)
-        self.log_layout.addWidget(self.reporte_text)
+        self.reporte_visor = VisorReporte()
+        self.log_layout.addWidget(self.reporte_visor)
         
         self.log_tab.setLayout(self.log_layout)
         self.tabs.addTab(self.log_tab, "Registro y Reporte")
@@ -207,26 +302,40 @@ class CalculosPoligonosDialog(QDialog):
         layer = self.layer_combo.currentLayer()
         self.selected_only.setEnabled(layer and layer.selectedFeatureCount() > 0)
 
-    def calcular_distancia(self, p1, p2):
-        """Calcula la distancia entre dos puntos"""
-        return math.sqrt((p2.x() - p1.x())**2 + (p2.y() - p1.y())**2)
-
-    def calcular_perimetro(self, geometry):
-        """Calcula el perímetro de una geometría de polígono"""
-        perimetro = 0.0
-        if geometry.isMultipart():
-            for part in geometry.asMultiPolygon():
-                for ring in part:
-                    for i in range(len(ring)-1):
-                        perimetro += self.calcular_distancia(QgsPointXY(ring[i]), QgsPointXY(ring[i+1]))
-        else:
-            ring = geometry.asPolygon()[0]
-            for i in range(len(ring)-1):
-                perimetro += self.calcular_distancia(QgsPointXY(ring[i]), QgsPointXY(ring[i+1]))
-        return perimetro
+    def leer_opciones(self):
+        """Captura la configuración del diálogo para usarla fuera del hilo principal"""
+        return {
+            'internos': self.internal_cb.isChecked(),
+            'externos': self.external_cb.isChecked(),
+            'azimut': self.azimut_cb.isChecked(),
+            'rumbo': self.rumbo_cb.isChecked(),
+            'distancia': self.distancia_cb.isChecked(),
+            'dist_acum': self.dist_acum_cb.isChecked(),
+            'area': self.area_cb.isChecked(),
+            'perimetro': self.perimetro_cb.isChecked(),
+            'linderos': self.linderos_cb.isChecked(),
+            'tolerancia': self.tolerancia_spin.value(),
+            'reporte': self.reporte_cb.isChecked(),
+            'formato': self.format_combo.currentIndex(),
+            'unidad_area': self.area_unit_combo.currentIndex(),
+            'unidad_area_txt': self.area_unit_combo.currentText(),
+            'decimales': self.decimal_spin.value(),
+            'planas': self.distancia_tipo_combo.currentIndex() == 1,
+            'lote': self.lote_spin.value(),
+            'procesos': self.procesos_spin.value(),
+            'en_vivo': self.en_vivo_cb.isChecked() and not self.linderos_cb.isChecked(),
+            'temporal': self.temp_rb.isChecked(),
+            'archivo': self.file_widget.filePath() if self.file_rb.isChecked() else None,
+            'reporte_archivo': self.reporte_file_widget.filePath() if self.reporte_file_rb.isChecked() else None,
+            'csv': self.csv_file_widget.filePath() if self.export_csv_rb.isChecked() else None,
+            'excel': self.excel_file_widget.filePath() if self.export_excel_rb.isChecked() else None,
+            'excel_resumen': self.excel_resumen_cb.isChecked(),
+            'pdf': self.pdf_file_widget.filePath() if self.export_pdf_rb.isChecked() else None,
+            'telemetria': self.telemetria_file_widget.filePath() if self.telemetria_rb.isChecked() else None,
+        }
 
     def calcular_y_guardar(self):
-        """Método principal para cálculo y guardado"""
+        """Método principal: valida la configuración y lanza el cálculo en segundo plano"""
         try:
             # Validación de opciones seleccionadas
             if not (self.internal_cb.isChecked() or self.external_cb.isChecked() or 
@@ -236,217 +345,232 @@ class CalculosPoligonosDialog(QDialog):
                 QMessageBox.warning(self, "Error", "Seleccione al menos un tipo de cálculo")
                 return
 
-            self.log_label.setText("Iniciando cálculo...")
-            self.button_box.setEnabled(False)
-            QApplication.processEvents()
-            
             layer = self.layer_combo.currentLayer()
             if not layer:
                 QMessageBox.warning(self, "Error", "Seleccione una capa de polígonos")
                 return
 
+            # Un nuevo cálculo completo reemplaza al resultado en vivo anterior
+            self.detener_en_vivo()
+
+            opciones = self.leer_opciones()
             crs = layer.crs()
+            opciones['tolerancia'] = tolerancia_ajuste(opciones['tolerancia'], crs.isGeographic())
+            self.opciones = opciones
             self.distance_area.setSourceCrs(crs, QgsCoordinateTransformContext())
+            motor = MotorMedicion(crs, self.distance_area, opciones['planas'])
+            # El formato de ángulos se fija una sola vez para todo el cálculo
+            formateador = FormateadorAngulos(opciones['formato'], opciones['decimales'])
             
-            # Configurar campos de salida
-            fields = QgsFields()
-            fields.append(QgsField("id_pol", QVariant.Int))
-            fields.append(QgsField("vertice", QVariant.Int))
-            fields.append(QgsField("x", QVariant.Double))
-            fields.append(QgsField("y", QVariant.Double))
-            
-            if self.distancia_cb.isChecked():
-                fields.append(QgsField("distancia", QVariant.Double))
-            
-            if self.dist_acum_cb.isChecked():
-                fields.append(QgsField("dist_acum", QVariant.Double))
-            
-            if self.area_cb.isChecked():
-                fields.append(QgsField("area", QVariant.Double))
-            
-            if self.perimetro_cb.isChecked():
-                fields.append(QgsField("perimetro", QVariant.Double))
-            
-            if self.internal_cb.isChecked():
-                fields.append(QgsField("ang_int_txt", QVariant.String))
-                fields.append(QgsField("ang_int_num", QVariant.Double))
-            
-            if self.external_cb.isChecked():
-                fields.append(QgsField("ang_ext_txt", QVariant.String))
-                fields.append(QgsField("ang_ext_num", QVariant.Double))
-            
-            if self.azimut_cb.isChecked():
-                fields.append(QgsField("azimut_txt", QVariant.String))
-                fields.append(QgsField("azimut_num", QVariant.Double))
-            
-            if self.rumbo_cb.isChecked():
-                fields.append(QgsField("rumbo_txt", QVariant.String))
-                fields.append(QgsField("rumbo_num", QVariant.Double))
-
-            # Procesar cada polígono
-            features = layer.selectedFeatures() if self.selected_only.isChecked() and self.selected_only.isEnabled() else layer.getFeatures()
-            total = layer.selectedFeatureCount() if self.selected_only.isChecked() else layer.featureCount()
-            processed = 0
-            
-            # Crear capa temporal para procesamiento
+            # Fuente de entidades independiente de la capa, segura para otro hilo
+            request = QgsFeatureRequest()
+            ids = None
+            if self.selected_only.isChecked() and self.selected_only.isEnabled():
+                ids = layer.selectedFeatureIds()
+                request.setFilterFids(ids)
+                total = layer.selectedFeatureCount()
+            else:
+                total = layer.featureCount()
+            fuente = QgsVectorLayerFeatureSource(layer)
+            # Las capas grandes se reparten entre varios procesos que leen la fuente por su cuenta
+            # (los linderos necesitan todos los polígonos en un mismo proceso)
+            procesos = None if opciones['linderos'] else preparar_procesos(layer, motor, opciones['procesos'], ids)
+
+            tarea = TareaCalculo(
+                f"Cálculos de polígonos: {layer.name()}",
+                partial(self.procesar_poligonos, fuente=fuente, request=request, motor=motor,
+                        formateador=formateador, crs=crs, nombre_capa=layer.name(),
+                        opciones=opciones, procesos=procesos, id_capa=layer.id()),
+                self.calculo_terminado,
+                total
+            )
+            tarea.progressChanged.connect(lambda _: self.log_label.setText(f"Procesando... {tarea.estado}"))
+            self.tareas.append(tarea)
+
+            self.log_label.setText("Iniciando cálculo..." if procesos is None else
+                                   f"Iniciando cálculo en {min(procesos[2], len(procesos[1]))} procesos...")
+            self.button_box.button(QDialogButtonBox.Ok).setEnabled(False)
+            self.cancelar_button.setEnabled(True)
+            self.tabs.setCurrentIndex(1)
+            QgsApplication.taskManager().addTask(tarea)
+
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(e)}")
+            self.log_label.setText(f"Error: {str(e)}")
+
+    def iniciar_en_vivo(self, resultado):
+        """Empieza a recalcular las entidades que se editen en la capa de origen"""
+        capa = QgsProject.instance().mapLayer(resultado['id_capa'])
+        if capa is None:
+            return
+        opciones = self.opciones
+        resultados = ResultadosIncrementales(resultado['tabla'], 'id_pol', resultado['huellas'])
+        self.en_vivo = CalculoEnVivo(
+            capa, resultados,
+            partial(medir_poligonos, motor=resultado['motor'], formateador=resultado['formateador'],
+                    opciones=opciones, cronometro=Cronometro()),
+            partial(completar_poligonos, opciones=opciones, nombre_capa=resultado['nombre_capa']),
+            resultado['capa_temporal'], campos_tabla(resultado['tabla']),
+            solo_conocidas=resultado['solo_seleccion'], parent=self)
+        self.en_vivo.actualizado.connect(self.en_vivo_actualizado)
+
+    def en_vivo_actualizado(self, recalculadas, tabla, reporte):
+        """Muestra el resultado recompuesto tras una edición de la capa de origen"""
+        if self.opciones['reporte']:
+            self.reporte_visor.establecer_almacen(reporte)
+        self.log_label.setText(f"Modo en vivo: {recalculadas} entidades recalculadas ({len(tabla)} filas)")
+
+    def detener_en_vivo(self):
+        """Deja de seguir las ediciones de la capa de origen"""
+        if self.en_vivo is not None:
+            self.en_vivo.detener()
+            self.en_vivo.deleteLater()
+            self.en_vivo = None
+
+    def cancelar_calculo(self):
+        """Solicita la cancelación de los cálculos en curso"""
+        for tarea in self.tareas:
+            tarea.cancel()
+
+    def procesar_poligonos(self, tarea, fuente, request, motor, formateador, crs, nombre_capa, opciones,
+                           procesos=None, id_capa=None):
+        """Núcleo del cálculo sobre polígonos (se ejecuta en el hilo de la tarea)"""
+        tabla = tabla_poligonos(opciones)
+        fields = campos_tabla(tabla)
+        cronometro = Cronometro()
+        resultado = {'capa_temporal': None, 'archivo': None, 'tabla': tabla,
+                     'reporte': None, 'errores': [], 'cronometro': cronometro, 'nombre_capa': nombre_capa,
+                     'id_capa': id_capa, 'motor': motor, 'formateador': formateador, 'huellas': None,
+                     'solo_seleccion': request.filterType() == QgsFeatureRequest.FilterFids}
+        output_layers = []
+        
+        # Las exportaciones tabulares leen la tabla: la capa en memoria solo
+        # se crea si se pidió una capa temporal
+        if opciones['temporal']:
             temp_layer = QgsVectorLayer(
                 f"Point?crs={crs.authid()}",
-                "temp_calculos",
+                "linderos" if opciones['linderos'] else "temp_calculos",
                 "memory"
             )
             temp_layer.dataProvider().addAttributes(fields)
             temp_layer.updateFields()
-            
-            reporte_lines = []
-            reporte_lines.append("REPORTE DE CÁLCULOS TOPOGRÁFICOS")
-            reporte_lines.append(f"Fecha: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            reporte_lines.append(f"Capa de origen: {layer.name()}")
-            reporte_lines.append("")
-            
-            for feature in features:
-                geom = feature.geometry()
-                if not geom.isEmpty():
-                    vertices = self.extraer_vertices(geom)
-                    if len(vertices) >= 3:
-                        # Calcular área y perímetro
-                        area = self.convertir_area(self.distance_area.measureArea(geom)) if self.area_cb.isChecked() else None
-                        perimetro = self.calcular_perimetro(geom) if self.perimetro_cb.isChecked() else None
-                        
-                        # Agregar al reporte
-                        reporte_lines.append(f"Polígono ID: {feature.id()}")
-                        if self.area_cb.isChecked():
-                            reporte_lines.append(f"Área: {area:.4f} {self.area_unit_combo.currentText()}")
-                        if self.perimetro_cb.isChecked():
-                            reporte_lines.append(f"Perímetro: {perimetro:.4f} metros")
-                        reporte_lines.append("Vértices:")
-                        
-                        distancia_acumulada = 0.0
-                        for i in range(len(vertices)):
-                            p1 = vertices[i]
-                            p0 = vertices[(i - 1) % len(vertices)]
-                            p2 = vertices[(i + 1) % len(vertices)]
-                            
-                            # Calcular distancias
-                            distancia = self.calcular_distancia(p1, p2) if self.distancia_cb.isChecked() else None
-                            if distancia and self.dist_acum_cb.isChecked():
-                                distancia_acumulada += distancia
-                            
-                            # Calcular ángulos y azimut
-                            interno_rad, externo_rad = self.calcular_angulo(p0, p1, p2)
-                            azimut_rad = self.calcular_azimut(p1, p2) if self.azimut_cb.isChecked() else 0
-                            
-                            # Crear feature
-                            feat = QgsFeature(fields)
-                            feat.setGeometry(QgsGeometry.fromPointXY(p1))
-                            
-                            # Atributos básicos
-                            atributos = [
-                                feature.id(),  # id_pol
-                                i + 1,        # vertice
-                                p1.x(),       # x
-                                p1.y()        # y
-                            ]
-                            
-                            # Agregar distancias
-                            if self.distancia_cb.isChecked():
-                                atributos.append(distancia)
-                            if self.dist_acum_cb.isChecked():
-                                atributos.append(distancia_acumulada)
-                            
-                            # Agregar área y perímetro (solo en el primer vértice)
-                            if i == 0:
-                                if self.area_cb.isChecked():
-                                    atributos.append(area)
-                                if self.perimetro_cb.isChecked():
-                                    atributos.append(perimetro)
-                            else:
-                                if self.area_cb.isChecked():
-                                    atributos.append(None)
-                                if self.perimetro_cb.isChecked():
-                                    atributos.append(None)
-                            
-                            # Resto de atributos
-                            if self.internal_cb.isChecked():
-                                interno_txt, interno_num = self.formatear_angulo(interno_rad)
-                                atributos.extend([interno_txt, interno_num])
-                                reporte_lines.append(f"  Vértice {i+1}: Ángulo interno: {interno_txt}")
-                            
-                            if self.external_cb.isChecked():
-                                externo_txt, externo_num = self.formatear_angulo(externo_rad)
-                                atributos.extend([externo_txt, externo_num])
-                                reporte_lines.append(f"  Vértice {i+1}: Ángulo externo: {externo_txt}")
-                            
-                            if self.azimut_cb.isChecked():
-                                azimut_txt, azimut_num = self.formatear_angulo(azimut_rad)
-                                atributos.extend([azimut_txt, azimut_num])
-                                reporte_lines.append(f"  Lado {i+1}-{i+2 if i+2 <= len(vertices) else 1}: Azimut: {azimut_txt}")
-                            
-                            if self.rumbo_cb.isChecked():
-                                rumbo_txt = self.azimut_a_rumbo(azimut_rad)
-                                atributos.extend([rumbo_txt, math.degrees(azimut_rad)])
-                                reporte_lines.append(f"  Lado {i+1}-{i+2 if i+2 <= len(vertices) else 1}: Rumbo: {rumbo_txt}")
-                            
-                            if self.distancia_cb.isChecked():
-                                reporte_lines.append(f"  Lado {i+1}-{i+2 if i+2 <= len(vertices) else 1}: Distancia: {distancia:.4f} m")
-                            
-                            if self.dist_acum_cb.isChecked():
-                                reporte_lines.append(f"  Distancia acumulada hasta vértice {i+1}: {distancia_acumulada:.4f} m")
-                            
-                            feat.setAttributes(atributos)
-                            temp_layer.dataProvider().addFeature(feat)
-                        
-                        reporte_lines.append("")
-                
-                processed += 1
-                self.log_label.setText(f"Procesando... {processed}/{total} polígonos")
-                QApplication.processEvents()
+            output_layers.append(temp_layer)
+            resultado['capa_temporal'] = temp_layer
+        
+        # El archivo se escribe directamente por lotes, sin capa intermedia en memoria
+        file_layer = None
+        if opciones['archivo']:
+            file_layer = crear_capa_archivo(opciones['archivo'], fields, QgsWkbTypes.Point, crs)
+            output_layers.append(file_layer)
+        
+        sumidero = SumideroEntidades(output_layers, opciones['lote'])
+        
+        x, y = columnas_punto(opciones)
 
+        def al_agregar(inicio, n):
+            if output_layers:
+                sumidero.agregar_varias(entidades_tabla(tabla, fields, inicio, inicio + n, x=x, y=y))
+        
+        if procesos is not None:
+            origen, bloques, trabajadores = procesos
+            reporte = calcular_poligonos_procesos(origen, bloques, trabajadores, tabla, formateador, opciones,
+                                                  nombre_capa, al_agregar, tarea.isCanceled, tarea.informar,
+                                                  cronometro)
+        else:
+            entidades = fuente.getFeatures(request)
+            if opciones['en_vivo']:
+                # Huellas de las geometrías para reconocer después las entidades que no cambian
+                resultado['huellas'] = {}
+                entidades = con_huellas(entidades, resultado['huellas'])
+            reporte = calcular_poligonos(entidades, tabla, motor, formateador, opciones,
+                                         nombre_capa, al_agregar, tarea.isCanceled, tarea.informar, cronometro)
+        if reporte is None:
+            return None
+        resultado['reporte'] = reporte
+
+        # Escribir el último lote y crear el índice espacial
+        with cronometro.fase(ESCRITURA):
+            sumidero.cerrar()
+
+        if file_layer is not None:
+            resultado['archivo'] = opciones['archivo']
+            # Liberar el proveedor OGR para que el archivo quede cerrado
+            output_layers.remove(file_layer)
+            file_layer = None
+
+        # Guardar reporte en archivo
+        if opciones['reporte_archivo']:
+            try:
+                with cronometro.fase(EXPORTACION):
+                    reporte.escribir(opciones['reporte_archivo'])
+            except Exception as e:
+                resultado['errores'].append(f"No se pudo guardar el reporte:\n{str(e)}")
+                resultado['reporte_archivo_error'] = True
+
+        # Las capas se crearon en este hilo: se entregan al hilo principal
+        for capa in output_layers:
+            capa.moveToThread(QCoreApplication.instance().thread())
+        cronometro.detener()
+        return resultado
+
+    def calculo_terminado(self, ok, tarea):
+        """Registra los resultados de una tarea en el proyecto (hilo principal)"""
+        if tarea in self.tareas:
+            self.tareas.remove(tarea)
+        self.button_box.button(QDialogButtonBox.Ok).setEnabled(True)
+        self.cancelar_button.setEnabled(bool(self.tareas))
+
+        if tarea.excepcion is not None:
+            QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(tarea.excepcion)}")
+            self.log_label.setText(f"Error: {str(tarea.excepcion)}")
+            return
+        if not ok or tarea.resultado is None:
+            self.log_label.setText("Cálculo cancelado")
+            self.iface.messageBar().pushMessage("Cálculos de polígonos", "Cálculo cancelado", level=Qgis.Warning)
+            return
+
+        resultado = tarea.resultado
+        opciones = self.opciones
+        self.cronometro = resultado['cronometro']
+        try:
             # Actualizar reporte en la interfaz
-            if self.reporte_cb.isChecked():
-                self.reporte_text.setPlainText("\n".join(reporte_lines))
+            if opciones['reporte']:
+                self.reporte_visor.establecer_almacen(resultado['reporte'])
+
+            # Cargar capas de salida
+            if resultado['capa_temporal'] is not None:
+                self.output_layer = resultado['capa_temporal']
+                QgsProject.instance().addMapLayer(self.output_layer)
 
-            # Guardar capa de salida
-            if self.temp_rb.isChecked():
-                self.output_layer = temp_layer
+            if resultado['archivo']:
+                self.output_layer = QgsVectorLayer(resultado['archivo'], os.path.basename(resultado['archivo']), "ogr")
                 QgsProject.instance().addMapLayer(self.output_layer)
 
-            if self.file_rb.isChecked() and self.file_widget.filePath():
-                output_path = self.file_widget.filePath()
-                options = QgsVectorFileWriter.SaveVectorOptions()
-                options.driverName = "ESRI Shapefile" if output_path.endswith('.shp') else "GPKG"
-                options.fileEncoding = 'UTF-8'
-                
-                error = QgsVectorFileWriter.writeAsVectorFormatV2(
-                    temp_layer,
-                    output_path,
-                    QgsCoordinateTransformContext(),
-                    options
-                )
-                
-                if error[0] != QgsVectorFileWriter.NoError:
-                    QMessageBox.warning(self, "Error", f"No se pudo guardar el archivo: {error[1]}")
-                else:
-                    self.output_layer = QgsVectorLayer(output_path, os.path.basename(output_path), "ogr")
-                    QgsProject.instance().addMapLayer(self.output_layer)
-
-            # Guardar reporte en archivo
-            if self.reporte_file_rb.isChecked() and self.reporte_file_widget.filePath():
-                try:
-                    with open(self.reporte_file_widget.filePath(), 'w', encoding='utf-8') as f:
-                        f.write("\n".join(reporte_lines))
-                    QMessageBox.information(self, "Éxito", f"Reporte guardado en:\n{self.reporte_file_widget.filePath()}")
-                except Exception as e:
-                    QMessageBox.warning(self, "Error", f"No se pudo guardar el reporte:\n{str(e)}")
-
-            # Exportaciones adicionales
-            if self.export_csv_rb.isChecked() and self.csv_file_widget.filePath():
-                self.exportar_a_csv(self.csv_file_widget.filePath(), temp_layer)
+            if opciones['en_vivo']:
+                self.iniciar_en_vivo(resultado)
+
+            for error in resultado['errores']:
+                QMessageBox.warning(self, "Error", error)
+            if opciones['reporte_archivo'] and not resultado.get('reporte_archivo_error'):
+                QMessageBox.information(self, "Éxito", f"Reporte guardado en:\n{opciones['reporte_archivo']}")
+
+            # Exportaciones adicionales (leen directamente la tabla de resultados)
+            if opciones['csv']:
+                self.exportar_a_csv(opciones['csv'], resultado['tabla'])
             
-            if self.export_excel_rb.isChecked() and self.excel_file_widget.filePath():
-                self.exportar_a_excel(self.excel_file_widget.filePath(), temp_layer)
+            if opciones['excel']:
+                self.exportar_a_excel(opciones['excel'], resultado['tabla'],
+                                      opciones['excel_resumen'] and not opciones['linderos'])
             
-            if self.export_pdf_rb.isChecked() and self.pdf_file_widget.filePath():
-                self.exportar_a_pdf(self.pdf_file_widget.filePath())
+            if opciones['pdf']:
+                self.exportar_a_pdf(opciones['pdf'])
+
+            # Tiempos y memoria de cada fase
+            error = registrar_metricas("Cálculos de polígonos", self.cronometro, opciones['telemetria'],
+                                       capa=resultado['nombre_capa'], filas=len(resultado['tabla']))
+            if error:
+                QMessageBox.warning(self, "Error", error)
+            self.metricas_panel.mostrar(self.cronometro)
 
             self.log_label.setText("Proceso completado con éxito")
             self.tabs.setCurrentIndex(1)  # Mostrar pestaña de registro/reporte
@@ -454,146 +578,30 @@ class CalculosPoligonosDialog(QDialog):
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Ocurrió un error:\n{str(e)}")
             self.log_label.setText(f"Error: {str(e)}")
-        finally:
-            self.button_box.setEnabled(True)
-            QApplication.processEvents()
-
-    def extraer_vertices(self, geometry):
-        """Extrae los vértices de una geometría de polígono"""
-        vertices = []
-        if geometry.isMultipart():
-            for part in geometry.asMultiPolygon():
-                for ring in part:
-                    vertices.extend([QgsPointXY(point) for point in ring])
-        else:
-            ring = geometry.asPolygon()[0]
-            vertices = [QgsPointXY(point) for point in ring]
-        return vertices
-
-    def calcular_angulo(self, p0, p1, p2):
-        """Calcula los ángulos interno y externo entre tres puntos"""
-        # Vectores
-        v1 = QgsPointXY(p0.x() - p1.x(), p0.y() - p1.y())
-        v2 = QgsPointXY(p2.x() - p1.x(), p2.y() - p1.y())
-        
-        # Ángulo entre vectores
-        dot = v1.x() * v2.x() + v1.y() * v2.y()
-        det = v1.x() * v2.y() - v1.y() * v2.x()
-        angulo_rad = math.atan2(det, dot)
-        
-        # Ajustar ángulo a rango [0, 2π]
-        if angulo_rad < 0:
-            angulo_rad += 2 * math.pi
-            
-        interno_rad = angulo_rad
-        externo_rad = 2 * math.pi - angulo_rad
-        
-        return interno_rad, externo_rad
 
-    def calcular_azimut(self, p1, p2):
-        """Calcula el azimut entre dos puntos"""
-        dx = p2.x() - p1.x()
-        dy = p2.y() - p1.y()
-        
-        azimut_rad = math.atan2(dx, dy)
-        if azimut_rad < 0:
-            azimut_rad += 2 * math.pi
-            
-        return azimut_rad
-
-    def azimut_a_rumbo(self, azimut_rad):
-        """Convierte azimut a rumbo"""
-        decimales = self.decimal_spin.value()
-        azimut_grados = math.degrees(azimut_rad)
-        
-        if 0 <= azimut_grados < 90:
-            return f"N {azimut_grados:.{decimales}f}° E"
-        elif 90 <= azimut_grados < 180:
-            return f"S {180 - azimut_grados:.{decimales}f}° E"
-        elif 180 <= azimut_grados < 270:
-            return f"S {azimut_grados - 180:.{decimales}f}° W"
-        else:
-            return f"N {360 - azimut_grados:.{decimales}f}° W"
-
-    def formatear_angulo(self, angulo_rad):
-        """Formatea el ángulo según las unidades seleccionadas"""
-        decimales = self.decimal_spin.value()
-        angulo_grados = math.degrees(angulo_rad) % 360
-        
-        if self.format_combo.currentIndex() == 0:  # Grados decimales
-            return f"{angulo_grados:.{decimales}f}°", angulo_grados
-        elif self.format_combo.currentIndex() == 1:  # Grados/Minutos/Segundos
-            grados = int(angulo_grados)
-            minutos_float = abs(angulo_grados - grados) * 60
-            minutos = int(minutos_float)
-            segundos = round((minutos_float - minutos) * 60, decimales)
-            
-            # Ajustar redondeo
-            if segundos >= 60:
-                segundos -= 60
-                minutos += 1
-            if minutos >= 60:
-                minutos -= 60
-                grados += 1
-            
-            return f"{grados}° {minutos}' {segundos}\"", angulo_grados
-        else:  # Radianes
-            return f"{angulo_rad:.{decimales}f} rad", angulo_rad
-
-    def convertir_area(self, area_m2):
-        """Convierte el área a las unidades seleccionadas"""
-        if self.area_unit_combo.currentIndex() == 0:  # Metros cuadrados
-            return area_m2
-        elif self.area_unit_combo.currentIndex() == 1:  # Hectáreas
-            return area_m2 / 10000
-        else:  # Kilómetros cuadrados
-            return area_m2 / 1000000
-
-    def exportar_a_csv(self, file_path, layer):
+    def exportar_a_csv(self, file_path, tabla):
         """Exporta los resultados a CSV"""
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.writer(csvfile)
-                
-                # Escribir encabezados
-                headers = [field.name() for field in layer.fields()]
-                writer.writerow(headers)
-                
-                # Escribir datos
-                for feature in layer.getFeatures():
-                    writer.writerow([feature[field] for field in headers])
-                
+            # Los valores nulos se escriben como celdas vacías
+            with self.cronometro.fase(EXPORTACION):
+                escribir_csv(tabla, file_path)
             QMessageBox.information(self, "Éxito", f"Datos exportados a CSV:\n{file_path}")
             return True
         except Exception as e:
             QMessageBox.warning(self, "Error", f"No se pudo exportar a CSV:\n{str(e)}")
             return False
 
-    def exportar_a_excel(self, file_path, layer):
+    def exportar_a_excel(self, file_path, tabla, resumen=False):
         """Exporta los resultados a Excel"""
         try:
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Cálculos de Polígonos"
-            
-            # Escribir encabezados
-            headers = [field.name() for field in layer.fields()]
-            ws.append(headers)
-            
-            # Escribir datos con manejo de valores NULL
-            for feature in layer.getFeatures():
-                row = []
-                for field in headers:
-                    value = feature[field]
-                    # Convertir NULL/None a cadena vacía
-                    if value is None or str(value).upper() == 'NULL':
-                        row.append('')
-                    else:
-                        row.append(value)
-                ws.append(row)
-            
-            wb.save(file_path)
-            QMessageBox.information(self, "Éxito", f"Datos exportados a Excel:\n{file_path}")
+            # Escritura en flujo: se abre una hoja nueva al llegar al límite de filas de Excel
+            hoja_resumen = ("Resumen por polígono",) + resumen_poligonos(tabla) if resumen else None
+            with self.cronometro.fase(EXPORTACION):
+                n_hojas = escribir_xlsx(tabla, file_path, "Cálculos de Polígonos", hoja_resumen)
+            mensaje = f"Datos exportados a Excel:\n{file_path}"
+            if n_hojas > 1:
+                mensaje += f"\n({n_hojas} hojas de datos)"
+            QMessageBox.information(self, "Éxito", mensaje)
             return True
         except Exception as e:
             QMessageBox.warning(self, "Error", f"No se pudo exportar a Excel:\n{str(e)}")
@@ -611,7 +619,8 @@ class CalculosPoligonosDialog(QDialog):
             printer.setPageMargins(15, 15, 15, 15, QPrinter.Millimeter)
             
             # Imprimir
-            self.reporte_text.document().print_(printer)
+            with self.cronometro.fase(EXPORTACION):
+                imprimir_reporte(self.reporte_visor.almacen, printer)
             
             QMessageBox.information(self, "Éxito", f"Reporte exportado a PDF:\n{file_path}")
             return True
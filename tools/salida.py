@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+from qgis.core import (QgsVectorDataProvider, QgsVectorFileWriter, QgsVectorLayer,
+                       QgsCoordinateTransformContext, QgsFields, QgsField, QgsFeature,
+                       QgsGeometry, QgsPointXY)
+from qgis.PyQt.QtCore import QVariant
+import os
+
+from ..core.tabla import ENTERO, REAL, TEXTO
+
+TIPOS_QVARIANT = {ENTERO: QVariant.Int, REAL: QVariant.Double, TEXTO: QVariant.String}
+
+
+class SumideroEntidades:
+    """
+    Acumula entidades en memoria y las escribe por lotes en una o varias capas.
+
+    Cada entidad se construye una sola vez y se inserta con ``addFeatures`` en
+    todas las capas destino cuando el búfer alcanza ``tamano_lote``. El índice
+    espacial se crea una única vez al cerrar, después de la carga completa.
+    """
+    def __init__(self, capas, tamano_lote=10000):
+        """
+        :param capas: Lista de capas vectoriales de destino.
+        :param tamano_lote: Número de entidades por cada escritura.
+        """
+        self.capas = list(capas)
+        self.tamano_lote = max(1, int(tamano_lote))
+        self.buffer = []
+        self.total = 0
+
+    def agregar(self, feature):
+        """Añade una entidad al búfer y vacía el lote si está lleno"""
+        self.buffer.append(feature)
+        if len(self.buffer) >= self.tamano_lote:
+            self.vaciar()
+
+    def agregar_varias(self, features):
+        """Añade una secuencia de entidades al búfer"""
+        for feature in features:
+            self.agregar(feature)
+
+    def vaciar(self):
+        """Escribe el lote pendiente en todas las capas destino"""
+        if not self.buffer:
+            return
+        for capa in self.capas:
+            ok, _ = capa.dataProvider().addFeatures(self.buffer)
+            if not ok:
+                raise RuntimeError(f"No se pudieron escribir entidades en la capa '{capa.name()}'")
+        self.total += len(self.buffer)
+        self.buffer = []
+
+    def cerrar(self):
+        """Vacía el búfer, construye el índice espacial de cada capa y libera los destinos"""
+        self.vaciar()
+        for capa in self.capas:
+            proveedor = capa.dataProvider()
+            if proveedor.capabilities() & QgsVectorDataProvider.CreateSpatialIndex:
+                proveedor.createSpatialIndex()
+            capa.updateExtents()
+        self.capas = []
+        return self.total
+
+
+def crear_capa_archivo(ruta, fields, tipo_geometria, crs):
+    """
+    Crea un archivo vacío (Shapefile o GeoPackage) y lo abre como capa OGR.
+
+    La capa devuelta puede usarse como destino de ``SumideroEntidades``: cada
+    lote se escribe con ``addFeatures`` dentro de una transacción del
+    proveedor OGR, de modo que el resultado nunca se acumula completo en memoria.
+    """
+    options = QgsVectorFileWriter.SaveVectorOptions()
+    options.driverName = "ESRI Shapefile" if ruta.lower().endswith('.shp') else "GPKG"
+    options.fileEncoding = 'UTF-8'
+    if options.driverName == "GPKG":
+        # El índice espacial se crea una sola vez al cerrar el sumidero
+        options.layerOptions = ['SPATIAL_INDEX=NO']
+
+    writer = QgsVectorFileWriter.create(ruta, fields, tipo_geometria, crs,
+                                        QgsCoordinateTransformContext(), options)
+    if writer.hasError() != QgsVectorFileWriter.NoError:
+        raise RuntimeError(f"No se pudo crear el archivo '{ruta}': {writer.errorMessage()}")
+    # Cerrar el escritor para que el archivo quede disponible para el proveedor OGR
+    del writer
+
+    capa = QgsVectorLayer(ruta, os.path.basename(ruta), "ogr")
+    if not capa.isValid():
+        raise RuntimeError(f"No se pudo abrir el archivo de salida '{ruta}'")
+    return capa
+
+
+def campos_tabla(tabla):
+    """QgsFields con las columnas visibles de una TablaResultados"""
+    fields = QgsFields()
+    for nombre, tipo in tabla.definiciones():
+        fields.append(QgsField(nombre, TIPOS_QVARIANT[tipo]))
+    return fields
+
+
+def entidades_tabla(tabla, fields, inicio=0, fin=None, x='x', y='y'):
+    """
+    Genera entidades de punto a partir de las filas [inicio, fin) de la tabla.
+
+    :param x: Columna con la coordenada X de la geometría.
+    :param y: Columna con la coordenada Y de la geometría.
+    """
+    nombres = tabla.nombres()
+    n_atributos = len(nombres)
+    for fila in tabla.filas(inicio, fin, nombres + [x, y]):
+        feat = QgsFeature(fields)
+        feat.setGeometry(QgsGeometry.fromPointXY(QgsPointXY(fila[-2], fila[-1])))
+        feat.setAttributes(list(fila[:n_atributos]))
+        yield feat
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+from qgis.core import QgsTask
+import time
+
+
+class TareaCalculo(QgsTask):
+    """
+    Ejecuta el núcleo de un cálculo en segundo plano mediante el gestor de tareas de QGIS.
+
+    ``funcion`` recibe la propia tarea, debe consultar ``isCanceled()`` con
+    regularidad y llamar a ``informar()`` para actualizar el progreso. Su
+    valor de retorno queda en ``resultado`` y ``al_terminar(ok, tarea)`` se
+    invoca en el hilo principal cuando la tarea finaliza.
+    """
+    # Intervalo mínimo (segundos) entre dos actualizaciones de progreso
+    INTERVALO_PROGRESO = 0.25
+
+    def __init__(self, descripcion, funcion, al_terminar, total=0):
+        super().__init__(descripcion, QgsTask.CanCancel)
+        self.funcion = funcion
+        self.al_terminar = al_terminar
+        self.total = total
+        self.resultado = None
+        self.excepcion = None
+        self.estado = ""
+        self._inicio = None
+        self._ultimo_aviso = 0.0
+
+    def run(self):
+        """Ejecuta la función de cálculo (hilo de trabajo)"""
+        self._inicio = time.monotonic()
+        try:
+            self.resultado = self.funcion(self)
+        except Exception as e:
+            self.excepcion = e
+            return False
+        return not self.isCanceled()
+
+    def informar(self, procesados):
+        """Actualiza el progreso, la velocidad y el tiempo restante de forma espaciada"""
+        ahora = time.monotonic()
+        if procesados < self.total and ahora - self._ultimo_aviso < self.INTERVALO_PROGRESO:
+            return
+        self._ultimo_aviso = ahora
+        transcurrido = ahora - self._inicio
+        velocidad = procesados / transcurrido if transcurrido > 0 else 0.0
+        restante = (self.total - procesados) / velocidad if velocidad > 0 else 0.0
+        self.estado = (f"{procesados}/{self.total} entidades - {velocidad:.0f} ent/s - "
+                       f"tiempo restante {restante:.0f} s")
+        self.setProgress(100.0 * procesados / self.total if self.total else 100.0)
+
+    def finished(self, ok):
+        """Devuelve el control al hilo principal"""
+        self.al_terminar(ok, self)
@@ -0,0 +1,65 @@
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+                                 QHeaderView, QAbstractItemView)
+from qgis.PyQt.QtCore import Qt
+from qgis.core import QgsMessageLog, Qgis
+
+from ..core.cronometro import agregar_jsonl
+
+# Pestaña del registro de mensajes de QGIS donde se anotan las mediciones
+ETIQUETA_REGISTRO = "Topografía"
+
+
+def registrar_metricas(herramienta, cronometro, ruta_jsonl=None, **datos):
+    """
+    Anota las mediciones en el registro de mensajes de QGIS y, si se indica
+    una ruta, las añade como una línea al archivo de telemetría JSONL.
+    :return: Mensaje de error si no se pudo escribir la telemetría, o None.
+    """
+    cronometro.detener()
+    QgsMessageLog.logMessage(f"{herramienta}: {cronometro.texto()}", ETIQUETA_REGISTRO, Qgis.Info)
+    if ruta_jsonl:
+        try:
+            agregar_jsonl(ruta_jsonl, cronometro.registro(herramienta=herramienta, **datos))
+        except Exception as e:
+            return f"No se pudo guardar la telemetría:\n{str(e)}"
+    return None
+
+
+class PanelMetricas(QWidget):
+    """Tiempo, mediciones y memoria pico de cada fase de la última ejecución"""
+    COLUMNAS = ["Fase", "Tiempo (s)", "% del total", "Mediciones", "Memoria pico (MB)"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        self.resumen_label = QLabel()
+        self.resumen_label.setWordWrap(True)
+        layout.addWidget(self.resumen_label)
+
+        self.tabla = QTableWidget(0, len(self.COLUMNAS))
+        self.tabla.setHorizontalHeaderLabels(self.COLUMNAS)
+        self.tabla.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.tabla.verticalHeader().setVisible(False)
+        self.tabla.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.tabla)
+        self.setLayout(layout)
+        self.setVisible(False)
+
+    def mostrar(self, cronometro):
+        filas = cronometro.filas()
+        self.resumen_label.setText(cronometro.resumen())
+        self.tabla.setRowCount(len(filas))
+        for fila, (nombre, segundos, porcentaje, mediciones, memoria) in enumerate(filas):
+            valores = [nombre, f"{segundos:.3f}", f"{porcentaje:.1f}", str(mediciones),
+                       f"{memoria / 1048576:.0f}" if memoria is not None else "-"]
+            for columna, valor in enumerate(valores):
+                item = QTableWidgetItem(valor)
+                if columna:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.tabla.setItem(fila, columna, item)
+        # Altura justa para todas las fases, sin barra de desplazamiento
+        self.tabla.setFixedHeight(self.tabla.horizontalHeader().height() + 2 +
+                                  sum(self.tabla.rowHeight(f) for f in range(len(filas))))
+        self.setVisible(True)
@@ -0,0 +1,139 @@
+# -*- coding: utf-8 -*-
+from qgis.PyQt.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QListView,
+                                 QLineEdit, QPushButton, QLabel, QSpinBox,
+                                 QAbstractItemView)
+from qgis.PyQt.QtCore import Qt, QAbstractListModel, QModelIndex
+from qgis.PyQt.QtGui import QFontDatabase, QPainter, QFontMetrics
+from PyQt5.QtPrintSupport import QPrinter
+
+from ..core.reporte import AlmacenReporte
+
+
+class ModeloReporte(QAbstractListModel):
+    """Modelo de solo lectura que formatea cada línea del reporte al pedirse"""
+    def __init__(self, almacen=None, parent=None):
+        super().__init__(parent)
+        self.almacen = almacen or AlmacenReporte()
+
+    def establecer_almacen(self, almacen):
+        self.beginResetModel()
+        self.almacen = almacen
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return self.almacen.total_lineas()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and index.isValid():
+            return self.almacen.linea(index.row())
+        return None
+
+
+class VisorReporte(QWidget):
+    """
+    Visor de reportes que solo dibuja las líneas visibles.
+    Incluye búsqueda de texto y salto al bloque de una entidad.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+
+        # Barra de búsqueda y navegación
+        barra = QHBoxLayout()
+        self.buscar_edit = QLineEdit()
+        self.buscar_edit.setPlaceholderText("Buscar en el reporte...")
+        self.buscar_edit.returnPressed.connect(self.buscar_siguiente)
+        barra.addWidget(self.buscar_edit)
+        buscar_button = QPushButton("Buscar")
+        buscar_button.clicked.connect(self.buscar_siguiente)
+        barra.addWidget(buscar_button)
+        barra.addWidget(QLabel("Entidad ID:"))
+        self.entidad_spin = QSpinBox()
+        self.entidad_spin.setRange(-2147483647, 2147483647)
+        barra.addWidget(self.entidad_spin)
+        ir_button = QPushButton("Ir")
+        ir_button.clicked.connect(self.ir_a_entidad)
+        barra.addWidget(ir_button)
+        layout.addLayout(barra)
+
+        self.modelo = ModeloReporte(parent=self)
+        self.vista = QListView()
+        self.vista.setModel(self.modelo)
+        self.vista.setUniformItemSizes(True)
+        self.vista.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.vista.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        layout.addWidget(self.vista)
+
+        self.estado_label = QLabel("")
+        layout.addWidget(self.estado_label)
+        self.setLayout(layout)
+
+    @property
+    def almacen(self):
+        return self.modelo.almacen
+
+    def establecer_almacen(self, almacen):
+        """Muestra un nuevo reporte"""
+        self.modelo.establecer_almacen(almacen)
+        self.estado_label.setText(f"{almacen.total_lineas()} líneas")
+
+    def limpiar(self):
+        self.establecer_almacen(AlmacenReporte())
+
+    def mostrar_linea(self, numero):
+        indice = self.modelo.index(numero, 0)
+        self.vista.setCurrentIndex(indice)
+        self.vista.scrollTo(indice, QAbstractItemView.PositionAtTop)
+
+    def buscar_siguiente(self):
+        """Busca el texto a partir de la línea siguiente a la actual"""
+        texto = self.buscar_edit.text()
+        if not texto:
+            return
+        actual = self.vista.currentIndex()
+        desde = actual.row() + 1 if actual.isValid() else 0
+        numero = self.almacen.buscar(texto, desde)
+        if numero < 0 and desde > 0:
+            numero = self.almacen.buscar(texto, 0)
+        if numero < 0:
+            self.estado_label.setText(f"No se encontró '{texto}'")
+            return
+        self.mostrar_linea(numero)
+        self.estado_label.setText(f"Línea {numero + 1} de {self.almacen.total_lineas()}")
+
+    def ir_a_entidad(self):
+        """Desplaza la vista al bloque de la entidad indicada"""
+        numero = self.almacen.linea_de_entidad(self.entidad_spin.value())
+        if numero < 0:
+            self.estado_label.setText(f"La entidad {self.entidad_spin.value()} no está en el reporte")
+            return
+        self.mostrar_linea(numero)
+        self.estado_label.setText(f"Línea {numero + 1} de {self.almacen.total_lineas()}")
+
+
+def imprimir_reporte(almacen, printer):
+    """Imprime el reporte página a página sin construir un documento completo"""
+    painter = QPainter()
+    if not painter.begin(printer):
+        raise RuntimeError("No se pudo iniciar la impresión")
+    try:
+        painter.setFont(QFontDatabase.systemFont(QFontDatabase.FixedFont))
+        metricas = QFontMetrics(painter.font(), printer)
+        alto_linea = metricas.lineSpacing()
+        area = printer.pageRect(QPrinter.DevicePixel)
+        lineas_por_pagina = max(1, int(area.height() // alto_linea))
+        y = 0
+        en_pagina = 0
+        for linea in almacen.lineas():
+            if en_pagina == lineas_por_pagina:
+                printer.newPage()
+                y = 0
+                en_pagina = 0
+            painter.drawText(0, int(y + metricas.ascent()), linea)
+            y += alto_linea
+            en_pagina += 1
+    finally:
+        painter.end()
@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
 from qgis.PyQt.QtWidgets import QAction, QMessageBox
 from qgis.PyQt.QtGui import QIcon
+from qgis.core import QgsApplication
 import os
+import sys
 import importlib.util
 from qgis.utils import iface
 
@@ -9,9 +11,12 @@ def import_module_from_path(path, module_name):
     """
     Importa un módulo de Python desde una ruta de archivo específica.
     Esto es útil para cargar módulos que no están en el PYTHONPATH.
+    El módulo se registra en sys.modules para que sus importaciones
+    relativas (por ejemplo, entre módulos de 'tools') funcionen.
     """
     spec = importlib.util.spec_from_file_location(module_name, path)
     module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
     spec.loader.exec_module(module)
     return module
 
@@ -31,6 +36,8 @@ class TopografiaPlugin:
         self.actions = []  # Lista para almacenar todas las acciones del plugin
         self.menu = "&Topografía"  # Nombre del menú principal del plugin
         self.icon_paths = {} # Diccionario para almacenar las rutas de los iconos
+        self.dialogs = [] # Diálogos no modales abiertos o con tareas en curso
+        self.provider = None # Proveedor de Processing
 
         # Módulos de herramientas que se cargarán dinámicamente
         self.poligonos_module = None
@@ -57,17 +64,34 @@ class TopografiaPlugin:
                 if not os.path.exists(path):
                     raise FileNotFoundError(f"El archivo '{os.path.basename(path)}' no se encontró en la ruta: {path}")
 
-                setattr(self, f"{module_name}_module", import_module_from_path(path, module_name))
+                qualified_name = f"{__package__}.tools.{module_name}"
+                setattr(self, f"{module_name}_module", import_module_from_path(path, qualified_name))
             except Exception as e:
+                if self.iface is None:
+                    # Sin interfaz gráfica (qgis_process) no hay ventana donde mostrar el error
+                    raise
                 QMessageBox.critical(self.iface.mainWindow(), f"Error al cargar módulo '{module_name}'",
                                      f"No se pudo cargar el módulo '{module_name}'.\nDetalles: {e}\n"
                                      f"Asegúrate de que el archivo '{os.path.basename(path)}' exista en:\n{os.path.dirname(path)}")
 
+    def initProcessing(self):
+        """
+        Registra el proveedor de Processing y las funciones de expresión del plugin.
+        QGIS lo llama también sin interfaz gráfica (por ejemplo desde qgis_process).
+        """
+        from .procesamiento.proveedor import ProveedorTopografia
+        from .tools.expresiones import registrar_funciones
+        self.provider = ProveedorTopografia()
+        QgsApplication.processingRegistry().addProvider(self.provider)
+        # Funciones de expresión (topo_azimut, topo_rumbo, ...)
+        registrar_funciones()
 
     def initGui(self):
         """
         Carga el plugin, añadiendo sus acciones al menú de complementos.
         """
+        self.initProcessing()
+
         # Definir rutas de iconos según la estructura de archivos actualizada
         icon_dir = os.path.join(self.plugin_dir, 'icons')
         self.icon_paths['icon'] = os.path.join(icon_dir, 'icon.png')
@@ -125,12 +149,32 @@ class TopografiaPlugin:
         for action in self.actions:
             self.iface.removePluginMenu(self.menu, action)
             self.iface.removeToolBarIcon(action)
+        for dialog in self.dialogs:
+            for tarea in getattr(dialog, 'tareas', []):
+                tarea.cancel()
+            dialog.close()
+        self.dialogs = []
+        if self.provider is not None:
+            QgsApplication.processingRegistry().removeProvider(self.provider)
+            self.provider = None
+            from .tools.expresiones import eliminar_funciones
+            eliminar_funciones()
+
+    def show_dialog(self, dialog):
+        """
+        Muestra un diálogo de forma no modal para que QGIS siga disponible
+        mientras sus cálculos se ejecutan en segundo plano.
+        Se conserva una referencia mientras el diálogo esté visible o tenga tareas activas.
+        """
+        self.dialogs = [d for d in self.dialogs if d.isVisible() or getattr(d, 'tareas', None)]
+        self.dialogs.append(dialog)
+        dialog.show()
 
     def run_poligonos(self):
         """Lanza el diálogo de cálculo de polígonos."""
         if self.poligonos_module:
             dialog = self.poligonos_module.CalculosPoligonosDialog(self.iface)
-            dialog.exec_()
+            self.show_dialog(dialog)
         else:
             QMessageBox.warning(self.iface.mainWindow(), "Módulo no cargado",
                                  "El módulo de cálculos de polígonos no está disponible.")
@@ -139,7 +183,7 @@ class TopografiaPlugin:
         """Lanza el diálogo de cálculo de líneas."""
         if self.lineas_module:
             dialog = self.lineas_module.CalculosLineasDialog(self.iface)
-            dialog.exec_()
+            self.show_dialog(dialog)
         else:
             QMessageBox.warning(self.iface.mainWindow(), "Módulo no cargado",
                                  "El módulo de cálculos de líneas no está disponible.")